@@ -1,3 +1,7 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
@@ -6,9 +10,13 @@ from fastapi import Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core.exceptions import AccessDenied
+from app.core.cache import TTLCache
+from app.core.exceptions import AccessDenied, PasswordHashingBusy
 from app.models.users import User as UserModel
-from app.config import SECRET_KEY, ALGORITHM
+from app.config import (SECRET_KEY, ALGORITHM, AUTH_CACHE_TTL_SECONDS,
+                        AUTH_CACHE_MAXSIZE, AUTH_TRUST_TOKEN_CLAIMS,
+                        PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_DEPTH)
+from app.database import bind_session_to_user
 from app.db_depends import get_async_db
 
 
@@ -17,9 +25,42 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
+# Claim type: refresh-токен несет те же sub/role/id, но как access-токен не принимается
+ACCESS_TOKEN_TYPE = 'access'
+REFRESH_TOKEN_TYPE = 'refresh'
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Неизменяемый снимок авторизованного пользователя.
+    Хранится в кэше вместо ORM-объекта, чтобы не делить его между сессиями.
+    """
+    id: int
+    email: str
+    role: str
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user: UserModel) -> 'Principal':
+        return cls(id=user.id, email=user.email, role=user.role, is_active=user.is_active)
+
+
+# Кэш пользователей по subject токена (email). Свой в каждом воркере,
+# поэтому изменения, сделанные в другом процессе, видны не позже чем через TTL.
+principal_cache = TTLCache(maxsize=AUTH_CACHE_MAXSIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(email: str):
+    """
+    Удаляет пользователя из кэша.
+    Вызывается при деактивации пользователя или смене его роли.
+    """
+    principal_cache.delete(email)
+
+
 def hash_password(password: str) -> str:
     """
     Преобразует пароль в хеш с использованием bcrypt.
@@ -34,25 +75,71 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHashingPool:
+    """
+    Ограниченный пул потоков для bcrypt.
+    Хеширование занимает 100-300 мс CPU, поэтому выполняется вне event loop.
+    Одновременно в пуле не больше workers + queue_depth задач, остальные
+    запросы сразу получают 503, а не копятся в очереди.
+    """
+    def __init__(self, workers: int, queue_depth: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._limit = workers + queue_depth
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, func, *args):
+        if self._pending >= self._limit:
+            raise PasswordHashingBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+
+password_pool = PasswordHashingPool(workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE_DEPTH)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Хеширует пароль в пуле потоков, не блокируя event loop.
+    """
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Проверяет пароль в пуле потоков, не блокируя event loop.
+    """
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
 def create_access_token(data: dict):
-    """ Создает JWT с payload (sub, role, id, exp)"""
+    """ Создает JWT с payload (sub, role, id, type, exp)"""
     to_encode = data.copy() # создаем копию данных (ожидаем, что там sub, role, id)
     exp = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES) # добавляем exp
-    to_encode.update({'exp': exp}) # обновляем словарь
+    to_encode.update({'exp': exp, 'type': ACCESS_TOKEN_TYPE}) # обновляем словарь
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_refresh_token(data: dict):
     """ Создает refresh-токен с длительностью действия 7 дней"""
     to_encode = data.copy()
     exp = datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({'exp': exp})
+    to_encode.update({'exp': exp, 'type': REFRESH_TOKEN_TYPE})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme),
                             db: AsyncSession = Depends(get_async_db)):
     """
-    Проверяет Token (JWT) и возвращает пользователя из базы
+    Проверяет Token (JWT) и возвращает пользователя (Principal).
+    Принимаются только access-токены. Пользователь берется из кэша, из базы при промахе,
+    либо только из claims токена при AUTH_TRUST_TOKEN_CLAIMS: тогда смена роли
+    и деактивация пользователя не действуют, пока не истечет его access-токен.
     """
     credentials_exception = HTTPException(
         status_code=401,
@@ -62,7 +149,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get('sub')
-        if not email:
+        if not email or payload.get('type') != ACCESS_TOKEN_TYPE:
             raise credentials_exception
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -73,9 +160,27 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
     except jwt.InvalidTokenError:
         raise credentials_exception
 
+    if AUTH_TRUST_TOKEN_CLAIMS:
+        # --- Роль и id берем из подписанного токена, без обращения к БД ---
+        if payload.get('id') is None or not payload.get('role'):
+            raise credentials_exception
+        bind_session_to_user(db, payload['id'])
+        return Principal(id=payload['id'], email=email, role=payload['role'])
+
+    principal = principal_cache.get(email)
+    if principal is not None:
+        bind_session_to_user(db, principal.id)
+        return principal
+
     user = await db.scalars(select(UserModel).where(UserModel.email == email,
                                               UserModel.is_active == True))
-    return user.first()
+    user = user.first()
+    if not user:
+        raise credentials_exception
+    principal = Principal.from_user(user)
+    principal_cache.set(email, principal)
+    bind_session_to_user(db, principal.id)
+    return principal
 
 def get_current_seller(current_user: UserModel = Depends(get_current_user)):
     if not current_user.role == 'seller':
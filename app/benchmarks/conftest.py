@@ -0,0 +1,114 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+from sqlalchemy.pool import NullPool
+
+from app.core.sql_instrumentation import instrument_engine
+from app.database import Base
+
+RESULTS_KEY = pytest.StashKey[list[dict]]()
+
+# Размер по умолчанию: быстрый прогон в общем наборе тестов проверяет число выражений
+DEFAULT_ROWS = (1000,)
+
+# Синтетический каталог из rows товаров и rows отзывов одними INSERT ... SELECT по рекурсивному CTE.
+# Каждый 10-й пользователь — продавец, каждая 20-я категория, 10-й товар и 7-й отзыв неактивны;
+# статистика категорий заполняется по засеянным товарам
+SEED_SQL = (
+    """
+    INSERT INTO users (id, email, hashed_password, is_active, role)
+    WITH RECURSIVE g(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM g WHERE n < :users)
+    SELECT n, 'bench-' || n || '@example.com', 'bench', 1, CASE WHEN n % 10 = 0 THEN 'seller' ELSE 'buyer' END
+    FROM g
+    """,
+    """
+    INSERT INTO categories (id, name, is_active, parent_id)
+    WITH RECURSIVE g(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM g WHERE n < :categories)
+    SELECT n, 'Category ' || n, n % 20 <> 0, CASE WHEN n > 10 THEN 1 + n % 10 END
+    FROM g
+    """,
+    """
+    INSERT INTO products (id, name, description, price, stock, is_active, category_id, seller_id, rating)
+    WITH RECURSIVE g(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM g WHERE n < :rows)
+    SELECT n, 'Product ' || n, 'Description of product ' || n, (n * 37 % 100000) / 100.0 + 0.01, 10,
+           n % 10 <> 0, 1 + n % :categories, 10 * (1 + n % (:users / 10)), 1 + (n % 400) / 100.0
+    FROM g
+    """,
+    """
+    INSERT INTO reviews (id, user_id, product_id, comment, grade, is_active)
+    WITH RECURSIVE g(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM g WHERE n < :rows)
+    SELECT n, 1 + n % :users, 1 + (n * 7919) % :rows, 'Review number ' || n, 1 + n % 5, n % 7 <> 0
+    FROM g
+    """,
+    """
+    INSERT INTO category_stats (category_id, product_count, min_price, max_price, rating_sum, review_count)
+    SELECT c.id, count(p.id), min(p.price), max(p.price), coalesce(sum(p.rating_sum), 0),
+           coalesce(sum(p.review_count), 0)
+    FROM categories AS c LEFT JOIN products AS p ON p.category_id = c.id AND p.is_active
+    GROUP BY c.id
+    """,
+)
+
+
+def dataset_sizes(config: pytest.Config) -> tuple[int, ...]:
+    return tuple(config.getoption('bench_rows') or DEFAULT_ROWS)
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc):
+    if 'rows' in metafunc.fixturenames:
+        metafunc.parametrize('rows', dataset_sizes(metafunc.config), ids=lambda rows: f'{rows}rows')
+
+
+async def seed(engine: AsyncEngine, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        params = {'rows': rows, 'users': rows // 100 + 100, 'categories': rows // 1000 + 10}
+        for statement in SEED_SQL:
+            await conn.execute(text(statement), params)
+    async with engine.connect() as conn:
+        await conn.execute(text('ANALYZE'))
+
+
+@pytest.fixture(scope='session')
+def bench_engines(tmp_path_factory):
+    """ Фабрика engine засеянных баз: каждый размер засевается один раз за сессию """
+    engines: dict[int, AsyncEngine] = {}
+
+    def get(rows: int) -> AsyncEngine:
+        if rows not in engines:
+            path = tmp_path_factory.mktemp('bench') / f'repositories-{rows}.db'
+            engine = create_async_engine(f'sqlite+aiosqlite:///{path}', poolclass=NullPool)
+            instrument_engine(engine)
+            asyncio.run(seed(engine, rows))
+            engines[rows] = engine
+        return engines[rows]
+
+    yield get
+    for engine in engines.values():
+        asyncio.run(engine.dispose())
+
+
+@pytest.fixture(scope='session')
+def bench_results(request: pytest.FixtureRequest) -> list[dict]:
+    """ Результаты замеров сессии; их печатает и сохраняет pytest_terminal_summary """
+    return request.config.stash.setdefault(RESULTS_KEY, [])
+
+
+def pytest_terminal_summary(terminalreporter, config: pytest.Config):
+    """ Таблица результатов, если бенчмарк запрошен явно (--bench-rows или --bench-report) """
+    results = config.stash.get(RESULTS_KEY, None)
+    if not results or not (config.getoption('bench_rows') or config.getoption('bench_report')):
+        return
+    terminalreporter.section('repository benchmarks')
+    terminalreporter.write_line(f"{'method':<52}{'rows':>9}{'ms':>11}{'sql':>5}{'fetched':>10}")
+    for result in sorted(results, key=lambda result: (result['method'], result['dataset_rows'])):
+        terminalreporter.write_line(f"{result['method']:<52}{result['dataset_rows']:>9}{result['ms']:>11.3f}"
+                                    f"{result['statements']:>5}{result['rows_fetched']:>10}")
+    report = config.getoption('bench_report')
+    if report:
+        Path(report).write_text(json.dumps(results, indent=2))
+        terminalreporter.write_line(f'results saved to {report}')
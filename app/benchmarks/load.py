@@ -0,0 +1,435 @@
+"""
+Нагрузочный бенчмарк всех роутеров в одном процессе.
+База (временная SQLite или пустая PostgreSQL из --database-url) заполняется каталогом через Faker,
+затем --concurrency клиентов httpx через ASGITransport --duration секунд выполняют взвешенную смесь
+запросов к products, categories, reviews и users. Для каждого эндпоинта считаются пропускная способность,
+p50/p95/p99 и число SQL-выражений (из Server-Timing). Результат пишется в JSON и сравнивается с baseline:
+если p95 вырос или пропускная способность упала больше чем на --tolerance, скрипт завершается с кодом 1.
+Запуск: python -m app.benchmarks.load [--products 5000] [--concurrency 16] [--duration 20]
+        [--database-url postgresql+asyncpg://...] [--output load.json] [--baseline PATH] [--update-baseline]
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from faker import Faker
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import insert, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import auth
+from app.auth import create_access_token, hash_password, principal_cache
+from app.config import DatabaseSettings
+from app.core.category_tree import category_tree
+from app.core.product_suggest import product_suggest_index
+from app.core.response_cache import product_list_cache
+from app.core.sql_instrumentation import instrument_engine
+from app.database import Base, build_async_engine
+from app.db_depends import get_async_db
+from app.main import app
+from app.models import Category, Product, Review, User
+from app.repositories.products_repo import ProductRepository
+
+PASSWORD = 'benchmark-password'
+BASELINES_DIR = Path(__file__).parent / 'baselines'
+MIGRATIONS_DIR = Path(__file__).parent.parent / 'migrations'
+STATEMENTS_RE = re.compile(r'desc="(\d+) statements"')
+
+
+@dataclass
+class Catalog:
+    """ Идентификаторы засеянных строк, из которых сценарии собирают запросы """
+    admin: int
+    buyers: list[int]
+    # Продавец -> его товары (PUT /products/{id} разрешен только владельцу)
+    sellers: dict[int, list[int]]
+    categories: list[int]
+    products: list[int]
+    product_categories: dict[int, int]
+    words: list[str]
+    emails: dict[int, str]
+    reviewed: set[tuple[int, int]] = field(default_factory=set)
+
+
+@dataclass(frozen=True)
+class Call:
+    method: str
+    url: str
+    user: int | None = None
+    params: dict | None = None
+    json: dict | None = None
+    data: dict | None = None
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """ name — шаблон маршрута в отчете; expected — статусы, которые не считаются ошибкой """
+    name: str
+    weight: int
+    build: Callable[[random.Random, Catalog], Call]
+    expected: frozenset[int] = frozenset({200})
+    postgres_only: bool = False
+
+
+def product_payload(fake: Faker, category_id: int) -> dict:
+    return {'name': fake.sentence(nb_words=5)[:100],
+            'description': fake.text(max_nb_chars=150),
+            'price': str(fake.pyfloat(left_digits=3, right_digits=2, positive=True)),
+            'image_url': fake.image_url(),
+            'stock': fake.pyint(min_value=1, max_value=500),
+            'category_id': category_id}
+
+
+def new_review(rng: random.Random, catalog: Catalog) -> Call:
+    while True:
+        pair = (rng.choice(catalog.buyers), rng.choice(catalog.products))
+        if pair not in catalog.reviewed:
+            catalog.reviewed.add(pair)
+            return Call('POST', '/reviews/', user=pair[0],
+                        json={'product_id': pair[1], 'grade': rng.randint(1, 5), 'comment': 'Benchmark review text'})
+
+
+def update_own_product(rng: random.Random, catalog: Catalog) -> Call:
+    seller = rng.choice([seller for seller, products in catalog.sellers.items() if products])
+    product_id = rng.choice(catalog.sellers[seller])
+    payload = {'name': f'Updated {rng.choice(catalog.words)}', 'price': f'{rng.uniform(1, 999):.2f}',
+               'stock': rng.randint(1, 500), 'category_id': catalog.product_categories[product_id]}
+    return Call('PUT', f'/products/{product_id}', user=seller, json=payload)
+
+
+def create_product(rng: random.Random, catalog: Catalog) -> Call:
+    payload = {'name': f'New {rng.choice(catalog.words)} {rng.randint(1, 10 ** 6)}',
+               'price': f'{rng.uniform(1, 999):.2f}', 'stock': rng.randint(1, 500),
+               'category_id': rng.choice(catalog.categories)}
+    return Call('POST', '/products/', user=rng.choice(list(catalog.sellers)), json=payload)
+
+
+SCENARIOS = (
+    Scenario('GET /products/', 20, lambda rng, c: Call('GET', '/products/', params={
+        'page': rng.randint(1, 5), 'size': 20,
+        **({'category_id': rng.choice(c.categories)} if rng.random() < 0.5 else {})})),
+    Scenario('GET /products/cursor', 5, lambda rng, c: Call('GET', '/products/cursor', params={'size': 20})),
+    Scenario('GET /products/suggest', 10, lambda rng, c: Call('GET', '/products/suggest',
+                                                              params={'q': rng.choice(c.words)[:3]})),
+    Scenario('GET /products/search', 5, lambda rng, c: Call('GET', '/products/search',
+                                                            params={'q': rng.choice(c.words)}),
+             postgres_only=True),
+    Scenario('GET /products/search/{product_id}', 15,
+             lambda rng, c: Call('GET', f'/products/search/{rng.choice(c.products)}')),
+    Scenario('GET /products/{product_id}/reviews', 8,
+             lambda rng, c: Call('GET', f'/products/{rng.choice(c.products)}/reviews', params={'size': 20})),
+    Scenario('POST /products/', 1, create_product, expected=frozenset({201})),
+    Scenario('PUT /products/{product_id}', 2, update_own_product),
+    Scenario('GET /categories/', 8, lambda rng, c: Call('GET', '/categories/')),
+    Scenario('GET /categories/tree', 4, lambda rng, c: Call('GET', '/categories/tree')),
+    Scenario('GET /categories/{category_id}', 4,
+             lambda rng, c: Call('GET', f'/categories/{rng.choice(c.categories)}')),
+    Scenario('GET /reviews/', 5, lambda rng, c: Call('GET', '/reviews/', params={'size': 20})),
+    Scenario('POST /reviews/', 2, new_review, expected=frozenset({201})),
+    Scenario('GET /users/me', 4, lambda rng, c: Call('GET', '/users/me', user=rng.choice(c.buyers))),
+    Scenario('POST /users/token', 1, lambda rng, c: Call('POST', '/users/token', data={
+        'username': c.emails[rng.choice(c.buyers)], 'password': PASSWORD})),
+)
+
+
+def open_engine(database_url: str | None, tmp_dir: str, concurrency: int) -> AsyncEngine:
+    if database_url is None:
+        engine = create_async_engine(f'sqlite+aiosqlite:///{Path(tmp_dir) / "load.db"}', poolclass=NullPool)
+    else:
+        engine = build_async_engine(DatabaseSettings(url=database_url, pool_size=concurrency, max_overflow=0))
+    instrument_engine(engine)
+    return engine
+
+
+def migrate(database_url: str):
+    """
+    Схема PostgreSQL строится миграциями, как в проде: pg_trgm, генерируемый search_vector, частичные индексы.
+    Config без файла: alembic.ini не перенастраивает логирование процесса.
+    """
+    config = AlembicConfig()
+    config.set_main_option('script_location', str(MIGRATIONS_DIR))
+    config.attributes['database_url'] = database_url
+    command.upgrade(config, 'head')
+
+
+async def insert_rows(session: AsyncSession, model, rows: list[dict]) -> list[int]:
+    """ Пакетный INSERT ... RETURNING id в порядке строк """
+    if not rows:
+        return []
+    result = await session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows)
+    return list(result)
+
+
+async def seed(session_maker: async_sessionmaker[AsyncSession], products: int, seed_: int) -> Catalog:
+    """ Каталог из Faker: продавцы, покупатели, дерево категорий, товары и отзывы с агрегатами рейтинга """
+    fake = Faker()
+    fake.seed_instance(seed_)
+    rng = random.Random(seed_)
+    hashed = hash_password(PASSWORD)
+
+    async with session_maker() as session:
+        def users(role: str, count: int) -> list[dict]:
+            return [{'email': f'{role}-{number}-{fake.user_name()}@bench.example', 'hashed_password': hashed,
+                     'role': role} for number in range(count)]
+
+        user_rows = users('admin', 1) + users('seller', max(products // 100, 2)) + users('buyer', max(products // 10, 20))
+        user_ids = await insert_rows(session, User, user_rows)
+        emails = {id_: row['email'] for id_, row in zip(user_ids, user_rows)}
+        roles = {id_: row['role'] for id_, row in zip(user_ids, user_rows)}
+        admin = next(id_ for id_, role in roles.items() if role == 'admin')
+        sellers = [id_ for id_, role in roles.items() if role == 'seller']
+        buyers = [id_ for id_, role in roles.items() if role == 'buyer']
+
+        # Номер в имени: слово Faker бывает короче 3 символов, которых требует схема CategoryCreate
+        roots = await insert_rows(session, Category, [{'name': f'{fake.word().title()} {number}'}
+                                                      for number in range(max(products // 500, 5))])
+        children = await insert_rows(session, Category, [{'name': f'{fake.word().title()} {len(roots) + number}',
+                                                          'parent_id': rng.choice(roots)}
+                                                         for number in range(len(roots) * 3)])
+        categories = roots + children
+
+        product_rows = []
+        for _ in range(products):
+            row = product_payload(fake, rng.choice(categories))
+            row.update(price=Decimal(row['price']), seller_id=rng.choice(sellers))
+            product_rows.append(row)
+        product_ids = await insert_rows(session, Product, product_rows)
+
+        reviewed = set()
+        review_rows = []
+        for product_id in product_ids:
+            for buyer in rng.sample(buyers, rng.randint(0, 4)):
+                reviewed.add((buyer, product_id))
+                review_rows.append({'user_id': buyer, 'product_id': product_id, 'grade': rng.randint(1, 5),
+                                    'comment': fake.sentence(nb_words=8)})
+        await insert_rows(session, Review, review_rows)
+        products = ProductRepository(db=session, model=Product)
+        await products.rebuild_rating_aggregates()
+        await products.rebuild_category_stats()
+        await session.commit()
+
+    own_products = {seller: [] for seller in sellers}
+    for id_, row in zip(product_ids, product_rows):
+        own_products[row['seller_id']].append(id_)
+    words = sorted({word.lower() for row in product_rows for word in re.findall(r'[A-Za-z]{4,}', row['name'])})
+    return Catalog(admin=admin, buyers=buyers, sellers=own_products, categories=categories,
+                   products=product_ids,
+                   product_categories={id_: row['category_id'] for id_, row in zip(product_ids, product_rows)},
+                   words=words, emails=emails, reviewed=reviewed)
+
+
+def percentile(latencies: list[float], p: int) -> float:
+    if len(latencies) == 1:
+        return latencies[0] * 1000
+    return statistics.quantiles(latencies, n=100, method='inclusive')[p - 1] * 1000
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)
+    statements: list[int] = field(default_factory=list)
+    errors: int = 0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+
+async def drive(client: AsyncClient, scenarios: tuple[Scenario, ...], catalog: Catalog,
+                concurrency: int, duration: float, seed_: int) -> dict[str, Samples]:
+    """ concurrency клиентов в течение duration секунд выбирают сценарии по весам """
+    samples = {scenario.name: Samples() for scenario in scenarios}
+    weights = [scenario.weight for scenario in scenarios]
+    tokens: dict[int, dict] = {}
+    deadline = time.perf_counter() + duration
+
+    def headers(user_id: int | None) -> dict:
+        if user_id is None:
+            return {}
+        if user_id not in tokens:
+            role = ('admin' if user_id == catalog.admin else 'seller' if user_id in catalog.sellers else 'buyer')
+            token = create_access_token({'sub': catalog.emails[user_id], 'role': role, 'id': user_id})
+            tokens[user_id] = {'Authorization': f'Bearer {token}'}
+        return tokens[user_id]
+
+    async def worker(number: int):
+        rng = random.Random(seed_ * 1000 + number)
+        while time.perf_counter() < deadline:
+            scenario = rng.choices(scenarios, weights)[0]
+            call = scenario.build(rng, catalog)
+            started = time.perf_counter()
+            response = await client.request(call.method, call.url, params=call.params, json=call.json,
+                                            data=call.data, headers=headers(call.user))
+            elapsed = time.perf_counter() - started
+            sample = samples[scenario.name]
+            sample.latencies.append(elapsed)
+            sample.statuses[response.status_code] = sample.statuses.get(response.status_code, 0) + 1
+            if response.status_code not in scenario.expected:
+                sample.errors += 1
+            timing = STATEMENTS_RE.search(response.headers.get('Server-Timing', ''))
+            if timing:
+                sample.statements.append(int(timing.group(1)))
+
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    return samples
+
+
+def summarize(samples: dict[str, Samples], duration: float) -> dict:
+    endpoints = {}
+    for name, sample in samples.items():
+        if not sample.latencies:
+            continue
+        endpoints[name] = {
+            'requests': len(sample.latencies),
+            'errors': sample.errors,
+            'statuses': {str(status): count for status, count in sorted(sample.statuses.items())},
+            'throughput_rps': round(len(sample.latencies) / duration, 2),
+            'p50_ms': round(percentile(sample.latencies, 50), 3),
+            'p95_ms': round(percentile(sample.latencies, 95), 3),
+            'p99_ms': round(percentile(sample.latencies, 99), 3),
+            'statements_avg': (round(statistics.fmean(sample.statements), 2) if sample.statements else None),
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {'endpoints': endpoints,
+            'total': {'requests': total,
+                      'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+                      'throughput_rps': round(total / duration, 2)}}
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """ Регрессии относительно baseline: рост p95, падение пропускной способности или новые ошибки """
+    regressions = []
+    for name, current in result['endpoints'].items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if current['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['throughput_rps']:.1f} -> "
+                               f"{current['throughput_rps']:.1f} req/s")
+        if current['errors'] and not base['errors']:
+            regressions.append(f"{name}: {current['errors']} errors, statuses {current['statuses']}")
+    return regressions
+
+
+def print_report(result: dict, baseline: dict | None):
+    print(f"{'endpoint':<38}{'req':>7}{'err':>5}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'sql':>6}"
+          + (f"{'p95 vs base':>13}" if baseline else ''))
+    for name, stats in result['endpoints'].items():
+        line = (f"{name:<38}{stats['requests']:>7}{stats['errors']:>5}{stats['throughput_rps']:>9.1f}"
+                f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+                f"{stats['statements_avg'] if stats['statements_avg'] is not None else '-':>6}")
+        base = baseline and baseline['endpoints'].get(name)
+        if base:
+            line += f"{(stats['p95_ms'] / base['p95_ms'] - 1) * 100:>+12.1f}%"
+        print(line)
+    total = result['total']
+    print(f"total: {total['requests']} requests, {total['errors']} errors, {total['throughput_rps']:.1f} req/s")
+
+
+async def run_benchmark(products: int = 5000, concurrency: int = 16, duration: float = 20.0, warmup: float = 2.0,
+                        database_url: str | None = None, seed_: int = 100) -> dict:
+    # Без .env ключ не задан, а токены подписываются им; прежнее значение возвращается после прогона
+    secret_key = auth.SECRET_KEY
+    auth.SECRET_KEY = secret_key or 'benchmark-secret'
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = open_engine(database_url, tmp, concurrency)
+        dialect = engine.dialect.name
+        try:
+            if dialect == 'postgresql':
+                # env.py миграций сам вызывает asyncio.run, поэтому в отдельном потоке
+                await asyncio.to_thread(migrate, database_url)
+            else:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+            session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+            catalog = await seed(session_maker, products, seed_)
+
+            async def override_get_async_db():
+                async with session_maker() as session:
+                    yield session
+
+            scenarios = tuple(scenario for scenario in SCENARIOS
+                              if not scenario.postgres_only or dialect == 'postgresql')
+            previous_override = app.dependency_overrides.get(get_async_db)
+            app.dependency_overrides[get_async_db] = override_get_async_db
+            category_tree.invalidate()
+            product_suggest_index.invalidate()
+            principal_cache.clear()
+            await product_list_cache.clear()
+            try:
+                async with AsyncClient(transport=ASGITransport(app=app), base_url='http://bench') as client:
+                    if warmup:
+                        await drive(client, scenarios, catalog, concurrency, warmup, seed_ + 1)
+                    samples = await drive(client, scenarios, catalog, concurrency, duration, seed_)
+            finally:
+                if previous_override is None:
+                    app.dependency_overrides.pop(get_async_db, None)
+                else:
+                    app.dependency_overrides[get_async_db] = previous_override
+        finally:
+            await engine.dispose()
+            auth.SECRET_KEY = secret_key
+
+    result = summarize(samples, duration)
+    result['meta'] = {'database': dialect, 'products': products, 'reviews': len(catalog.reviewed),
+                      'concurrency': concurrency, 'duration': duration, 'seed': seed_,
+                      'python': platform.python_version(), 'started_at': datetime.now(timezone.utc).isoformat()}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process load benchmark of all routers')
+    parser.add_argument('--products', type=int, default=5000, help='Размер каталога')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20.0, help='Секунд измерения')
+    parser.add_argument('--warmup', type=float, default=2.0, help='Секунд прогрева (не входят в отчет)')
+    parser.add_argument('--database-url',
+                        help='Пустая база PostgreSQL (схема создается миграциями); по умолчанию временная SQLite')
+    parser.add_argument('--seed', type=int, default=100)
+    parser.add_argument('--output', type=Path, help='Куда сохранить результат в JSON')
+    parser.add_argument('--baseline', type=Path,
+                        help='Baseline для сравнения; по умолчанию app/benchmarks/baselines/load-<database>.json')
+    parser.add_argument('--update-baseline', action='store_true', help='Сохранить результат как baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Допустимое ухудшение p95 и пропускной способности (0.2 = 20%%)')
+    args = parser.parse_args()
+    if args.database_url and make_url(args.database_url).get_backend_name() == 'sqlite':
+        parser.error('--database-url is for PostgreSQL; SQLite runs in a temporary file by default')
+
+    result = asyncio.run(run_benchmark(args.products, args.concurrency, args.duration, args.warmup,
+                                       args.database_url, args.seed))
+    baseline_path = args.baseline or BASELINES_DIR / f"load-{result['meta']['database']}.json"
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    print_report(result, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2))
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(result, indent=2))
+        print(f'baseline saved to {baseline_path}')
+    elif baseline is None:
+        print(f'no baseline at {baseline_path}; run with --update-baseline to store one')
+    else:
+        regressions = compare(result, baseline, args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
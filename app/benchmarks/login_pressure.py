@@ -0,0 +1,115 @@
+"""
+Бенчмарк: латентность GET /products/ пока /users/token под нагрузкой.
+Сравнивает проверку bcrypt прямо в event loop (inline) и в пуле потоков (pool).
+Запуск: python -m app.benchmarks.login_pressure [--login-concurrency 8] [--duration 5]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+
+import app.routers.users as users_router
+from app import auth
+from app.auth import hash_password, verify_password
+from app.database import Base
+from app.db_depends import get_async_db
+from app.main import app
+from app.models import Category, Product, User
+
+PASSWORD = 'benchmark-password'
+
+original_verify = users_router.verify_password_async
+
+
+async def verify_password_inline(plain_password: str, hashed_password: str) -> bool:
+    """ Поведение до пула: bcrypt блокирует event loop """
+    return verify_password(plain_password, hashed_password)
+
+
+async def prepare_database(path: Path) -> async_sessionmaker[AsyncSession]:
+    engine = create_async_engine(f'sqlite+aiosqlite:///{path}', poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    async with session_maker() as session:
+        session.add(User(id=1, email='bench@mail.com', hashed_password=hash_password(PASSWORD), role='buyer'))
+        session.add(Category(id=1, name='Bench'))
+        session.add_all([Product(name=f'Product {i}', price=Decimal(i), stock=1, category_id=1, seller_id=1)
+                         for i in range(1, 101)])
+        await session.commit()
+    return session_maker
+
+
+def percentile(latencies: list[float], p: int) -> float:
+    return statistics.quantiles(latencies, n=100, method='inclusive')[p - 1] * 1000
+
+
+async def measure(mode: str, session_maker: async_sessionmaker[AsyncSession],
+                  login_concurrency: int, duration: float) -> dict:
+    users_router.verify_password_async = verify_password_inline if mode == 'inline' else original_verify
+    login_statuses: dict[int, int] = {}
+    stop = asyncio.Event()
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://bench') as client:
+        async def login_worker():
+            while not stop.is_set():
+                response = await client.post('/users/token',
+                                             data={'username': 'bench@mail.com', 'password': PASSWORD})
+                login_statuses[response.status_code] = login_statuses.get(response.status_code, 0) + 1
+
+        workers = [asyncio.create_task(login_worker()) for _ in range(login_concurrency)]
+        await asyncio.sleep(0.2)
+
+        latencies = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get('/products/', params={'size': 20})
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+        stop.set()
+        await asyncio.gather(*workers)
+
+    return {'mode': mode,
+            'requests': len(latencies),
+            'p50_ms': percentile(latencies, 50),
+            'p99_ms': percentile(latencies, 99),
+            'logins': login_statuses}
+
+
+async def main(login_concurrency: int, duration: float):
+    # Без .env ключ не задан, а /users/token подписывает токены
+    auth.SECRET_KEY = auth.SECRET_KEY or 'benchmark-secret'
+    with tempfile.TemporaryDirectory() as tmp:
+        session_maker = await prepare_database(Path(tmp) / 'bench.db')
+
+        async def override_get_async_db():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        try:
+            for mode in ('inline', 'pool'):
+                result = await measure(mode, session_maker, login_concurrency, duration)
+                print(f"{result['mode']:>6}: GET /products/ x{result['requests']} p50={result['p50_ms']:.1f} ms "
+                      f"p99={result['p99_ms']:.1f} ms, /users/token statuses={result['logins']}")
+        finally:
+            users_router.verify_password_async = original_verify
+            app.dependency_overrides.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='GET /products/ latency while /users/token is under load')
+    parser.add_argument('--login-concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0,
+                        help='Сколько секунд измерять GET /products/ в каждом режиме')
+    args = parser.parse_args()
+    asyncio.run(main(args.login_concurrency, args.duration))
@@ -0,0 +1,82 @@
+"""
+Бенчмарк: сериализация ответов со списками и карточкой товара.
+Сравнивает прежний путь (модель ответа в обработчике, повторная валидация FastAPI по response_model
+и json.dumps в JSONResponse) с быстрым путем app.core.serialization (одна валидация, JSON сразу в байты).
+Запуск: python -m app.benchmarks.serialization [--sizes 100 1000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from fastapi_pagination import Page
+
+from app.core.serialization import dump_json
+from app.models import Product
+from app.schemas import ProductOut, Product as ProductSchema, ResponseModel
+
+
+def make_products(count: int) -> list[Product]:
+    return [Product(id=i, name=f'Product {i}', description=f'Description of product {i}',
+                    price=Decimal(i * 137 % 100000) / 100, image_url=None, stock=i % 50, category_id=1 + i % 10,
+                    seller_id=1, is_active=True, rating=(i % 50) / 10)
+            for i in range(1, count + 1)]
+
+
+def page_of(products: list[Product]) -> dict:
+    return {'items': products, 'total': len(products) * 10, 'page': 1, 'size': len(products), 'pages': 10}
+
+
+async def current_path(field, build, value) -> bytes:
+    """ Как раньше: объект ответа, затем serialize_response по response_model и json.dumps """
+    content = await serialize_response(field=field, response_content=build(value))
+    return JSONResponse(content).body
+
+
+async def measure(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def cases(sizes: list[int]):
+    product = make_products(1)[0]
+    yield ('detail ResponseModel[Product]', ResponseModel[ProductSchema],
+           lambda value: ResponseModel[ProductSchema](status='success', data=value),
+           product, {'status': 'success', 'data': product})
+    for size in sizes:
+        products = make_products(size)
+        yield (f'Page[ProductOut] x{size}', Page[ProductOut],
+               lambda value: Page[ProductOut].model_validate(value, from_attributes=True),
+               page_of(products), page_of(products))
+        yield (f'list[Product] x{size}', list[ProductSchema],
+               lambda value: value, products, products)
+
+
+async def main(sizes: list[int], repeat: int):
+    print(f"{'case':<32}{'current, ms':>14}{'fast, ms':>12}{'speedup':>10}")
+    for name, type_, build, current_value, fast_value in cases(sizes):
+        field = create_model_field('Response', type_, mode='serialization')
+        # Оба пути должны отдавать один и тот же JSON
+        assert json.loads(await current_path(field, build, current_value)) == json.loads(dump_json(type_, fast_value))
+        current = await measure(lambda: current_path(field, build, current_value), repeat)
+        fast = await measure(lambda: dump_json(type_, fast_value), repeat)
+        print(f'{name:<32}{current:>14.3f}{fast:>12.3f}{current / fast:>9.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Response serialization: current path vs TypeAdapter fast path')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat))
@@ -0,0 +1,162 @@
+"""
+Микробенчмарки репозиториев на засеянных базах SQLite разного размера.
+Для каждого метода ProductRepository, ReviewRepository и CategoryRepository замеряются время,
+число SQL-выражений и число строк в результате. Число выражений не должно зависеть от размера базы,
+а ограниченные методы (страницы, выборка по id) не должны возвращать больше строк, чем обещают.
+Каждый метод выполняется --bench-repeat раз, каждый раз в своей транзакции с откатом,
+поэтому данные одинаковы для всех замеров; в отчет идет медиана времени.
+В общем наборе тестов идет быстрый прогон на 1000 строк; полный замер:
+    pytest app/benchmarks/test_repositories.py --bench-rows 1000 100000 1000000 --bench-report repositories.json
+"""
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, NamedTuple
+
+import pytest
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.sql_instrumentation import collect_sql_stats
+from app.models import Category as CategoryModel, Product as ProductModel, Review as ReviewModel
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.repositories.review_repo import ReviewRepository
+from app.schemas import CategoryCreate
+
+PAGE_SIZE = 20
+# Товар 1 активен, лежит в категории 2, его продавец — пользователь 20 (см. SEED_SQL в conftest.py)
+PRODUCT_ID, SELLER_ID, PRODUCT_CATEGORY_ID = 1, 20, 2
+CATEGORY_ID, REVIEW_ID = 1, 1
+PRODUCT = {'name': 'Bench product', 'description': None, 'price': Decimal('9.99'), 'stock': 5,
+           'category_id': PRODUCT_CATEGORY_ID}
+
+
+class Repositories(NamedTuple):
+    products: ProductRepository
+    reviews: ReviewRepository
+    categories: CategoryRepository
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    call: Callable[[Repositories, int], Awaitable[Any]]
+    # Ожидаемое число SQL-выражений при любом размере базы
+    statements: int
+    # Верхняя граница строк в результате; None — метод читает всю выборку
+    max_rows: int | None = 1
+
+
+async def page(repos: Repositories, query) -> list:
+    return (await repos.products.db.scalars(query.limit(PAGE_SIZE))).all()
+
+
+CASES = (
+    # --- ProductRepository ---
+    Case('ProductRepository.get', lambda r, rows: r.products.get(PRODUCT_ID), 1),
+    Case('ProductRepository.get_many',
+         lambda r, rows: r.products.get_many(list(range(1, PAGE_SIZE + 1))), 1, PAGE_SIZE),
+    Case('ProductRepository.get_version', lambda r, rows: r.products.get_version(PRODUCT_ID), 1),
+    Case('ProductRepository.get_product_by_seller',
+         lambda r, rows: r.products.get_product_by_seller(PRODUCT_ID, SELLER_ID), 1),
+    Case('ProductRepository.get_all', lambda r, rows: r.products.get_all(), 1, None),
+    Case('ProductRepository.get_all_by_category',
+         lambda r, rows: r.products.get_all_by_category(PRODUCT_CATEGORY_ID), 1, None),
+    Case('ProductRepository.get_suggestion_rows', lambda r, rows: r.products.get_suggestion_rows(), 1, None),
+    Case('ProductRepository.get_suggestion_changes',
+         lambda r, rows: r.products.get_suggestion_changes(datetime.now(timezone.utc) + timedelta(days=1)), 1, 0),
+    Case('ProductRepository.stream_all', lambda r, rows: r.products.stream_all(), 1, None),
+    Case('ProductRepository page', lambda r, rows: _product_page(r), 1, PAGE_SIZE),
+    Case('ProductRepository.create', lambda r, rows: r.products.create(dict(PRODUCT, seller_id=SELLER_ID)), 2),
+    Case('ProductRepository.bulk_create x100',
+         lambda r, rows: r.products.bulk_create([dict(PRODUCT, name=f'Bulk {i}', seller_id=SELLER_ID)
+                                                 for i in range(100)]), 2, 100),
+    Case('ProductRepository.update', lambda r, rows: r.products.update(PRODUCT_ID, PRODUCT), 4),
+    Case('ProductRepository.update_owned',
+         lambda r, rows: r.products.update_owned(PRODUCT_ID, SELLER_ID, PRODUCT, same_category=True), 2),
+    Case('ProductRepository.delete_owned', lambda r, rows: r.products.delete_owned(PRODUCT_ID, SELLER_ID), 2),
+    Case('ProductRepository.delete', lambda r, rows: r.products.delete(PRODUCT_ID), 3),
+    Case('ProductRepository.update_product_rating',
+         lambda r, rows: r.products.update_product_rating(PRODUCT_ID, 5), 2),
+    Case('ProductRepository.rebuild_rating_aggregates',
+         lambda r, rows: r.products.rebuild_rating_aggregates(), 2, 0),
+    Case('ProductRepository.rebuild_category_stats',
+         lambda r, rows: r.products.rebuild_category_stats(), 3, 0),
+    # --- ReviewRepository ---
+    Case('ReviewRepository.get', lambda r, rows: r.reviews.get(REVIEW_ID), 1),
+    Case('ReviewRepository.get_review_by_user',
+         lambda r, rows: r.reviews.get_review_by_user(1 + 7919 % rows, 1 + REVIEW_ID), 1),
+    Case('ReviewRepository.get_all', lambda r, rows: r.reviews.get_all(), 1, None),
+    Case('ReviewRepository.stream_all', lambda r, rows: r.reviews.stream_all(), 1, None),
+    Case('ReviewRepository page',
+         lambda r, rows: page(r, r.reviews.get_query_for_pagination()
+                              .order_by(ReviewModel.comment_date.desc(), ReviewModel.id.desc())), 1, PAGE_SIZE),
+    Case('ReviewRepository product page', lambda r, rows: page(r, r.reviews.get_query_for_product(PRODUCT_ID)), 1,
+         PAGE_SIZE),
+    Case('ReviewRepository.create',
+         lambda r, rows: r.reviews.create({'user_id': 3, 'product_id': PRODUCT_ID, 'grade': 4}), 1),
+    Case('ReviewRepository.update', lambda r, rows: r.reviews.update(REVIEW_ID, {'grade': 3}), 2),
+    Case('ReviewRepository.delete', lambda r, rows: r.reviews.delete(REVIEW_ID), 1),
+    # --- CategoryRepository ---
+    Case('CategoryRepository.get', lambda r, rows: r.categories.get(CATEGORY_ID), 1),
+    Case('CategoryRepository.get_many', lambda r, rows: r.categories.get_many(list(range(1, 11))), 1, 10),
+    Case('CategoryRepository.get_category_by_parent',
+         lambda r, rows: r.categories.get_category_by_parent(CATEGORY_ID), 1),
+    Case('CategoryRepository.get_tree_version', lambda r, rows: r.categories.get_tree_version(), 1, None),
+    Case('CategoryRepository.get_active_ids', lambda r, rows: r.categories.get_active_ids(), 1, None),
+    Case('CategoryRepository.get_all', lambda r, rows: r.categories.get_all(), 1, None),
+    Case('CategoryRepository page', lambda r, rows: page(r, r.categories.get_query_for_pagination()), 1, PAGE_SIZE),
+    Case('CategoryRepository.create', lambda r, rows: r.categories.create(CategoryCreate(name='Bench')), 1),
+    Case('CategoryRepository.update', lambda r, rows: r.categories.update(CATEGORY_ID, {'name': 'Renamed'}), 2),
+    Case('CategoryRepository.delete', lambda r, rows: r.categories.delete(CATEGORY_ID), 2),
+)
+
+
+async def _product_page(repos: Repositories) -> list:
+    return await page(repos, (await repos.products.get_query_for_pagination()).order_by(ProductModel.id))
+
+
+async def count_rows(result: Any) -> int:
+    """ Строки в результате метода; потоковый результат дочитывается до конца """
+    if result is None or isinstance(result, int):
+        return 0
+    if isinstance(result, Row):
+        return 1
+    if hasattr(result, '__aiter__'):
+        return sum([1 async for _ in result])
+    if isinstance(result, (list, tuple, set)):
+        return len(result)
+    return 1
+
+
+@pytest.mark.parametrize('case', CASES, ids=lambda case: case.name)
+def test_repository_method(case: Case, rows: int, bench_engines, bench_results, pytestconfig):
+    session_maker = async_sessionmaker(bench_engines(rows), expire_on_commit=False, class_=AsyncSession)
+
+    async def measure():
+        async with session_maker() as session:
+            repos = Repositories(ProductRepository(session, ProductModel), ReviewRepository(session, ReviewModel),
+                                 CategoryRepository(session, CategoryModel))
+            with collect_sql_stats() as stats:
+                started = time.perf_counter()
+                fetched = await count_rows(await case.call(repos, rows))
+                # Изменения ORM-объектов уходят в БД при flush: он входит в замер
+                await session.flush()
+                elapsed = time.perf_counter() - started
+            await session.rollback()
+        return stats, fetched, elapsed
+
+    runs = [asyncio.run(measure()) for _ in range(max(pytestconfig.getoption('bench_repeat'), 1))]
+    stats, fetched, _ = runs[-1]
+    elapsed = statistics.median(elapsed for _, _, elapsed in runs)
+    bench_results.append({'method': case.name, 'dataset_rows': rows, 'ms': round(elapsed * 1000, 3),
+                          'statements': stats.statements, 'rows_fetched': fetched})
+
+    assert stats.statements == case.statements, list(stats.shapes)
+    if case.max_rows is not None:
+        assert fetched <= case.max_rows
@@ -1,10 +1,29 @@
+import asyncio
+from decimal import Decimal
+from typing import Callable
 from unittest.mock import AsyncMock
 import pytest
 from faker import Faker
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.pool import NullPool
 
+from app import auth
+from app.auth import principal_cache, create_access_token
+from app.core.category_tree import category_tree
 from app.core.exceptions import ProductNotFound
+from app.core.product_suggest import product_suggest_index
+from app.core.response_cache import product_list_cache
+from app.database import Base
+from app.db_depends import get_async_db
 from app.main import app
+from app.models import Category, Product, Review, User
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.repositories.review_repo import ReviewRepository
+from app.services.product_service import ProductService
+from app.services.review_service import ReviewService
 
 
 Faker.seed(100)
@@ -46,3 +65,130 @@ def mock_not_found_error() -> AsyncMock:
 def client(mock_product_service: AsyncMock) -> TestClient:
     with TestClient(app) as client:
         yield client
+
+
+@pytest.fixture
+def db_engine(tmp_path) -> AsyncEngine:
+    """ Engine временной SQLite базы со всеми таблицами """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_tables())
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def session_maker(db_engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    """ Фабрика сессий для временной SQLite базы """
+    return async_sessionmaker(db_engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest.fixture
+def sql_statements(db_engine: AsyncEngine) -> list[str]:
+    """ Список SQL-выражений, выполненных на временной базе во время теста """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db_engine.sync_engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def sql_commits(db_engine: AsyncEngine) -> list[str]:
+    """ COMMIT и ROLLBACK транзакций временной базы во время теста, по порядку """
+    events = []
+
+    def on_commit(conn):
+        events.append('COMMIT')
+
+    def on_rollback(conn):
+        events.append('ROLLBACK')
+
+    event.listen(db_engine.sync_engine, 'commit', on_commit)
+    event.listen(db_engine.sync_engine, 'rollback', on_rollback)
+    yield events
+    event.remove(db_engine.sync_engine, 'commit', on_commit)
+    event.remove(db_engine.sync_engine, 'rollback', on_rollback)
+
+
+@pytest.fixture
+def db_client(session_maker: async_sessionmaker[AsyncSession]) -> TestClient:
+    """ Клиент, у которого get_async_db отдает сессию временной SQLite базы """
+    async def override_get_async_db():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    category_tree.invalidate()
+    product_suggest_index.invalidate()
+    principal_cache.clear()
+    asyncio.run(product_list_cache.clear())
+    with TestClient(app) as client:
+        yield client
+    app.dependency_overrides.clear()
+    category_tree.invalidate()
+    product_suggest_index.invalidate()
+    principal_cache.clear()
+    asyncio.run(product_list_cache.clear())
+
+
+@pytest.fixture
+def seed_catalog(session_maker: async_sessionmaker[AsyncSession]) -> Callable[..., None]:
+    """
+    Засевает временную базу: продавец id=1 (seller@mail.com), категория id=1 'Phones' и товары продавца.
+    products — число товаров или поля каждого товара поверх значений по умолчанию
+    ('Product {id}', цена 10, stock 1, категория 1); id товаров идут по порядку с 1.
+    objects — остальные модели теста (пользователи, категории, отзывы).
+    """
+    def seed(*objects, products: int | list[dict] = 0):
+        if isinstance(products, int):
+            products = [{}] * products
+        rows = [Product(**{'id': id_, 'name': f'Product {id_}', 'price': Decimal(10), 'stock': 1,
+                           'category_id': 1, 'seller_id': 1} | fields)
+                for id_, fields in enumerate(products, start=1)]
+
+        async def scenario():
+            async with session_maker() as session:
+                session.add_all([User(id=1, email='seller@mail.com', hashed_password='x', role='seller'),
+                                 Category(id=1, name='Phones'), *rows, *objects])
+                await session.commit()
+
+        asyncio.run(scenario())
+
+    return seed
+
+
+@pytest.fixture
+def auth_headers(monkeypatch) -> Callable[..., dict]:
+    """
+    Заголовок Authorization с access-токеном пользователя (email по умолчанию — '{role}@mail.com').
+    На время теста подписывает токены тестовым SECRET_KEY.
+    """
+    monkeypatch.setattr(auth, 'SECRET_KEY', 'test-secret')
+
+    def headers(role: str, id_: int, email: str | None = None) -> dict:
+        token = create_access_token({'sub': email or f'{role}@mail.com', 'role': role, 'id': id_})
+        return {'Authorization': f'Bearer {token}'}
+
+    return headers
+
+
+@pytest.fixture
+def build_services() -> Callable[[AsyncSession], tuple[ProductService, ReviewService]]:
+    """ Сервисы товаров и отзывов поверх сессии теста, собранные так же, как в зависимостях маршрутов """
+    def build(session: AsyncSession) -> tuple[ProductService, ReviewService]:
+        product_repository = ProductRepository(db=session, model=Product)
+        review_repository = ReviewRepository(db=session, model=Review)
+        product_service = ProductService(product_repository=product_repository,
+                                         review_repository=review_repository,
+                                         category_repository=CategoryRepository(db=session, model=Category))
+        return product_service, ReviewService(review_repository, product_repository, product_service)
+
+    return build
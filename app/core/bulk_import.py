@@ -0,0 +1,95 @@
+import csv
+import json
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+
+NDJSON_CONTENT_TYPES = frozenset({'application/x-ndjson', 'application/ndjson', 'application/jsonl'})
+CSV_CONTENT_TYPES = frozenset({'text/csv', 'application/csv'})
+
+
+@dataclass(slots=True)
+class ImportRecord:
+    """ Строка файла импорта: номер строки данных и разобранные поля либо ошибка разбора """
+    row: int
+    data: dict[str, Any] | None
+    error: str | None = None
+
+
+async def iter_lines(stream: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """
+    Режет поток байтов на строки, не собирая тело целиком в памяти.
+    В буфере остается только незавершенная строка.
+    """
+    buffer = b''
+    first = True
+    async for chunk in stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            text = line.decode('utf-8', errors='replace').rstrip('\r')
+            if first:
+                text, first = text.lstrip('\ufeff'), False
+            yield text
+    if buffer:
+        text = buffer.decode('utf-8', errors='replace').rstrip('\r')
+        yield text.lstrip('\ufeff') if first else text
+
+
+async def iter_ndjson_records(stream: AsyncIterable[bytes]) -> AsyncIterator[ImportRecord]:
+    """ NDJSON: один JSON-объект на строку, пустые строки пропускаются """
+    row = 0
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as error:
+            yield ImportRecord(row, None, f'Invalid JSON: {error.msg}')
+            continue
+        if not isinstance(data, dict):
+            yield ImportRecord(row, None, 'Expected a JSON object')
+            continue
+        yield ImportRecord(row, data)
+
+
+async def iter_csv_records(stream: AsyncIterable[bytes]) -> AsyncIterator[ImportRecord]:
+    """
+    CSV с заголовком. Запись в кавычках может занимать несколько строк:
+    строки копятся, пока число кавычек не станет четным.
+    Пустые значения превращаются в None.
+    """
+    header: list[str] | None = None
+    row = 0
+    pending: list[str] = []
+    async for line in iter_lines(stream):
+        pending.append(line)
+        if sum(part.count('"') for part in pending) % 2:
+            continue
+        text, pending = '\n'.join(pending), []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield ImportRecord(row, None, f'Expected {len(header)} columns, got {len(values)}')
+            continue
+        yield ImportRecord(row, {name: value if value != '' else None for name, value in zip(header, values)})
+    if pending:
+        yield ImportRecord(row + 1, None, 'Unterminated quoted field')
+
+
+async def chunked(records: AsyncIterable[ImportRecord], size: int) -> AsyncIterator[list[ImportRecord]]:
+    """ Группирует записи в списки по size штук """
+    chunk = []
+    async for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
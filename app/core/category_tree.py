@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable
+
+from app.config import CATEGORY_TREE_CHECK_SECONDS
+from app.repositories.category_repo import CategoryRepository
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryNode:
+    id: int
+    name: str
+    parent_id: int | None
+
+
+class CategoryTree:
+    """
+    Неизменяемый снимок дерева активных категорий.
+    Отвечает на запросы parent / ancestors / descendants без обращения к БД
+    и хранит заранее сериализованное тело ответа GET /categories/tree.
+    """
+    def __init__(self, categories: Iterable, version: tuple[int, int]):
+        self.version = version
+        self._nodes: dict[int, CategoryNode] = {
+            category.id: CategoryNode(category.id, category.name, category.parent_id)
+            for category in categories
+        }
+        children: dict[int | None, list[int]] = {}
+        for node in self._nodes.values():
+            # Родитель неактивен или отсутствует — узел становится корнем
+            parent_id = node.parent_id if node.parent_id in self._nodes else None
+            children.setdefault(parent_id, []).append(node.id)
+        self._children = {parent_id: tuple(sorted(ids)) for parent_id, ids in children.items()}
+        self.body: bytes = json.dumps(self._serialize(None), separators=(',', ':')).encode()
+
+    def _serialize(self, parent_id: int | None) -> list[dict]:
+        return [
+            {'id': node_id,
+             'name': self._nodes[node_id].name,
+             'parent_id': self._nodes[node_id].parent_id,
+             'children': self._serialize(node_id)}
+            for node_id in self._children.get(parent_id, ())
+        ]
+
+    def __contains__(self, id_: int) -> bool:
+        return id_ in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def get(self, id_: int) -> CategoryNode | None:
+        return self._nodes.get(id_)
+
+    def parent(self, id_: int) -> CategoryNode | None:
+        node = self._nodes.get(id_)
+        return self._nodes.get(node.parent_id) if node and node.parent_id is not None else None
+
+    def ancestors(self, id_: int) -> list[CategoryNode]:
+        """ Родители категории от ближайшего до корня """
+        result, parent = [], self.parent(id_)
+        while parent is not None and len(result) < len(self._nodes):
+            result.append(parent)
+            parent = self.parent(parent.id)
+        return result
+
+    def descendants(self, id_: int) -> list[CategoryNode]:
+        """ Все потомки категории (обход в ширину) """
+        result, queue = [], deque(self._children.get(id_, ()))
+        while queue:
+            node_id = queue.popleft()
+            result.append(self._nodes[node_id])
+            queue.extend(self._children.get(node_id, ()))
+        return result
+
+
+class CategoryTreeHolder:
+    """
+    Хранит текущий снимок дерева категорий процесса.
+    Перестроение создает новый CategoryTree и подменяет ссылку целиком,
+    поэтому читатели никогда не видят частично собранное дерево.
+    Запись в другом воркере этот процесс не видит, поэтому не чаще раза в check_interval
+    секунд версия снимка сверяется с версией таблицы в БД; снимок отстает не дольше этого.
+    """
+    def __init__(self, check_interval: float = CATEGORY_TREE_CHECK_SECONDS, clock=time.monotonic):
+        self.check_interval = check_interval
+        self._clock = clock
+        self._tree: CategoryTree | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tree is not None
+
+    def _fresh(self, tree: CategoryTree | None) -> bool:
+        return tree is not None and self._clock() - self._checked_at < self.check_interval
+
+    async def _load(self, repository: CategoryRepository, version: tuple[int, int]) -> CategoryTree:
+        # Версия читается до строк: запись между запросами приведет лишь к лишнему перестроению
+        self._tree = CategoryTree(await repository.get_all(), version=version)
+        self._checked_at = self._clock()
+        return self._tree
+
+    async def rebuild(self, repository: CategoryRepository) -> CategoryTree:
+        """ Загружает активные категории и атомарно подменяет снимок """
+        async with self._lock:
+            return await self._load(repository, await repository.get_tree_version())
+
+    def invalidate(self):
+        """ Сбрасывает снимок: следующее обращение загрузит его из БД заново """
+        self._tree = None
+
+    async def get(self, repository: CategoryRepository) -> CategoryTree:
+        """ Возвращает снимок, загружая его при первом обращении и перестраивая, если БД изменилась """
+        tree = self._tree
+        if self._fresh(tree):
+            return tree
+        async with self._lock:
+            tree = self._tree
+            if self._fresh(tree):
+                # Пока ждали блокировку, версию уже сверил другой запрос
+                return tree
+            version = await repository.get_tree_version()
+            if tree is not None and tree.version == version:
+                self._checked_at = self._clock()
+                return tree
+            return await self._load(repository, version)
+
+
+category_tree = CategoryTreeHolder()
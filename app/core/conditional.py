@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import blake2b
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+@dataclass(frozen=True, slots=True)
+class Validators:
+    """ Валидаторы представления для условных GET: ETag и Last-Modified """
+    etag: str
+    last_modified: datetime | None = None
+
+    @classmethod
+    def build(cls, *version_parts, last_modified: datetime | None = None) -> 'Validators':
+        """ Сильный ETag из частей версии (id, version, параметры запроса ...) """
+        digest = blake2b('|'.join(map(str, version_parts)).encode(), digest_size=12).hexdigest()
+        if last_modified is not None and last_modified.tzinfo is None:
+            # SQLite отдает время без зоны, в базе оно хранится в UTC
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return cls(f'"{digest}"', last_modified)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {'ETag': self.etag}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = format_datetime(self.last_modified.astimezone(timezone.utc), usegmt=True)
+        return headers
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """ Слабое сравнение (RFC 9110, If-None-Match): W/ префикс не учитывается """
+    if if_none_match.strip() == '*':
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(','))
+    return etag in (tag.removeprefix('W/') for tag in candidates)
+
+
+def is_conditional(request: Request) -> bool:
+    """ Есть ли в запросе условные заголовки: без них проверять версию заранее незачем """
+    return 'if-none-match' in request.headers or 'if-modified-since' in request.headers
+
+
+def is_not_modified(request: Request, validators: Validators) -> bool:
+    """
+    Можно ли ответить 304. If-None-Match важнее If-Modified-Since:
+    второй проверяется, только если первого нет.
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, validators.etag)
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since and validators.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP-дата с точностью до секунды
+        return validators.last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=304, headers=validators.headers)
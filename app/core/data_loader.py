@@ -0,0 +1,101 @@
+import asyncio
+from functools import partial
+from collections.abc import Awaitable, Callable, Hashable, Iterable, Mapping
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Ключи session.info: загрузчики сессии по имени и общая блокировка их запросов
+LOADERS_KEY = 'data_loaders'
+LOADERS_LOCK_KEY = 'data_loaders_lock'
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+BatchLoad = Callable[[list[K]], Awaitable[Mapping[K, V]]]
+
+
+class DataLoader(Generic[K, V]):
+    """
+    Загрузчик с пакетированием: load(key), вызванные в одном тике event loop,
+    объединяются в один batch_load(keys), а повторные ключи берутся из кэша загрузчика.
+    Загрузчик живет в сессии запроса (for_session), поэтому кэш не переживает запрос.
+    AsyncSession не допускает параллельных запросов, поэтому загрузчики одной сессии
+    выполняют batch_load по очереди под общей блокировкой.
+    Отмена одного вызывающего не отменяет общий future ключа: остальные ожидающие
+    его ключа получат значение, а отмененный future (если пакет отменили целиком) не остается в кэше.
+    """
+    def __init__(self, batch_load: BatchLoad, lock: asyncio.Lock | None = None):
+        self._batch_load = batch_load
+        self._lock = lock or asyncio.Lock()
+        self._futures: dict[K, asyncio.Future] = {}
+        self._pending: list[tuple[K, asyncio.Future]] = []
+        # Ссылки на задачи пакетов: event loop держит задачи только слабыми ссылками
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def for_session(cls, session: AsyncSession, name: str, batch_load: BatchLoad) -> 'DataLoader':
+        """ Загрузчик name этой сессии; создается при первом обращении """
+        loaders = session.info.setdefault(LOADERS_KEY, {})
+        loader = loaders.get(name)
+        if loader is None:
+            lock = session.info.setdefault(LOADERS_LOCK_KEY, asyncio.Lock())
+            loader = loaders[name] = cls(batch_load, lock)
+        return loader
+
+    async def load(self, key: K) -> V | None:
+        """ Значение по ключу или None, если batch_load его не вернул """
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            future.add_done_callback(partial(self._drop_cancelled, key))
+            self._pending.append((key, future))
+            if len(self._pending) == 1:
+                # Пакет уходит на следующей итерации цикла, когда все load текущего тика уже в очереди
+                loop.call_soon(self._start_dispatch)
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[K]) -> list[V | None]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def forget(self, key: K):
+        """ Убирает ключ из кэша: следующий load снова пойдет в БД (после записи строки) """
+        future = self._futures.get(key)
+        if future is not None and future.done():
+            del self._futures[key]
+
+    def _drop_cancelled(self, key: K, future: asyncio.Future):
+        if future.cancelled() and self._futures.get(key) is future:
+            del self._futures[key]
+
+    def _start_dispatch(self):
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        batch, self._pending = self._pending, []
+        try:
+            async with self._lock:
+                values = await self._batch_load([key for key, _ in batch])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as error:
+            for key, future in batch:
+                # Ошибка не кэшируется: следующий load повторит запрос
+                if self._futures.get(key) is future:
+                    del self._futures[key]
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for key, future in batch:
+            if not future.done():
+                future.set_result(values.get(key))
+
+
+def by_id(rows: Iterable[Any]) -> dict[Any, Any]:
+    """ Строки batch_load в словарь по id """
+    return {row.id: row for row in rows}
@@ -1,5 +1,6 @@
 from fastapi import Depends
 
+from app.core.category_tree import category_tree
 from app.core.dependecies.repositories.category_repository import get_category_repository
 from app.repositories.category_repo import CategoryRepository
 from app.services.category_service import CategoryService
@@ -9,6 +10,7 @@ def get_category_service(
         repository: CategoryRepository = Depends(get_category_repository),
 ) -> CategoryService:
     """
-    Constructs an CategoryService instance with injected CategoryRepository.
+    Constructs an CategoryService instance with injected CategoryRepository
+    and process-wide category tree snapshot.
     """
-    return CategoryService(repository)
\ No newline at end of file
+    return CategoryService(repository, category_tree)
\ No newline at end of file
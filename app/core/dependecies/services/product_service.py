@@ -4,6 +4,8 @@ from app.core.dependecies.repositories.product_repository import get_product_rep
 from app.core.dependecies.repositories.category_repository import get_category_repository
 from app.core.dependecies.repositories.review_repository import get_review_repository
 
+from app.core.product_suggest import product_suggest_index
+from app.core.response_cache import product_list_cache
 from app.repositories.products_repo import ProductRepository
 from app.repositories.category_repo import CategoryRepository
 from app.repositories.review_repo import ReviewRepository
@@ -22,5 +24,7 @@ def get_product_service(
     return ProductService(
         product_repository=product_repository,
         review_repository=review_repository,
-        category_repository=category_repository
+        category_repository=category_repository,
+        suggest_index=product_suggest_index,
+        response_cache=product_list_cache
     )
\ No newline at end of file
@@ -55,4 +55,32 @@ class AccessDenied(HTTPException):
     def __init__(self):
         super().__init__(status_code=403,
                          detail='Access forbidden, you are not seller or admin')
-        self.error_code = 'ACCESS_DENIED'
\ No newline at end of file
+        self.error_code = 'ACCESS_DENIED'
+
+class PasswordHashingBusy(HTTPException):
+    """
+    Ошибка, если очередь хеширования паролей переполнена.
+    """
+    def __init__(self):
+        super().__init__(status_code=503,
+                         detail='Too many authentication requests, try again later',
+                         headers={'Retry-After': '1'})
+        self.error_code = 'PASSWORD_HASHING_BUSY'
+
+class UnsupportedImportFormat(HTTPException):
+    """
+    Ошибка, если файл импорта не NDJSON и не CSV.
+    """
+    def __init__(self):
+        super().__init__(status_code=415,
+                         detail='Import accepts application/x-ndjson or text/csv')
+        self.error_code = 'UNSUPPORTED_IMPORT_FORMAT'
+
+class InvalidProductIds(HTTPException):
+    """
+    Ошибка, если в GET /products/batch не целые id или их слишком много.
+    """
+    def __init__(self, max_ids: int):
+        super().__init__(status_code=422,
+                         detail=f'ids must be 1 to {max_ids} integers, comma-separated or repeated')
+        self.error_code = 'INVALID_PRODUCT_IDS'
@@ -0,0 +1,76 @@
+import csv
+import io
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator
+from typing import Literal
+
+from pydantic import BaseModel
+from starlette.responses import StreamingResponse
+
+ExportFormat = Literal['ndjson', 'csv']
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Строк в одном куске ответа
+EXPORT_CHUNK_ROWS = 1000
+
+
+async def _batches(items: AsyncIterable, size: int) -> AsyncIterator[list]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def ndjson_chunks(items: AsyncIterable, schema: type[BaseModel],
+                        chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """ Сериализует объекты в NDJSON кусками по chunk_rows строк """
+    async for batch in _batches(items, chunk_rows):
+        yield b''.join(schema.model_validate(item).model_dump_json().encode() + b'\n' for item in batch)
+
+
+async def csv_chunks(items: AsyncIterable, schema: type[BaseModel],
+                     chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """ Сериализует объекты в CSV с заголовком из полей схемы кусками по chunk_rows строк """
+    fields = list(schema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for batch in _batches(items, chunk_rows):
+        for item in batch:
+            row = schema.model_validate(item).model_dump(mode='json')
+            writer.writerow(row[field] for field in fields)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Пустая выборка: только заголовок
+        yield buffer.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """ Сжимает поток кусков gzip'ом на лету """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(items: AsyncIterable, schema: type[BaseModel], name: str,
+                    format_: ExportFormat = 'ndjson', gzip: bool = False) -> StreamingResponse:
+    """
+    Потоковый ответ выгрузки: куски пишутся по мере чтения строк из БД,
+    поэтому память не зависит от размера таблицы.
+    """
+    chunks = ndjson_chunks(items, schema) if format_ == 'ndjson' else csv_chunks(items, schema)
+    headers = {'Content-Disposition': f'attachment; filename="{name}.{format_}"'}
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format_], headers=headers)
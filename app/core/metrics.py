@@ -0,0 +1,221 @@
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.sql_instrumentation import current_sql_stats
+
+# Границы корзин гистограммы длительности запроса, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Границы корзин числа SQL-выражений на запрос
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Метка маршрута для путей, которые не совпали ни с одним маршрутом (иначе сканеры раздуют число серий)
+UNMATCHED_ROUTE = '<unmatched>'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names: Labels, values: Labels) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric:
+    """
+    Метрика с сериями по значениям меток. Значения меток передаются кортежем в порядке labelnames.
+    Счетчики не берут блокировок: их меняет только поток event loop воркера,
+    поэтому каждый процесс отдает свои значения.
+    """
+    type_ = 'untyped'
+
+    def __init__(self, name: str, help_: str, labelnames: Labels = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = labelnames
+        self.values: dict[Labels, float] = {}
+
+    def set(self, labels: Labels, value: float):
+        self.values[labels] = value
+
+    def samples(self) -> Iterator[tuple[str, Labels, Labels, float]]:
+        for labels, value in self.values.items():
+            yield self.name, self.labelnames, labels, value
+
+
+class Counter(Metric):
+    type_ = 'counter'
+
+    def inc(self, labels: Labels = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    type_ = 'gauge'
+
+    def dec(self, labels: Labels = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    """ Гистограмма: observe находит корзину двоичным поиском, накопленные суммы считаются только при выгрузке """
+    type_ = 'histogram'
+
+    def __init__(self, name: str, help_: str, labelnames: Labels = (), buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Метки -> [число наблюдений в каждой корзине и в +Inf, сумма]
+        self.series: dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self) -> Iterator[tuple[str, Labels, Labels, float]]:
+        names = self.labelnames + ('le',)
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f'{self.name}_bucket', names, labels + (_format_value(bound),), cumulative
+            yield f'{self.name}_sum', self.labelnames, labels, total
+            yield f'{self.name}_count', self.labelnames, labels, cumulative
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса. Значения, которые дешевле прочитать, чем поддерживать
+    (состояние пула, счетчики кэшей), выставляют коллекторы при каждой выгрузке.
+    """
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_: str, labelnames: Labels = ()) -> Counter:
+        return self._register(Counter(name, help_, labelnames))
+
+    def gauge(self, name: str, help_: str, labelnames: Labels = ()) -> Gauge:
+        return self._register(Gauge(name, help_, labelnames))
+
+    def histogram(self, name: str, help_: str, labelnames: Labels = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """ Текстовый формат Prometheus 0.0.4 """
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_}')
+            for name, labelnames, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter('http_requests_total', 'HTTP requests by route template and status.',
+                                 ('method', 'route', 'status'))
+http_request_duration = registry.histogram('http_request_duration_seconds',
+                                           'Time until the response body is sent.', ('method', 'route'))
+http_requests_in_progress = registry.gauge('http_requests_in_progress', 'Requests being handled right now.',
+                                           ('method', 'route'))
+db_statements = registry.counter('db_statements_total', 'SQL statements executed by requests.', ('route',))
+db_statements_per_request = registry.histogram('db_statements_per_request', 'SQL statements per request.',
+                                               ('route',), buckets=STATEMENT_BUCKETS)
+db_time = registry.counter('db_time_seconds_total', 'Time requests spent in SQL statements.', ('route',))
+db_pool_wait = registry.counter('db_pool_wait_seconds_total', 'Time requests waited for a pooled connection.',
+                                ('route',))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: счетчик, гистограмма длительности и число запросов в работе по шаблону маршрута.
+    Шаблон находится до вызова приложения, чтобы учитывать запросы в работе; для путей без параметров
+    он запоминается, и повторный поиск по маршрутам не нужен.
+    SQL-метрики берутся из SQLStats запроса, поэтому middleware должен стоять внутри
+    SQLInstrumentationMiddleware.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._static_routes: dict[tuple[str, str], str] = {}
+
+    def _route_template(self, scope: Scope) -> str:
+        key = (scope['method'], scope['path'])
+        template = self._static_routes.get(key)
+        if template is not None:
+            return template
+        template = partial = None
+        for route in scope['app'].router.routes:
+            match, _ = route.matches(scope)
+            if match is Match.FULL:
+                template = route.path
+                break
+            if match is Match.PARTIAL and partial is None:
+                partial = route.path
+        template = template or partial or UNMATCHED_ROUTE
+        if template == scope['path']:
+            self._static_routes[key] = template
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        route = self._route_template(scope)
+        labels = (method, route)
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.perf_counter()
+        http_requests_in_progress.inc(labels)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(labels)
+            http_request_duration.observe(labels, time.perf_counter() - started)
+            http_requests.inc((method, route, str(status)))
+            stats = current_sql_stats()
+            if stats is not None:
+                db_statements.inc((route,), stats.statements)
+                db_statements_per_request.observe((route,), stats.statements)
+                db_time.inc((route,), stats.db_time)
+                db_pool_wait.inc((route,), stats.pool_wait)
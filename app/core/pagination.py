@@ -0,0 +1,50 @@
+from typing import TypeVar
+
+from fastapi_filter.contrib.sqlalchemy import Filter as SQLAlchemyFilter
+from fastapi_pagination.bases import CursorRawParams
+from fastapi_pagination.cursor import CursorPage, CursorParams
+from fastapi_pagination.customization import (CustomizedPage, UseName, UseParams,
+                                              UseIncludeTotal, UseExcludedFields)
+from sqlalchemy import Select
+
+from app.database import Base
+
+T = TypeVar('T')
+
+
+class KeysetParams(CursorParams):
+    """
+    Параметры курсорной (keyset) пагинации.
+    В отличие от CursorParams не запускает COUNT(*) по выборке.
+    """
+    def to_raw_params(self) -> CursorRawParams:
+        raw_params = super().to_raw_params()
+        raw_params.include_total = False
+        return raw_params
+
+
+# Страница для курсорной пагинации: курсоры на соседние страницы и без total
+KeysetPage = CustomizedPage[
+    CursorPage[T],
+    UseName('KeysetPage'),
+    UseParams(KeysetParams),
+    UseIncludeTotal(False),
+    UseExcludedFields('total'),
+]
+
+
+def apply_keyset_order(query: Select,
+                       model: type[Base],
+                       filter_: SQLAlchemyFilter | None = None) -> Select:
+    """
+    Готовит запрос к курсорной (keyset) пагинации.
+    Применяет сортировку из filter_.order_by и добавляет уникальный id
+    последним ключом, чтобы курсор однозначно указывал на строку.
+    """
+    ordering = []
+    if filter_ is not None:
+        query = filter_.sort(query)
+        ordering = [field.lstrip('+-') for field in filter_.ordering_values or []]
+    if 'id' not in ordering:
+        query = query.order_by(model.id)
+    return query
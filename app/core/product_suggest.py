@@ -0,0 +1,376 @@
+import asyncio
+import heapq
+import re
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import SUGGEST_REFRESH_OVERLAP_SECONDS, SUGGEST_REFRESH_SECONDS
+from app.core.cache import TTLCache
+
+# Ключ session.info, где копятся изменения товаров до commit
+PENDING_KEY = 'product_suggest_pending'
+
+_WORD_RE = re.compile(r'\w+')
+# Больше любого символа слова: (prefix + _MAX_CHAR,) — верхняя граница диапазона префикса
+_MAX_CHAR = '\U0010ffff'
+
+
+def normalize_words(text: str) -> list[str]:
+    return _WORD_RE.findall(text.casefold())
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """ Расстояние Дамерау-Левенштейна между строками не больше 1 """
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if i == len(a):
+        return True
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:])
+    return a[i:] == b[i + 1:]
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    id: int
+    name: str
+    rating: float
+
+
+class ProductSuggestIndex:
+    """
+    Префиксный индекс по словам названий активных товаров для автодополнения.
+    Хранит отсортированный массив пар (слово, ключ рейтинга товара) и товары в порядке рейтинга:
+    - узкий префикс: его диапазон в массиве слов (бинарный поиск) состоит из отрезков
+      отдельных слов, уже упорядоченных по рейтингу; их слияние останавливается,
+      как только наберется limit подходящих товаров;
+    - широкий префикс (больше scan_threshold вхождений): товары перебираются
+      по убыванию рейтинга, пока не наберется limit подходящих.
+    Допускает одну опечатку в слове запроса (пропуск, лишний символ, замена
+    или перестановка соседних), если точных совпадений не хватает.
+    Результаты ранжируются по числу опечаток, затем по рейтингу.
+    Обновляется инкрементально после commit сессии, которая меняла товары. Изменения
+    других процессов (воркеров, скриптов) не чаще раза в refresh_interval секунд подтягиваются
+    из БД по updated_at: перечитываются строки новее последней виденной минус refresh_overlap,
+    чтобы не потерять транзакции, которые начались раньше, а закоммитились позже.
+    """
+    def __init__(self, max_typos: int = 1, min_typo_length: int = 3,
+                 scan_threshold: int = 5000, cache_size: int = 1024,
+                 refresh_interval: float = SUGGEST_REFRESH_SECONDS,
+                 refresh_overlap: float = SUGGEST_REFRESH_OVERLAP_SECONDS, clock=time.monotonic):
+        self.max_typos = max_typos
+        self.min_typo_length = min_typo_length
+        self.scan_threshold = scan_threshold
+        self._entries: dict[int, Suggestion] = {}
+        self._product_words: dict[int, tuple[str, ...]] = {}
+        # ' слово1 слово2': проверка «какое-то слово начинается с term» — поиск подстроки ' ' + term
+        self._product_text: dict[int, str] = {}
+        self._words: list[tuple[str, tuple[float, str, int]]] = []
+        self._by_rating: list[tuple[float, str, int]] = []
+        self._results = TTLCache(maxsize=cache_size, ttl=300)
+        self.refresh_interval = refresh_interval
+        self.refresh_overlap = timedelta(seconds=refresh_overlap)
+        self._clock = clock
+        # Самый новый updated_at из прочитанных строк и время последней сверки с БД
+        self._synced_to: datetime | None = None
+        self._refreshed_at = 0.0
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def result_cache(self) -> TTLCache:
+        """ Кэш готовых подсказок (для метрик попаданий) """
+        return self._results
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, id_: int) -> bool:
+        return id_ in self._entries
+
+    def load(self, products: Iterable):
+        """ Полностью перестраивает индекс по строкам (id, name, rating) """
+        entries = {product.id: Suggestion(product.id, product.name, product.rating or 0.0)
+                   for product in products}
+        product_words = {id_: tuple(set(normalize_words(entry.name))) for id_, entry in entries.items()}
+        ranks = {id_: self._rank_key(entry) for id_, entry in entries.items()}
+        self._words = sorted((word, ranks[id_]) for id_, words in product_words.items() for word in words)
+        self._by_rating = sorted(ranks.values())
+        self._entries, self._product_words = entries, product_words
+        self._product_text = {id_: self._text(words) for id_, words in product_words.items()}
+        self._results.clear()
+        self._loaded = True
+
+    def apply(self, rows: Iterable):
+        """ Применяет строки (id, name, rating, is_active): неактивные удаляются, остальные обновляются """
+        for row in rows:
+            entry = self._entries.get(row.id)
+            if not row.is_active:
+                self.remove(row.id)
+            elif entry is None or entry.name != row.name:
+                self.upsert(row.id, row.name, row.rating)
+            else:
+                self.update_rating(row.id, row.rating or 0.0)
+
+    def _synced(self, rows: list):
+        seen = [row.updated_at for row in rows if row.updated_at is not None]
+        self._synced_to = max(seen + [self._synced_to] if self._synced_to is not None else seen, default=None)
+        self._refreshed_at = self._clock()
+
+    async def rebuild(self, repository) -> 'ProductSuggestIndex':
+        """ Загружает активные товары из ProductRepository """
+        async with self._lock:
+            rows = await repository.get_suggestion_rows()
+            self.load(rows)
+            self._synced(rows)
+            return self
+
+    async def refresh(self, repository) -> 'ProductSuggestIndex':
+        """ Применяет изменения товаров, закоммиченные после последней сверки, в том числе другими процессами """
+        async with self._lock:
+            if self._clock() - self._refreshed_at < self.refresh_interval:
+                # Пока ждали блокировку, изменения уже применил другой запрос
+                return self
+            since = self._synced_to - self.refresh_overlap if self._synced_to is not None else None
+            rows = await repository.get_suggestion_changes(since)
+            self.apply(rows)
+            self._synced(rows)
+            return self
+
+    async def ensure_fresh(self, repository) -> 'ProductSuggestIndex':
+        """
+        Загружает индекс при первом обращении, если он не был загружен при старте,
+        и подтягивает чужие изменения, если с последней сверки прошло refresh_interval секунд
+        """
+        if not self._loaded:
+            await self.rebuild(repository)
+        elif self._clock() - self._refreshed_at >= self.refresh_interval:
+            await self.refresh(repository)
+        return self
+
+    def invalidate(self):
+        """ Сбрасывает индекс: следующее обращение загрузит его из БД заново """
+        self.load(())
+        self._loaded = False
+        self._synced_to = None
+
+    @staticmethod
+    def _text(words: tuple[str, ...]) -> str:
+        return ' ' + ' '.join(words)
+
+    @staticmethod
+    def _rank_key(entry: Suggestion) -> tuple[float, str, int]:
+        return -entry.rating, entry.name, entry.id
+
+    def upsert(self, id_: int, name: str, rating: float):
+        self.remove(id_)
+        entry = Suggestion(id_, name, rating or 0.0)
+        self._entries[id_] = entry
+        self._product_words[id_] = words = tuple(set(normalize_words(name)))
+        self._product_text[id_] = self._text(words)
+        self._insert_rank(words, self._rank_key(entry))
+        self._results.clear()
+
+    def update_rating(self, id_: int, rating: float):
+        entry = self._entries.get(id_)
+        if entry is not None and entry.rating != rating:
+            words = self._product_words[id_]
+            self._remove_rank(words, self._rank_key(entry))
+            self._entries[id_] = entry = Suggestion(id_, entry.name, rating)
+            self._insert_rank(words, self._rank_key(entry))
+            self._results.clear()
+
+    def remove(self, id_: int):
+        entry = self._entries.pop(id_, None)
+        if entry is None:
+            return
+        del self._product_text[id_]
+        self._remove_rank(self._product_words.pop(id_), self._rank_key(entry))
+        self._results.clear()
+
+    def _insert_rank(self, words: tuple[str, ...], rank: tuple[float, str, int]):
+        for word in words:
+            insort(self._words, (word, rank))
+        insort(self._by_rating, rank)
+
+    def _remove_rank(self, words: tuple[str, ...], rank: tuple[float, str, int]):
+        for word in words:
+            self._remove_sorted(self._words, (word, rank))
+        self._remove_sorted(self._by_rating, rank)
+
+    @staticmethod
+    def _remove_sorted(items: list, item):
+        position = bisect_left(items, item)
+        if position < len(items) and items[position] == item:
+            del items[position]
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        """ Диапазон массива слов, которые начинаются с prefix """
+        return bisect_left(self._words, (prefix,)), bisect_left(self._words, (prefix + _MAX_CHAR,))
+
+    def _next_chars(self, prefix: str) -> list[str]:
+        """ Символы, которые встречаются в словаре сразу после prefix """
+        words, chars = self._words, []
+        position, end = bisect_left(words, (prefix + '\0',)), bisect_left(words, (prefix + _MAX_CHAR,))
+        while position < end:
+            char = words[position][0][len(prefix)]
+            chars.append(char)
+            position = bisect_left(words, (prefix + char + _MAX_CHAR,), position, end)
+        return chars
+
+    def _runs(self, ranges: list[tuple[tuple[int, int], int]]) -> list[Iterator]:
+        """ Диапазоны массива слов, разбитые на отрезки одного слова: внутри отрезка товары идут по рейтингу """
+        words, runs = self._words, []
+        for (start, end), typos in ranges:
+            while start < end:
+                # (слово + '\0',) больше всех пар этого слова и меньше пар слов, которые его продолжают
+                run_end = bisect_left(words, (words[start][0] + '\0',), start, end)
+                runs.append(self._run(start, run_end, typos))
+                start = run_end
+        return runs
+
+    def _run(self, start: int, end: int, typos: int) -> Iterator[tuple[tuple[float, str, int], int]]:
+        words = self._words
+        for position in range(start, end):
+            yield words[position][1], typos
+
+    def _typo_variants(self, term: str) -> set[str]:
+        """
+        Префиксы словаря на расстоянии одной правки от term.
+        Замены и вставки перебирают только символы, которые реально продолжают префикс в словаре.
+        """
+        variants = {term[:i] + term[i + 1:] for i in range(len(term))}
+        variants |= {term[:i] + term[i + 1] + term[i] + term[i + 2:] for i in range(len(term) - 1)}
+        for i in range(len(term) + 1):
+            for char in self._next_chars(term[:i]):
+                variants.add(term[:i] + char + term[i + 1:])
+                variants.add(term[:i] + char + term[i:])
+        variants.discard(term)
+        return {variant for variant in variants if len(variant) >= self.min_typo_length}
+
+    def _word_typos(self, id_: int, term: str, with_typos: bool) -> int | None:
+        """ 0, если слово товара начинается с term; 1, если с опечаткой; None, если нет """
+        if ' ' + term in self._product_text[id_]:
+            return 0
+        if with_typos and len(term) >= self.min_typo_length:
+            size = len(term)
+            for word in self._product_words[id_]:
+                if any(within_one_edit(term, word[:n]) for n in (size - 1, size, size + 1) if n <= len(word)):
+                    return 1
+        return None
+
+    def _typos(self, id_: int, terms: list[str], with_typos: bool, total: int = 0) -> int | None:
+        for term in terms:
+            typos = self._word_typos(id_, term, with_typos)
+            if typos is None:
+                return None
+            total += typos
+            if total > self.max_typos:
+                return None
+        return total
+
+    def _search(self, terms: list[str], limit: int, with_typos: bool,
+                exclude: frozenset[int] = frozenset()) -> list[Suggestion]:
+        # Самое избирательное слово запроса дает кандидатов, остальные слова проверяются на них
+        best_term, best_ranges, best_size = None, None, None
+        for term in terms:
+            ranges = [(self._range(term), 0)]
+            if with_typos and len(term) >= self.min_typo_length:
+                ranges += [(self._range(variant), 1) for variant in self._typo_variants(term)]
+            size = sum(end - start for (start, end), _ in ranges)
+            if best_size is None or size < best_size:
+                best_term, best_ranges, best_size = term, ranges, size
+        if not best_size:
+            return []
+
+        if best_size > self.scan_threshold and not with_typos:
+            # Широкий префикс: перебор по убыванию рейтинга, каждое слово запроса проверяется на товаре
+            candidates, check_terms = ((rank, 0) for rank in self._by_rating), terms
+        else:
+            # Слияние отрезков слов дает кандидатов по убыванию рейтинга, остальные слова проверяются на них
+            candidates = heapq.merge(*self._runs(best_ranges))
+            check_terms = [term for term in terms if term != best_term]
+        # С опечатками точные совпадения уже в exclude: меньше одной опечатки у кандидатов не будет
+        best_typos, found = int(with_typos), 0
+        ranked, seen = [], set(exclude)
+        for rank, typos in candidates:
+            id_ = rank[-1]
+            if id_ in seen:
+                continue
+            seen.add(id_)
+            if check_terms and (typos := self._typos(id_, check_terms, with_typos, typos)) is None:
+                continue
+            ranked.append((typos, rank))
+            if typos == best_typos:
+                # Следующие кандидаты не лучше ни по опечаткам, ни по рейтингу
+                found += 1
+                if found >= limit:
+                    break
+        return [self._entries[rank[-1]] for _, rank in heapq.nsmallest(limit, ranked)]
+
+    def suggest(self, query: str, limit: int = 10) -> list[Suggestion]:
+        """ До limit товаров, в названии которых каждое слово запроса является префиксом слова """
+        terms = normalize_words(query)
+        if not terms:
+            return []
+        key = (' '.join(terms), limit)
+        result = self._results.get(key)
+        if result is None:
+            result = self._search(terms, limit, with_typos=False)
+            if len(result) < limit and self.max_typos:
+                # Точных совпадений не хватило: добираем совпадения с опечаткой
+                exact = frozenset(entry.id for entry in result)
+                result += self._search(terms, limit - len(result), with_typos=True, exclude=exact)
+            self._results.set(key, result)
+        return result
+
+
+product_suggest_index = ProductSuggestIndex()
+
+
+def track_product_change(session: Session, product):
+    """
+    Запоминает изменение товара в сессии. В индекс оно попадет после commit,
+    при rollback будет отброшено.
+    """
+    session.info.setdefault(PENDING_KEY, {})[product.id] = (product.name, product.rating, product.is_active)
+
+
+def track_rating_change(session: Session, id_: int, rating: float):
+    pending = session.info.setdefault(PENDING_KEY, {})
+    name, _, is_active = pending.get(id_, (None, None, True))
+    pending[id_] = (name, rating, is_active)
+
+
+@event.listens_for(Session, 'after_commit')
+def apply_pending_changes(session: Session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending or not product_suggest_index.loaded:
+        return
+    for id_, (name, rating, is_active) in pending.items():
+        if not is_active:
+            product_suggest_index.remove(id_)
+        elif name is None:
+            product_suggest_index.update_rating(id_, rating)
+        else:
+            product_suggest_index.upsert(id_, name, rating)
+
+
+@event.listens_for(Session, 'after_rollback')
+def drop_pending_changes(session: Session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,195 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+LagProbe = Callable[[AsyncConnection], Awaitable[float]]
+
+
+async def postgres_replication_lag(conn: AsyncConnection) -> float:
+    """
+    Отставание реплики PostgreSQL в секундах.
+    На primary (pg_is_in_recovery() = false) отставание равно нулю.
+    """
+    lag = await conn.scalar(text(
+        "SELECT CASE WHEN pg_is_in_recovery() "
+        "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+        "ELSE 0 END"
+    ))
+    return float(lag)
+
+
+class ReplicaSet:
+    """
+    Набор реплик для чтения.
+    Отдает здоровые реплики по кругу; реплика, которая не отвечает
+    или отстает больше max_lag секунд, исключается до следующей проверки.
+    Если здоровых реплик нет, чтение уходит на primary.
+    """
+    def __init__(self,
+                 engines: Sequence[AsyncEngine],
+                 max_lag: float,
+                 check_timeout: float = 2.0,
+                 lag_probe: LagProbe = postgres_replication_lag):
+        self.engines = tuple(engines)
+        self.max_lag = max_lag
+        self.check_timeout = check_timeout
+        self._lag_probe = lag_probe
+        self._healthy: tuple[AsyncEngine, ...] = self.engines
+        self._lags: dict[AsyncEngine, float | None] = {engine: None for engine in self.engines}
+        self._counter = itertools.count()
+
+    def __bool__(self) -> bool:
+        return bool(self.engines)
+
+    @property
+    def healthy(self) -> tuple[AsyncEngine, ...]:
+        return self._healthy
+
+    def choose(self) -> AsyncEngine | None:
+        """ Следующая здоровая реплика или None """
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    async def _probe(self, engine: AsyncEngine) -> float:
+        async with engine.connect() as conn:
+            return await self._lag_probe(conn)
+
+    async def _check_one(self, engine: AsyncEngine) -> float | None:
+        try:
+            return await asyncio.wait_for(self._probe(engine), self.check_timeout)
+        except (OSError, SQLAlchemyError, asyncio.TimeoutError):
+            logger.warning('Replica %s is unavailable', engine.url.render_as_string(), exc_info=True)
+            return None
+
+    async def check(self) -> tuple[AsyncEngine, ...]:
+        """ Проверяет доступность и отставание всех реплик и обновляет список здоровых """
+        lags = await asyncio.gather(*(self._check_one(engine) for engine in self.engines))
+        self._lags = dict(zip(self.engines, lags))
+        self._healthy = tuple(engine for engine, lag in self._lags.items()
+                              if lag is not None and lag <= self.max_lag)
+        return self._healthy
+
+    async def monitor(self, interval: float):
+        """ Периодическая проверка реплик (запускается задачей в lifespan) """
+        while True:
+            await self.check()
+            await asyncio.sleep(interval)
+
+    def status(self) -> list[dict]:
+        healthy = set(self._healthy)
+        return [{'url': engine.url.render_as_string(),
+                 'healthy': engine in healthy,
+                 'lag_seconds': self._lags[engine]}
+                for engine in self.engines]
+
+
+class WritePins:
+    """
+    Read-your-writes: после записи пользователь на window секунд
+    читает только с primary, пока реплики не догонят его изменения.
+    """
+    def __init__(self, window: float, maxsize: int = 100_000):
+        self.window = window
+        self._pins = TTLCache(maxsize=maxsize, ttl=window)
+
+    def pin(self, key: Hashable):
+        if self.window > 0:
+            self._pins.set(key, True)
+
+    def is_pinned(self, key: Hashable) -> bool:
+        return self._pins.get(key, False)
+
+    def clear(self):
+        self._pins.clear()
+
+
+# Cookie со сроком (unix-время), до которого клиент читает только с primary
+PRIMARY_PIN_COOKIE = 'db_primary_until'
+
+
+@dataclass
+class ClientPin:
+    """ Read-your-writes клиента текущего запроса: закреплен ли он за primary и записал ли запрос что-то """
+    pinned: bool = False
+    wrote: bool = False
+
+
+_client_pin: ContextVar[ClientPin | None] = ContextVar('client_pin', default=None)
+
+
+def client_pinned() -> bool:
+    """ Клиент текущего запроса недавно писал: его чтение должно идти на primary """
+    pin = _client_pin.get()
+    return pin is not None and pin.pinned
+
+
+def mark_client_wrote():
+    """ Вызывается сессией (app.database.RoutingSession) после commit с записью """
+    pin = _client_pin.get()
+    if pin is not None:
+        pin.wrote = True
+
+
+class PrimaryPinMiddleware:
+    """
+    ASGI middleware: read-your-writes между процессами и для маршрутов без авторизации.
+    Ответ на запрос, который записал в БД, ставит cookie со сроком now + window;
+    пока срок не вышел, все сессии запросов этого клиента работают с primary, в каком бы воркере они ни шли.
+    Срок дальше now + window (подделанный cookie) не принимается.
+    """
+    def __init__(self, app: ASGIApp, window: float, cookie: str = PRIMARY_PIN_COOKIE,
+                 clock: Callable[[], float] = time.time):
+        self.app = app
+        self.window = window
+        self.cookie = cookie
+        self.clock = clock
+
+    def _pinned(self, scope: Scope, now: float) -> bool:
+        header = next((value for name, value in scope.get('headers', ()) if name == b'cookie'), None)
+        if header is None:
+            return False
+        try:
+            deadline = float(cookie_parser(header.decode('latin-1')).get(self.cookie, ''))
+        except ValueError:
+            return False
+        return now < deadline <= now + self.window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or self.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        pin = ClientPin(pinned=self._pinned(scope, self.clock()))
+
+        async def send_with_pin(message: Message):
+            if message['type'] == 'http.response.start' and pin.wrote:
+                deadline = self.clock() + self.window
+                MutableHeaders(scope=message).append(
+                    'Set-Cookie', f'{self.cookie}={deadline:.3f}; Max-Age={math.ceil(self.window)}; Path=/; '
+                                  f'HttpOnly; SameSite=Lax')
+            await send(message)
+
+        token = _client_pin.set(pin)
+        try:
+            await self.app(scope, receive, send_with_pin)
+        finally:
+            _client_pin.reset(token)
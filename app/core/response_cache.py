@@ -0,0 +1,185 @@
+import json
+from collections.abc import Iterable
+from hashlib import blake2b
+from typing import Any, Protocol
+
+from app.config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_REDIS_URL, RESPONSE_CACHE_TTL_SECONDS, \
+    RESPONSE_CACHE_MAXSIZE
+from app.core.cache import TTLCache
+
+# Тег всех записей: сбрасывается массовыми изменениями (импорт, пересчет рейтингов)
+ALL_TAG = 'products'
+
+
+def category_tag(category_id: int | None) -> str:
+    """ Состав выборки в категории; None — выборка без фильтра по категории """
+    return f"category:{'*' if category_id is None else category_id}"
+
+
+def rating_tag(category_id: int | None) -> str:
+    """ Выборки, которые фильтруют или сортируют по рейтингу """
+    return f"rating:{'*' if category_id is None else category_id}"
+
+
+def product_tag(product_id: int) -> str:
+    return f'product:{product_id}'
+
+
+def canonical_key(namespace: str, *parts: Any) -> str:
+    """
+    Ключ кэша, не зависящий от порядка полей и способа записи запроса:
+    одинаковые фильтры и параметры дают одинаковый ключ.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return f'{namespace}:{blake2b(payload.encode(), digest_size=16).hexdigest()}'
+
+
+class CacheBackend(Protocol):
+    """ Хранилище ключ-значение с TTL и счетчиками версий тегов """
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float): ...
+
+    async def get_counters(self, keys: list[str]) -> list[int]: ...
+
+    async def incr_counters(self, keys: list[str]): ...
+
+    async def clear(self): ...
+
+
+class MemoryCacheBackend:
+    """ LRU с TTL в памяти процесса. Подходит для одного воркера """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self._entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries.set(key, value, ttl)
+
+    async def get_counters(self, keys: list[str]) -> list[int]:
+        return [self._counters.get(key, 0) for key in keys]
+
+    async def incr_counters(self, keys: list[str]):
+        for key in keys:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    async def clear(self):
+        self._entries.clear()
+        self._counters.clear()
+
+
+class RedisCacheBackend:
+    """
+    Хранилище в Redis (или любом сервере с протоколом Redis): кэш общий для всех воркеров.
+    client — клиент с интерфейсом redis.asyncio.Redis: get, set(ex=), mget, incr, pipeline.
+    """
+    def __init__(self, client, prefix: str = 'response-cache:'):
+        self._client = client
+        self._prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(self._prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(self._prefix + key, value, ex=max(1, round(ttl)))
+
+    async def get_counters(self, keys: list[str]) -> list[int]:
+        if not keys:
+            return []
+        values = await self._client.mget([self._prefix + key for key in keys])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def incr_counters(self, keys: list[str]):
+        async with self._client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(self._prefix + key)
+            await pipe.execute()
+
+    async def clear(self):
+        # Только для тестов и локальной разработки: SCAN по префиксу
+        keys = [key async for key in self._client.scan_iter(match=self._prefix + '*')]
+        if keys:
+            await self._client.delete(*keys)
+
+
+class ResponseCache:
+    """
+    Кэш готовых тел ответов с инвалидацией по тегам.
+    Теги версионируются счетчиками: запись хранит версии своих тегов на момент заполнения,
+    а инвалидация тега только увеличивает его счетчик. Записи с устаревшей версией
+    считаются промахом и перезаписываются, поэтому инвалидация не ищет ключи по тегу
+    и одинаково работает в памяти и в Redis.
+    """
+    def __init__(self, backend: CacheBackend, ttl: float = 60, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f'tag:{tag}'
+
+    async def tag_versions(self, tags: Iterable[str]) -> dict[str, int]:
+        """ Снимок версий тегов. Снимок до запроса к БД защищает от гонки с записью во время запроса """
+        tags = sorted(set(tags))
+        return dict(zip(tags, await self.backend.get_counters([self._tag_key(tag) for tag in tags])))
+
+    async def get(self, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        entry = await self.backend.get(key)
+        if entry is not None:
+            header, _, body = entry.partition(b'\n')
+            versions = json.loads(header)
+            if await self.tag_versions(versions) == versions:
+                self.hits += 1
+                return body
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, body: bytes, tags: Iterable[str], versions: dict[str, int] | None = None):
+        """
+        Сохраняет тело с тегами. versions — снимок, сделанный до чтения из БД;
+        теги, которых в нем нет, дочитываются сейчас.
+        """
+        if not self.enabled:
+            return
+        versions = dict(versions or {})
+        missing = set(tags) - versions.keys()
+        if missing:
+            versions |= await self.tag_versions(missing)
+        header = json.dumps(versions, sort_keys=True, separators=(',', ':')).encode()
+        await self.backend.set(key, header + b'\n' + body, self.ttl)
+
+    async def invalidate(self, *tags: str):
+        """ Делает недействительными все записи с любым из тегов. Вызывать после commit """
+        if self.enabled and tags:
+            await self.backend.incr_counters([self._tag_key(tag) for tag in sorted(set(tags))])
+
+    async def clear(self):
+        await self.backend.clear()
+        self.hits = self.misses = 0
+
+
+def build_response_cache(backend: str, ttl: float, maxsize: int, redis_url: str | None = None) -> ResponseCache:
+    """ backend: 'memory', 'redis' или 'off' """
+    if backend == 'redis':
+        try:
+            from redis.asyncio import Redis
+        except ImportError as error:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from error
+        if not redis_url:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis requires RESPONSE_CACHE_REDIS_URL')
+        return ResponseCache(RedisCacheBackend(Redis.from_url(redis_url)), ttl=ttl)
+    if backend not in ('memory', 'off'):
+        raise RuntimeError(f'Unknown RESPONSE_CACHE_BACKEND: {backend}')
+    return ResponseCache(MemoryCacheBackend(maxsize=maxsize, ttl=ttl), ttl=ttl, enabled=backend != 'off')
+
+
+product_list_cache = build_response_cache(RESPONSE_CACHE_BACKEND, ttl=RESPONSE_CACHE_TTL_SECONDS,
+                                          maxsize=RESPONSE_CACHE_MAXSIZE, redis_url=RESPONSE_CACHE_REDIS_URL)
@@ -0,0 +1,34 @@
+from functools import lru_cache
+from typing import Any
+
+from pydantic import TypeAdapter
+from starlette.responses import Response
+
+
+@lru_cache(maxsize=None)
+def type_adapter(type_: Any) -> TypeAdapter:
+    """ TypeAdapter собирает валидатор и сериализатор один раз на тип, а не на каждый ответ """
+    return TypeAdapter(type_)
+
+
+def dump_json(type_: Any, value: Any) -> bytes:
+    """
+    Валидирует value (ORM-объекты читаются через атрибуты) ровно один раз
+    и сразу пишет JSON в байты сериализатором pydantic-core, минуя промежуточные dict.
+    """
+    adapter = type_adapter(type_)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+class RenderedJSONResponse(Response):
+    """ Ответ с уже готовым JSON: FastAPI не валидирует его повторно по response_model """
+    media_type = 'application/json'
+
+
+def json_response(type_: Any, value: Any, status_code: int = 200,
+                  headers: dict[str, str] | None = None) -> RenderedJSONResponse:
+    """
+    Быстрый путь ответа: type_ совпадает с response_model маршрута,
+    поэтому схема OpenAPI остается прежней.
+    """
+    return RenderedJSONResponse(dump_json(type_, value), status_code=status_code, headers=headers)
@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Ключ conn.info со временем начала текущего выражения
+_STARTED_KEY = 'sql_instrumentation_started'
+# Сколько символов выражения попадает в лог повторов
+STATEMENT_PREVIEW_CHARS = 300
+
+
+@dataclass
+class SQLStats:
+    """ SQL одного запроса: число выражений, время в БД, ожидание соединения из пула и повторы выражений """
+    statements: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+    # Текст выражения с плейсхолдерами -> сколько раз выполнено. Разные параметры дают одну форму
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """ Формы выражений, выполненные не меньше threshold раз (признак N+1); threshold 0 — не проверять """
+        if threshold <= 0:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self, total: float) -> str:
+        """ Значение заголовка Server-Timing (длительности в миллисекундах) """
+        return (f'db;dur={self.db_time * 1000:.3f};desc="{self.statements} statements", '
+                f'db-pool;dur={self.pool_wait * 1000:.3f}, '
+                f'app;dur={total * 1000:.3f}')
+
+
+_current_stats: ContextVar[SQLStats | None] = ContextVar('sql_stats', default=None)
+
+
+def current_sql_stats() -> SQLStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def collect_sql_stats() -> Iterator[SQLStats]:
+    """
+    Считает SQL, выполненный внутри блока на инструментированных engine.
+    Контекст переходит в greenlet'ы async SQLAlchemy, поэтому видны все выражения текущей задачи.
+    """
+    stats = SQLStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def record_pool_wait(seconds: float):
+    """ Вызывается пулом (app.database.InstrumentedQueuePool) после checkout, который ждал соединения """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info[_STARTED_KEY] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    started = conn.info.pop(_STARTED_KEY, None)
+    if stats is None or started is None:
+        return
+    stats.statements += 1
+    stats.db_time += time.perf_counter() - started
+    stats.shapes[statement] += 1
+
+
+def instrument_engine(engine: AsyncEngine):
+    """ Подключает счетчики к engine. Вне запроса (без SQLStats в контексте) обработчики ничего не делают """
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+class SQLInstrumentationMiddleware:
+    """
+    ASGI middleware: собирает SQLStats запроса, добавляет заголовок Server-Timing
+    и пишет одну JSON-строку в лог на запрос.
+    Заголовок отражает SQL до начала ответа; лог пишется после отправки тела
+    и учитывает все, включая потоковые ответы.
+    Если форма выражения повторилась repeat_threshold раз, строка пишется с уровнем WARNING
+    и перечисляет повторы — так выглядят N+1 и циклы запросов по строкам.
+    """
+    def __init__(self, app: ASGIApp, repeat_threshold: int = 5, server_timing: bool = True):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if self.server_timing:
+                    MutableHeaders(scope=message).append('Server-Timing',
+                                                         stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        with collect_sql_stats() as stats:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._log(scope, status, stats, time.perf_counter() - started)
+
+    def _log(self, scope: Scope, status: int, stats: SQLStats, duration: float):
+        repeated = stats.repeated(self.repeat_threshold)
+        level = logging.WARNING if repeated else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+        route = scope.get('route')
+        record = {
+            'method': scope['method'],
+            'route': getattr(route, 'path', None),
+            'path': scope['path'],
+            'status': status,
+            'duration_ms': round(duration * 1000, 3),
+            'statements': stats.statements,
+            'db_ms': round(stats.db_time * 1000, 3),
+            'pool_wait_ms': round(stats.pool_wait * 1000, 3),
+        }
+        if repeated:
+            record['repeated'] = [{'statement': shape[:STATEMENT_PREVIEW_CHARS], 'count': count}
+                                  for shape, count in repeated]
+        logger.log(level, json.dumps(record, ensure_ascii=False))
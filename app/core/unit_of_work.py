@@ -0,0 +1,52 @@
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Ключ session.info, где лежит единица работы сессии
+UNIT_OF_WORK_KEY = 'unit_of_work'
+
+AfterCommit = Callable[[], Awaitable[None]]
+
+
+class UnitOfWork:
+    """
+    Одна транзакция на запрос. Репозитории только делают flush, сервисы не коммитят:
+    транзакцию завершает владелец единицы работы (маршрут или скрипт) одним commit,
+    либо rollback при ошибке.
+    Действия, которые должны видеть закоммиченные данные (сброс кэшей, перестроение
+    снимков), сервисы откладывают через after_commit.
+    """
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self._after_commit: list[AfterCommit] = []
+
+    @classmethod
+    def for_session(cls, session: AsyncSession) -> 'UnitOfWork':
+        """ Единица работы сессии: сервисы и маршрут одного запроса получают один и тот же объект """
+        uow = session.info.get(UNIT_OF_WORK_KEY)
+        if uow is None:
+            uow = session.info[UNIT_OF_WORK_KEY] = cls(session)
+        return uow
+
+    def after_commit(self, callback: AfterCommit):
+        self._after_commit.append(callback)
+
+    async def commit(self):
+        await self.session.commit()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            await callback()
+
+    async def rollback(self):
+        self._after_commit.clear()
+        await self.session.rollback()
+
+    async def __aenter__(self) -> 'UnitOfWork':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
@@ -1,28 +1,26 @@
-from typing import AsyncGenerator
 from collections.abc import AsyncGenerator
+from fastapi import Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session_maker
+from app.core.unit_of_work import UnitOfWork
+from app.database import async_session_maker, use_primary
 
-from sqlalchemy.orm import Session
-from fastapi import Depends
-from collections.abc import Generator
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
 
-from app.database import SessionLocal
 
-
-def get_db() -> Generator[Session, None, None]:
+async def get_async_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
     """
-    Зависимость для получения сессии базы данных.
-    Создаёт новую сессию для каждого запроса и закрывает её после обработки.
+    Предоставляет асинхронную сессию Алхимии для работы с PostgreSQL.
+    Чтение в GET-запросах идет на реплики, запросы, которые пишут, целиком работают с primary.
     """
-    db: Session = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
-    """Предоставляет асинхронную сессию Алхимии для работы с PostgreSQL."""
     async with async_session_maker() as session:
+        if request.method not in READ_METHODS:
+            use_primary(session)
         yield session
 
+
+def get_unit_of_work(db: AsyncSession = Depends(get_async_db)) -> UnitOfWork:
+    """
+    Единица работы текущего запроса. Транзакцию завершает маршрут (async with uow),
+    а не выход из зависимости: тот выполняется уже после отправки ответа.
+    """
+    return UnitOfWork.for_session(db)
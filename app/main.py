@@ -1,18 +1,61 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from httpx import Request
+from sqlalchemy.exc import SQLAlchemyError
 from starlette.responses import JSONResponse
 
+from app.core.category_tree import category_tree
+from app.core.metrics import MetricsMiddleware
 from app.core.exceptions import ProductNotFound
-from app.routers import categories, products, users, reviews
+from app.core.product_suggest import product_suggest_index
+from app.core.replicas import PrimaryPinMiddleware
+from app.core.sql_instrumentation import SQLInstrumentationMiddleware
+from app.config import DATABASE, SQL_INSTRUMENTATION, SQL_REPEAT_THRESHOLD, SQL_SERVER_TIMING, METRICS_ENABLED
+from app.database import async_session_maker, replica_set
+from app.models.categories import Category as CategoryModel
+from app.models.products import Product as ProductModel
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.routers import categories, products, users, reviews, internal, metrics
 from fastapi_pagination import add_pagination
 import time
 
 from app.schemas import ResponseModel
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Загружает снимок дерева категорий и индекс автодополнения при старте и запускает проверку реплик.
+    Если база недоступна, они будут загружены при первом обращении.
+    """
+    try:
+        async with async_session_maker() as session:
+            await category_tree.rebuild(CategoryRepository(db=session, model=CategoryModel))
+            await product_suggest_index.rebuild(ProductRepository(db=session, model=ProductModel))
+    except (OSError, SQLAlchemyError):
+        logger.warning('Category tree and product suggestions were not loaded at startup', exc_info=True)
+
+    replica_monitor = None
+    if replica_set:
+        replica_monitor = asyncio.create_task(replica_set.monitor(DATABASE.replica_check_interval))
+    yield
+    if replica_monitor is not None:
+        replica_monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await replica_monitor
+
+
 app = FastAPI(
     title='OMG!Place',
     description='E-commerce API App.',
-    version='0.1.0'
+    version='0.1.0',
+    lifespan=lifespan
 )
 
 
@@ -20,10 +63,27 @@ app.include_router(categories.router)
 app.include_router(products.router)
 app.include_router(users.router)
 app.include_router(reviews.router)
+app.include_router(internal.router)
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 # Добавляем pagination в нашу аппку
 add_pagination(app)
 
+# Read-your-writes между воркерами: после записи клиент читает с primary (cookie со сроком)
+if replica_set:
+    app.add_middleware(PrimaryPinMiddleware, window=DATABASE.read_your_writes_window)
+
+# Метрики по шаблонам маршрутов. Добавляется раньше SQL-инструментирования,
+# поэтому оказывается внутри него и видит SQLStats запроса
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Число SQL-выражений, время в БД и ожидание пула на запрос: Server-Timing и строка в логе
+if SQL_INSTRUMENTATION:
+    app.add_middleware(SQLInstrumentationMiddleware, repeat_threshold=SQL_REPEAT_THRESHOLD,
+                       server_timing=SQL_SERVER_TIMING)
+
 @app.get('/')
 async def root():
     """
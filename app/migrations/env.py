@@ -7,6 +7,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 
 from alembic import context
 
+from app.config import DATABASE
 from app.database import Base
 from app import models
 
@@ -19,6 +20,11 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# URL берем из настроек приложения (DATABASE_URL), а не из alembic.ini;
+# программный запуск (бенчмарк нагрузки) может передать свой через config.attributes
+database_url = config.attributes.get('database_url', DATABASE.url)
+config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,73 @@
+"""add category_stats table and category price index
+
+Revision ID: a7c2e9d4b6f1
+Revises: f1b4d7e2a9c5
+Create Date: 2026-10-18 21:14:03.527316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9d4b6f1'
+down_revision: Union[str, Sequence[str], None] = 'f1b4d7e2a9c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'category_stats',
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('product_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('min_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('max_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('rating_sum', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('review_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('avg_rating', sa.Float(), server_default=sa.text('0.0'), nullable=False),
+        sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # --- Заполняем статистику по уже существующим товарам (строка есть у каждой категории) ---
+    op.execute("""
+        INSERT INTO category_stats (category_id, product_count, min_price, max_price,
+                                    rating_sum, review_count, avg_rating)
+        SELECT c.id,
+               coalesce(p.product_count, 0),
+               p.min_price,
+               p.max_price,
+               coalesce(p.rating_sum, 0),
+               coalesce(p.review_count, 0),
+               CASE WHEN p.review_count > 0 THEN p.rating_sum::float / p.review_count ELSE 0.0 END
+        FROM categories AS c
+        LEFT JOIN (
+            SELECT category_id,
+                   count(*) AS product_count,
+                   min(price) AS min_price,
+                   max(price) AS max_price,
+                   sum(rating_sum) AS rating_sum,
+                   sum(review_count) AS review_count
+            FROM products
+            WHERE is_active
+            GROUP BY category_id
+        ) AS p ON p.category_id = c.id
+    """)
+    # min/max цены категории при изменении товаров — проба этого индекса
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_category_id_price_active', 'products', ['category_id', 'price'],
+                        postgresql_where=sa.text('is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_category_id_price_active', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_table('category_stats')
@@ -0,0 +1,59 @@
+"""add rating aggregates to products
+
+Revision ID: b41c7e2d9a13
+Revises: 6ea5e4d4bbad
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41c7e2d9a13'
+down_revision: Union[str, Sequence[str], None] = '6ea5e4d4bbad'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+AGGREGATE_COLUMNS = ('rating_sum', 'review_count',
+                     'grade_1_count', 'grade_2_count', 'grade_3_count', 'grade_4_count', 'grade_5_count')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in AGGREGATE_COLUMNS:
+        op.add_column('products', sa.Column(column, sa.Integer(), server_default=sa.text('0'), nullable=False))
+    # --- Заполняем агрегаты по уже существующим отзывам ---
+    op.execute("""
+        UPDATE products AS p
+        SET rating_sum = r.rating_sum,
+            review_count = r.review_count,
+            grade_1_count = r.grade_1_count,
+            grade_2_count = r.grade_2_count,
+            grade_3_count = r.grade_3_count,
+            grade_4_count = r.grade_4_count,
+            grade_5_count = r.grade_5_count,
+            rating = r.rating_sum::float / r.review_count
+        FROM (
+            SELECT product_id,
+                   count(*) AS review_count,
+                   sum(grade) AS rating_sum,
+                   count(*) FILTER (WHERE grade = 1) AS grade_1_count,
+                   count(*) FILTER (WHERE grade = 2) AS grade_2_count,
+                   count(*) FILTER (WHERE grade = 3) AS grade_3_count,
+                   count(*) FILTER (WHERE grade = 4) AS grade_4_count,
+                   count(*) FILTER (WHERE grade = 5) AS grade_5_count
+            FROM reviews
+            WHERE is_active
+            GROUP BY product_id
+        ) AS r
+        WHERE p.id = r.product_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(AGGREGATE_COLUMNS):
+        op.drop_column('products', column)
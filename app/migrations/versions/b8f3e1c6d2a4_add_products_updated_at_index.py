@@ -0,0 +1,33 @@
+"""add index on products.updated_at
+
+Revision ID: b8f3e1c6d2a4
+Revises: a7c2e9d4b6f1
+Create Date: 2026-10-18 21:14:32.418265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f3e1c6d2a4'
+down_revision: Union[str, Sequence[str], None] = 'a7c2e9d4b6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Индекс автодополнения каждого воркера периодически читает товары, измененные после updated_at
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_updated_at', 'products', ['updated_at'],
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_updated_at', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,53 @@
+"""add partial indexes for active rows
+
+Revision ID: c7d2f4a9e815
+Revises: b41c7e2d9a13
+Create Date: 2026-10-18 12:03:11.542017
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2f4a9e815'
+down_revision: Union[str, Sequence[str], None] = 'b41c7e2d9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text('is_active')
+
+# (имя индекса, таблица, колонки, доп. параметры)
+INDEXES = (
+    ('ix_products_category_id_active', 'products', ['category_id'], {}),
+    ('ix_products_seller_id_active', 'products', ['seller_id'], {}),
+    ('ix_products_price_active', 'products', ['price'], {}),
+    ('ix_products_rating_active', 'products', ['rating'], {}),
+    ('ix_products_name_trgm_active', 'products', ['name'],
+     {'postgresql_using': 'gin', 'postgresql_ops': {'name': 'gin_trgm_ops'}}),
+    ('ix_reviews_product_id_user_id_active', 'reviews', ['product_id', 'user_id'], {}),
+    ('ix_categories_parent_id_active', 'categories', ['parent_id'], {}),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm нужен для индекса под name ILIKE 'x%'
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns,
+                            postgresql_where=ACTIVE,
+                            postgresql_concurrently=True,
+                            if_not_exists=True,
+                            **kwargs)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,46 @@
+"""add search vector to products
+
+Revision ID: d5e8a1f3b7c2
+Revises: c7d2f4a9e815
+Create Date: 2026-10-18 15:21:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e8a1f3b7c2'
+down_revision: Union[str, Sequence[str], None] = 'c7d2f4a9e815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Генерируемая колонка: PostgreSQL сам пересчитывает документ при INSERT/UPDATE name и description
+    op.execute(
+        """
+        ALTER TABLE products ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+        ) STORED
+        """
+    )
+    with op.get_context().autocommit_block():
+        op.create_index('ix_products_search_vector_active', 'products', ['search_vector'],
+                        postgresql_using='gin',
+                        postgresql_where=sa.text('is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_search_vector_active', table_name='products',
+                      postgresql_concurrently=True, if_exists=True)
+    op.drop_column('products', 'search_vector')
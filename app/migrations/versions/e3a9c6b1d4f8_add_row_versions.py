@@ -0,0 +1,36 @@
+"""add version and updated_at to products and categories
+
+Revision ID: e3a9c6b1d4f8
+Revises: d5e8a1f3b7c2
+Create Date: 2026-10-18 17:40:12.305871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c6b1d4f8'
+down_revision: Union[str, Sequence[str], None] = 'd5e8a1f3b7c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('products', 'categories')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # server_default с константой: PostgreSQL 11+ добавляет колонки без перезаписи таблицы
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True),
+                                       server_default=sa.func.now(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
@@ -0,0 +1,44 @@
+"""add indexes for review listings
+
+Revision ID: f1b4d7e2a9c5
+Revises: e3a9c6b1d4f8
+Create Date: 2026-10-18 19:05:47.611920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b4d7e2a9c5'
+down_revision: Union[str, Sequence[str], None] = 'e3a9c6b1d4f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Порядок колонок совпадает с ORDER BY comment_date DESC, id DESC в ReviewRepository.get_query_for_product
+    with op.get_context().autocommit_block():
+        op.create_index('ix_reviews_product_id_comment_date_active', 'reviews',
+                        ['product_id', sa.text('comment_date DESC'), sa.text('id DESC')],
+                        postgresql_where=sa.text('is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+        # Общий список отзывов: ORDER BY comment_date DESC, id DESC по умолчанию в ReviewFilter
+        op.create_index('ix_reviews_comment_date_active', 'reviews',
+                        [sa.text('comment_date DESC'), sa.text('id DESC')],
+                        postgresql_where=sa.text('is_active'),
+                        postgresql_concurrently=True,
+                        if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_reviews_comment_date_active', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_reviews_product_id_comment_date_active', table_name='reviews',
+                      postgresql_concurrently=True, if_exists=True)
@@ -1,6 +1,7 @@
 from .categories import Category
+from .category_stats import CategoryStats
 from .products import Product
 from .users import User
 from .reviews import Review
 
-__all__ = ["Category", "Product", "User", "Review"]
+__all__ = ["Category", "CategoryStats", "Product", "User", "Review"]
@@ -1,4 +1,6 @@
-from sqlalchemy import String, Boolean, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import String, Boolean, ForeignKey, Index, Integer, DateTime, func, literal_column, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -6,19 +8,37 @@ from app.database import Base
 class Category(Base):
     __tablename__ = 'categories'
 
+    # Значения version и updated_at после INSERT/UPDATE сразу возвращаются через RETURNING
+    __mapper_args__ = {'eager_defaults': True}
+
+    __table_args__ = (
+        Index('ix_categories_parent_id_active', 'parent_id', postgresql_where=text('is_active')),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     parent_id: Mapped[int | None] = mapped_column(ForeignKey("categories.id"), nullable=True)
 
+    # Версия строки для ETag: растет на каждом UPDATE (ORM и Core), updated_at — для Last-Modified
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default=text('1'),
+                                         onupdate=literal_column('version') + 1, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(),
+                                                 server_default=func.now(), onupdate=func.now(), nullable=False)
+
     products: Mapped[list["Product"]] = relationship(
         back_populates='category',
-        lazy='selectin',
+        lazy='raise',
         cascade='all, delete-orphan'
     )
+    # Статистика товаров категории; только чтение, пишет ее ProductRepository
+    stats: Mapped["CategoryStats | None"] = relationship(lazy='raise',
+                                                         viewonly=True)
     parent: Mapped["Category | None"] = relationship("Category",
                                                         back_populates="children",
-                                                        remote_side="Category.id")
+                                                        remote_side="Category.id",
+                                                        lazy='raise')
     children: Mapped[list["Category"]] = relationship("Category",
-                                                      back_populates="parent")
+                                                      back_populates="parent",
+                                                      lazy='raise')
 
@@ -0,0 +1,36 @@
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import Integer, Numeric, Float, DateTime, ForeignKey, func, literal_column, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class CategoryStats(Base):
+    """
+    Денормализованная статистика активных товаров категории.
+    Обновляется инкрементально при записи товаров и отзывов (ProductRepository),
+    расхождения исправляет сверка rebuild_category_stats (python -m app.scripts.reconcile_category_stats).
+    """
+    __tablename__ = 'category_stats'
+
+    # Значения version и updated_at после INSERT/UPDATE сразу возвращаются через RETURNING
+    __mapper_args__ = {'eager_defaults': True}
+
+    category_id: Mapped[int] = mapped_column(ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    product_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    # NULL — в категории нет активных товаров
+    min_price: Mapped[Decimal | None] = mapped_column(Numeric(10, 2), nullable=True)
+    max_price: Mapped[Decimal | None] = mapped_column(Numeric(10, 2), nullable=True)
+
+    # Сумма и число оценок активных отзывов по активным товарам: avg_rating = rating_sum / review_count
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    review_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    avg_rating: Mapped[float] = mapped_column(Float, default=0.0, server_default=text('0.0'), nullable=False)
+
+    # Версия строки входит в ETag списка категорий: растет на каждом UPDATE (ORM и Core)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default=text('1'),
+                                         onupdate=literal_column('version') + 1, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(),
+                                                 server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -1,13 +1,53 @@
 from pydantic_core.core_schema import nullable_schema
-from sqlalchemy import String, Boolean, Integer, Numeric, Float, text
+from datetime import datetime
+
+from sqlalchemy import Computed, String, Boolean, Integer, Numeric, Float, Index, Text, DateTime, func, literal_column, text
 from sqlalchemy import ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from decimal import Decimal
 from app.database import Base
 
+# Конфигурация полнотекстового поиска: без стемминга, названия товаров бывают на разных языках
+SEARCH_CONFIG = 'simple'
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+)
+
+
+@compiles(Computed, 'sqlite')
+def _computed_sqlite(element, compiler, **kw):
+    """ В SQLite (тесты) нет to_tsvector: search_vector там обычная пустая колонка """
+    return ''
+
+
 class Product(Base):
     __tablename__ = 'products'
 
+    # Значения version и updated_at после INSERT/UPDATE сразу возвращаются через RETURNING
+    __mapper_args__ = {'eager_defaults': True}
+
+    # Частичные индексы под запросы ProductRepository (все фильтруют is_active)
+    __table_args__ = (
+        Index('ix_products_category_id_active', 'category_id', postgresql_where=text('is_active')),
+        Index('ix_products_seller_id_active', 'seller_id', postgresql_where=text('is_active')),
+        Index('ix_products_price_active', 'price', postgresql_where=text('is_active')),
+        # min/max цены категории для статистики category_stats — одна проба индекса
+        Index('ix_products_category_id_price_active', 'category_id', 'price', postgresql_where=text('is_active')),
+        Index('ix_products_rating_active', 'rating', postgresql_where=text('is_active')),
+        Index('ix_products_name_trgm_active', 'name',
+              postgresql_using='gin',
+              postgresql_ops={'name': 'gin_trgm_ops'},
+              postgresql_where=text('is_active')),
+        Index('ix_products_search_vector_active', 'search_vector',
+              postgresql_using='gin',
+              postgresql_where=text('is_active')),
+        # Изменения для индекса автодополнения (включая удаленные товары) — ProductRepository.get_suggestion_changes
+        Index('ix_products_updated_at', 'updated_at'),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     description: Mapped[str | None] = mapped_column(String(500), nullable=True)
@@ -19,15 +59,40 @@ class Product(Base):
     seller_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
     rating: Mapped[float] = mapped_column(Float, default=0.0, server_default=text('0.0'), nullable=False)
 
+    # Версия строки для ETag: растет на каждом UPDATE (ORM и Core), updated_at — для Last-Modified
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default=text('1'),
+                                         onupdate=literal_column('version') + 1, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(),
+                                                 server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Накопительные агрегаты отзывов: rating = rating_sum / review_count
+    rating_sum: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    review_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    grade_1_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    grade_2_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    grade_3_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    grade_4_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+    grade_5_count: Mapped[int] = mapped_column(Integer, default=0, server_default=text('0'), nullable=False)
+
+    # Поисковый документ (name с весом A, description с весом B).
+    # Генерируемая колонка, выражение совпадает с миграцией d5e8a1f3b7c2; приложение ее не пишет
+    search_vector: Mapped[str | None] = mapped_column(TSVECTOR().with_variant(Text(), 'sqlite'),
+                                                      Computed(SEARCH_VECTOR_SQL, persisted=True),
+                                                      nullable=True,
+                                                      deferred=True)
+
     category: Mapped["Category"] = relationship(
-        back_populates='products'
+        back_populates='products',
+        lazy='raise'
     )
     seller: Mapped["User"] = relationship(
-        back_populates='products'
+        back_populates='products',
+        lazy='raise'
     )
 
     comments: Mapped[list['Review']] = relationship(
-        back_populates='product'
+        back_populates='product',
+        lazy='raise'
     )
 
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Integer, Text, DateTime, CheckConstraint, func
+from sqlalchemy import Boolean, Integer, Text, DateTime, CheckConstraint, Index, func, text
 from sqlalchemy import ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
@@ -7,9 +7,14 @@ from datetime import datetime
 class Review(Base):
     __tablename__ = 'reviews'
 
+    # id и comment_date возвращаются в INSERT ... RETURNING, без refresh после commit
+    __mapper_args__ = {'eager_defaults': True}
+
     __table_args__ = (
         CheckConstraint('grade >= 1 AND grade <=5',
                         name='check_grade'),
+        Index('ix_reviews_product_id_user_id_active', 'product_id', 'user_id',
+              postgresql_where=text('is_active')),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -21,9 +26,22 @@ class Review(Base):
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
     user: Mapped['User'] = relationship(
-        back_populates='comments'
+        back_populates='comments',
+        lazy='raise'
     )
 
     product: Mapped['Product'] = relationship(
-        back_populates='comments'
+        back_populates='comments',
+        lazy='raise'
     )
+
+
+# Отзывы товара, новые первыми: keyset-пагинация по (comment_date, id).
+# Объявлен после класса, потому что направление сортировки задается через колонки модели
+Index('ix_reviews_product_id_comment_date_active',
+      Review.product_id, Review.comment_date.desc(), Review.id.desc(),
+      postgresql_where=text('is_active'))
+# Общий список отзывов, новые первыми (порядок по умолчанию в ReviewFilter)
+Index('ix_reviews_comment_date_active',
+      Review.comment_date.desc(), Review.id.desc(),
+      postgresql_where=text('is_active'))
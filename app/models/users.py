@@ -13,9 +13,11 @@ class User(Base):
     role: Mapped[str] = mapped_column(String, default='buyer') #buyer / seller / admin
 
     products: Mapped[list['Product']] = relationship(
-        back_populates='seller'
+        back_populates='seller',
+        lazy='raise'
     )
 
     comments: Mapped[list['Review']] = relationship(
-        back_populates='user'
+        back_populates='user',
+        lazy='raise'
     )
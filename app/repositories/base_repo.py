@@ -1,8 +1,39 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from sqlalchemy import ColumnElement, Insert, any_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import ORMOption
 
 from app.database import Base
 
+# Стратегии загрузки связей (selectinload, joinedload, ...) для конкретного запроса.
+# Все relationship объявлены с lazy='raise', поэтому связи загружаются только явно.
+LoaderOptions = Sequence[ORMOption]
+
+
+def any_of(db: AsyncSession, column, values: Iterable) -> ColumnElement[bool]:
+    """
+    column = ANY(:values) с одним параметром-массивом на PostgreSQL: текст запроса не зависит
+    от числа значений, поэтому кэш подготовленных выражений и pg_stat_statements видят один запрос.
+    На других СУБД (SQLite в тестах) — обычный IN (...).
+    """
+    values = list(values)
+    if db.bind is not None and db.bind.dialect.name == 'postgresql':
+        return column == any_(bindparam(None, values, type_=ARRAY(column.type)))
+    return column.in_(values)
+
+
+def upsert(db: AsyncSession, model) -> Insert:
+    """
+    INSERT с on_conflict_do_update для СУБД сессии: PostgreSQL в проде, SQLite в тестах.
+    set_ в on_conflict_do_update не применяет onupdate колонок, их нужно передавать явно.
+    """
+    if db.bind is not None and db.bind.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
 class BaseSQLRepository(ABC):
     def __init__(self, db: AsyncSession, model: Base):
         self.db = db
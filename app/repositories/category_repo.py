@@ -1,6 +1,7 @@
-from app.repositories.base_repo import BaseSQLRepository
+from app.core.data_loader import DataLoader, by_id
+from app.repositories.base_repo import BaseSQLRepository, LoaderOptions, any_of
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update as sql_update
+from sqlalchemy import func, select, update as sql_update
 from app.models.categories import Category as CategoryModel
 
 
@@ -8,21 +9,54 @@ class CategoryRepository(BaseSQLRepository):
     def __init__(self, db: AsyncSession, model: CategoryModel):
         super().__init__(db, model)
 
-    async def get(self, id_):
+    async def get(self, id_, options: LoaderOptions = ()):
         stmt = select(CategoryModel).where(CategoryModel.id == id_,
-                                           CategoryModel.is_active == True)
+                                           CategoryModel.is_active == True).options(*options)
         return await self.db.scalar(stmt)
 
+    async def get_many(self, ids: list[int], options: LoaderOptions = ()) -> list[CategoryModel]:
+        """ Активные категории по списку id одним запросом """
+        if not ids:
+            return []
+        stmt = select(CategoryModel).where(any_of(self.db, CategoryModel.id, ids),
+                                           CategoryModel.is_active == True).options(*options)
+        result = await self.db.scalars(stmt)
+        return result.all()
+
+    def _loader(self) -> DataLoader:
+        return DataLoader.for_session(self.db, 'categories', lambda ids: self._load_many(ids))
+
+    async def _load_many(self, ids: list[int]) -> dict[int, CategoryModel]:
+        return by_id(await self.get_many(ids))
+
+    async def load(self, id_: int) -> CategoryModel | None:
+        """ Как get, но через загрузчик сессии: обращения одного тика объединяются в один get_many """
+        return await self._loader().load(id_)
+
     async def get_category_by_parent(self, id_: int):
         stmt = select(CategoryModel).where(CategoryModel.id == id_,
                                            CategoryModel.is_active == True)
         result = await self.db.scalars(stmt)
         return result.first()
 
+    async def get_tree_version(self) -> tuple[int, int]:
+        """
+        Версия таблицы категорий: число строк и сумма версий строк.
+        Любой INSERT увеличивает первое, любой UPDATE (в том числе мягкое удаление) — второе
+        """
+        stmt = select(func.count(), func.coalesce(func.sum(CategoryModel.version), 0))
+        count, versions = (await self.db.execute(stmt)).one()
+        return count, versions
+
+    async def get_active_ids(self) -> set[int]:
+        stmt = select(CategoryModel.id).where(CategoryModel.is_active == True)
+        result = await self.db.scalars(stmt)
+        return set(result.all())
+
     async def create(self, category):
         category_orm = CategoryModel(**category.model_dump())
         self.db.add(category_orm)
-        await self.db.commit()
+        await self.db.flush()
         return category_orm
 
     async def update(self, id_: int, updated_data: dict):
@@ -35,8 +69,8 @@ class CategoryRepository(BaseSQLRepository):
         await self.db.execute(stmt)
         return await self.get(id_)
 
-    async def get_all(self):
-        stmt = select(CategoryModel).where(CategoryModel.is_active == True)
+    async def get_all(self, options: LoaderOptions = ()):
+        stmt = select(CategoryModel).where(CategoryModel.is_active == True).options(*options)
         result = await self.db.scalars(stmt)
         result = result.all()
         return result
@@ -47,8 +81,9 @@ class CategoryRepository(BaseSQLRepository):
             return None
         category.is_active = False
         self.db.add(category)
+        self._loader().forget(id_)
         return category
 
-    def get_query_for_pagination(self):
-        query = select(CategoryModel).where(CategoryModel.is_active == True)
+    def get_query_for_pagination(self, options: LoaderOptions = ()):
+        query = select(CategoryModel).where(CategoryModel.is_active == True).options(*options)
         return query
@@ -1,8 +1,57 @@
-from app.repositories.base_repo import BaseSQLRepository
+import re
+from collections.abc import Iterable
+from datetime import datetime
+from decimal import Decimal
+
+from app.core.data_loader import DataLoader, by_id
+from app.repositories.base_repo import BaseSQLRepository, LoaderOptions, any_of, upsert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update as sql_update
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy import select, insert, update as sql_update, func, case, cast, exists, or_, Float, Numeric, Select, \
+    ColumnElement
+from app.core.product_suggest import track_product_change, track_rating_change
 from app.database import Base
-from app.models.products import Product as ProductModel
+from app.models.categories import Category as CategoryModel
+from app.models.category_stats import CategoryStats as CategoryStatsModel
+from app.models.products import Product as ProductModel, SEARCH_CONFIG
+from app.models.reviews import Review as ReviewModel
+
+GRADES = range(1, 6)
+
+
+def prefix_tsquery(search: str) -> str:
+    """
+    Превращает строку поиска в tsquery, где каждое слово ищется как префикс:
+    'red pho' -> 'red:* & pho:*'. Спецсимволы tsquery отбрасываются.
+    """
+    return ' & '.join(f'{word}:*' for word in re.findall(r'\w+', search.lower()))
+
+
+def average(rating_sum, review_count) -> ColumnElement[float]:
+    """ rating_sum / review_count в SQL; 0.0, пока оценок нет """
+    return case((review_count > 0, cast(rating_sum, Float) / review_count), else_=0.0)
+
+
+def least_price(current, price) -> ColumnElement[Decimal]:
+    """ Меньшая из цен; NULL в current (в категории нет товаров) заменяется на price """
+    return case((or_(current.is_(None), current > price), price), else_=current)
+
+
+def greatest_price(current, price) -> ColumnElement[Decimal]:
+    """ Большая из цен; NULL в current (в категории нет товаров) заменяется на price """
+    return case((or_(current.is_(None), current < price), price), else_=current)
+
+
+def category_price(aggregate, category_id: int) -> ColumnElement[Decimal]:
+    """
+    min/max цены активных товаров категории. По индексу (category_id, price) WHERE is_active
+    это одна проба индекса, а не чтение категории: границы цен не поддерживаются вычитанием.
+    """
+    return (
+        select(aggregate(ProductModel.price))
+        .where(ProductModel.category_id == category_id, ProductModel.is_active == True)
+        .scalar_subquery()
+    )
 
 
 class ProductRepository(BaseSQLRepository):
@@ -12,40 +61,131 @@ class ProductRepository(BaseSQLRepository):
     async def create(self, product_data: dict):
         product = ProductModel(**product_data)
         self.db.add(product)
-        await self.db.commit()
-        await self.db.refresh(product)
+        await self.db.flush()
+        await self._add_to_category_stats([product])
+        track_product_change(self.db.sync_session, product)
         return product
 
-    async def get(self, id_: int):
+    async def bulk_create(self, products_data: list[dict]):
+        """
+        Вставляет пачку товаров одним executemany (без ORM-объектов и refresh)
+        и одним upsert добавляет их в статистику категорий.
+        Возвращает id, name, rating, is_active, category_id, price и агрегаты отзывов вставленных строк.
+        """
+        # render_nulls: None пишется как NULL, иначе строки с разными None-полями разбиваются на разные INSERT
+        stmt = (
+            insert(ProductModel)
+            .returning(ProductModel.id, ProductModel.name, ProductModel.rating, ProductModel.is_active,
+                       ProductModel.category_id, ProductModel.price, ProductModel.rating_sum,
+                       ProductModel.review_count)
+            .execution_options(render_nulls=True)
+        )
+        result = await self.db.execute(stmt, products_data)
+        rows = result.all()
+        await self._add_to_category_stats(rows)
+        for row in rows:
+            track_product_change(self.db.sync_session, row)
+        return rows
+
+    async def get(self, id_: int, options: LoaderOptions = ()):
         stmt = select(ProductModel).where(ProductModel.id == id_,
-                                          ProductModel.is_active == True)
+                                          ProductModel.is_active == True).options(*options)
         result = await self.db.scalars(stmt)
         return result.first()
 
-    async def get_searched_products_by_name(self, search: str):
-        stmt = select(ProductModel).where(ProductModel.name.ilike(f'{search}%'),
-                                          ProductModel.is_active == True)
-        res = await self.db.scalars(stmt)
-        return res.all()
+    async def get_many(self, ids: list[int], options: LoaderOptions = ()) -> list[ProductModel]:
+        """ Активные товары по списку id одним запросом (порядок не гарантирован, отсутствующих нет) """
+        if not ids:
+            return []
+        stmt = select(ProductModel).where(any_of(self.db, ProductModel.id, ids),
+                                          ProductModel.is_active == True).options(*options)
+        result = await self.db.scalars(stmt)
+        return result.all()
 
-    async def get_searched_products_by_price(self, search: int | float):
-        stmt = select(ProductModel).where(ProductModel.price == search,
-                                          ProductModel.is_active == True)
-        res = await self.db.scalars(stmt)
-        return res.all()
+    def _loader(self) -> DataLoader:
+        return DataLoader.for_session(self.db, 'products', lambda ids: self._load_many(ids))
+
+    async def _load_many(self, ids: list[int]) -> dict[int, ProductModel]:
+        return by_id(await self.get_many(ids))
+
+    async def load(self, id_: int) -> ProductModel | None:
+        """
+        Как get, но через загрузчик сессии: обращения одного тика объединяются в один get_many,
+        повторные в пределах запроса не идут в БД.
+        """
+        return await self._loader().load(id_)
 
-    async def get_query_for_pagination(self):
-        stmt = select(ProductModel).where(ProductModel.is_active == True)
+    async def get_version(self, id_: int):
+        """ Версия и время изменения активного товара (для условного GET) без загрузки строки целиком """
+        stmt = select(ProductModel.id, ProductModel.version, ProductModel.updated_at).where(
+            ProductModel.id == id_, ProductModel.is_active == True)
+        result = await self.db.execute(stmt)
+        return result.first()
+
+    async def get_query_for_search(self, search: str,
+                                   price_from: float | None = None,
+                                   price_to: float | None = None,
+                                   rating_from: float | None = None,
+                                   rating_to: float | None = None,
+                                   options: LoaderOptions = ()) -> Select:
+        """
+        Полнотекстовый поиск по name и description одним запросом по GIN-индексу search_vector.
+        Фильтры по цене и рейтингу применяются в том же запросе,
+        результаты отсортированы по релевантности (и по id для keyset-пагинации).
+        """
+        tsquery = func.to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), prefix_tsquery(search))
+        # Округленный numeric, чтобы курсор точно воспроизводил значение ранга
+        rank = func.round(cast(func.ts_rank_cd(ProductModel.search_vector, tsquery), Numeric), 6)
+        stmt = select(ProductModel).where(ProductModel.is_active == True,
+                                          ProductModel.search_vector.op('@@')(tsquery))
+        if price_from is not None:
+            stmt = stmt.where(ProductModel.price >= price_from)
+        if price_to is not None:
+            stmt = stmt.where(ProductModel.price <= price_to)
+        if rating_from is not None:
+            stmt = stmt.where(ProductModel.rating >= rating_from)
+        if rating_to is not None:
+            stmt = stmt.where(ProductModel.rating <= rating_to)
+        return stmt.order_by(rank.desc(), ProductModel.id).options(*options)
+
+    async def get_suggestion_rows(self):
+        """ id, name, rating и updated_at всех активных товаров для индекса автодополнения """
+        stmt = (select(ProductModel.id, ProductModel.name, ProductModel.rating, ProductModel.updated_at)
+                .where(ProductModel.is_active == True))
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def get_suggestion_changes(self, since: datetime | None):
+        """ Товары (и активные, и удаленные), измененные начиная с since, для обновления индекса автодополнения """
+        stmt = select(ProductModel.id, ProductModel.name, ProductModel.rating, ProductModel.is_active,
+                      ProductModel.updated_at)
+        if since is not None:
+            stmt = stmt.where(ProductModel.updated_at >= since)
+        result = await self.db.execute(stmt)
+        return result.all()
+
+    async def get_query_for_pagination(self, options: LoaderOptions = ()):
+        stmt = select(ProductModel).where(ProductModel.is_active == True).options(*options)
         return stmt
 
-    async def get_all(self):
-        stmt = select(ProductModel).where(ProductModel.is_active == True)
+    async def get_all(self, options: LoaderOptions = ()):
+        stmt = select(ProductModel).where(ProductModel.is_active == True).options(*options)
         result = await self.db.scalars(stmt)
         return result.all()
 
-    async def get_all_by_category(self, id_: int):
+    async def stream_all(self, yield_per: int = 1000):
+        """ Потоковое чтение всех активных товаров серверным курсором, по yield_per строк за раз """
+        stmt = (
+            select(ProductModel)
+            .where(ProductModel.is_active == True)
+            .order_by(ProductModel.id)
+            .execution_options(yield_per=yield_per)
+        )
+        return await self.db.stream_scalars(stmt)
+
+    async def get_all_by_category(self, id_: int, options: LoaderOptions = ()):
         stmt = select(ProductModel).where(ProductModel.category_id == id_,
-                                          ProductModel.is_active == True)
+                                          ProductModel.is_active == True).options(*options)
         result = await self.db.scalars(stmt)
         return result.all()
 
@@ -61,6 +201,11 @@ class ProductRepository(BaseSQLRepository):
 
 
     async def update(self, id_: int, updated_data: dict):
+        current = await self.load(id_)
+        if current is None:
+            return None
+        # Объект сессии синхронизируется с UPDATE, прежнюю категорию нужно запомнить до него
+        old_category_id = current.category_id
         stmt = (
             sql_update(ProductModel)
             .where(ProductModel.id == id_,
@@ -68,18 +213,182 @@ class ProductRepository(BaseSQLRepository):
             .values(**updated_data)
         )
         await self.db.execute(stmt)
-        return await self.get(id_)
+        product = await self.get(id_)
+        if product is not None:
+            await self._move_in_category_stats(old_category_id, product)
+            track_product_change(self.db.sync_session, product)
+        return product
 
-    async def update_product_rating(self, id_, rating):
+    async def update_owned(self, id_: int, seller_id: int, updated_data: dict,
+                           same_category: bool = False) -> ProductModel | None:
+        """
+        Обновляет активный товар продавца одним UPDATE ... RETURNING.
+        Целевая категория должна быть активной; same_category дополнительно требует,
+        чтобы товар оставался в своей категории. None — ни одна строка не подошла.
+        Без same_category прежняя категория берется из загрузчика сессии (сервис уже прочитал товар).
+        """
+        category_id = updated_data['category_id']
+        old_category_id = category_id
+        if not same_category:
+            current = await self.load(id_)
+            if current is None:
+                return None
+            # Объект сессии синхронизируется с UPDATE, прежнюю категорию нужно запомнить до него
+            old_category_id = current.category_id
         stmt = (
             sql_update(ProductModel)
             .where(ProductModel.id == id_,
-                   ProductModel.is_active == True
-                   )
-            .values(rating=rating)
+                   ProductModel.seller_id == seller_id,
+                   ProductModel.is_active == True,
+                   exists().where(CategoryModel.id == category_id, CategoryModel.is_active == True))
+            .values(**updated_data)
+            .returning(ProductModel)
         )
-        await self.db.execute(stmt)
+        if same_category:
+            stmt = stmt.where(ProductModel.category_id == category_id)
+        product = await self.db.scalar(stmt)
+        if product is not None:
+            await self._move_in_category_stats(old_category_id, product)
+            track_product_change(self.db.sync_session, product)
+        return product
+
+    async def delete_owned(self, id_: int, seller_id: int):
+        """
+        Мягко удаляет активный товар продавца одним UPDATE ... RETURNING.
+        Возвращает id, name, rating, is_active, category_id, price и агрегаты отзывов
+        либо None, если ни одна строка не подошла.
+        """
+        stmt = (
+            sql_update(ProductModel)
+            .where(ProductModel.id == id_,
+                   ProductModel.seller_id == seller_id,
+                   ProductModel.is_active == True)
+            .values(is_active=False)
+            .returning(ProductModel.id, ProductModel.name, ProductModel.rating, ProductModel.is_active,
+                       ProductModel.category_id, ProductModel.price, ProductModel.rating_sum,
+                       ProductModel.review_count)
+        )
+        result = await self.db.execute(stmt)
+        row = result.first()
+        if row is not None:
+            self._loader().forget(id_)
+            await self._remove_from_category_stats(row)
+            track_product_change(self.db.sync_session, row)
+        return row
+
+    async def update_product_rating(self, id_: int, grade: int, delta: int = 1):
+        """
+        Добавляет (delta=1) или убирает (delta=-1) одну оценку из агрегатов товара.
+        Один UPDATE с относительными изменениями, без чтения отзывов,
+        и для активного товара — один UPDATE статистики его категории.
+        """
+        grade_count = getattr(ProductModel, f'grade_{grade}_count')
+        rating_sum = ProductModel.rating_sum + grade * delta
+        review_count = ProductModel.review_count + delta
+        stmt = (
+            sql_update(ProductModel)
+            .where(ProductModel.id == id_)
+            .values({ProductModel.rating_sum: rating_sum,
+                     ProductModel.review_count: review_count,
+                     grade_count: grade_count + delta,
+                     ProductModel.rating: average(rating_sum, review_count)})
+            .returning(ProductModel.rating, ProductModel.category_id, ProductModel.is_active)
+        )
+        result = await self.db.execute(stmt)
+        row = result.first()
+        if row is None:
+            return
+        if row.is_active:
+            await self._shift_category_stats(row.category_id, rating_sum=grade * delta, review_count=delta)
+        track_rating_change(self.db.sync_session, id_, row.rating)
+
+    async def rebuild_rating_aggregates(self):
+        """
+        Пересчитывает агрегаты рейтинга всех товаров по таблице reviews.
+        Два set-based UPDATE: обнуление товаров без отзывов и заполнение по GROUP BY.
+        Меняются только разошедшиеся строки: версии остальных товаров (и их ETag) не растут.
+        """
+        aggregates = ('rating_sum', 'review_count', *(f'grade_{grade}_count' for grade in GRADES))
+        reviews = (
+            select(ReviewModel.product_id,
+                   func.count().label('review_count'),
+                   func.sum(ReviewModel.grade).label('rating_sum'),
+                   *[func.count().filter(ReviewModel.grade == grade).label(f'grade_{grade}_count')
+                     for grade in GRADES])
+            .where(ReviewModel.is_active == True)
+            .group_by(ReviewModel.product_id)
+            .subquery()
+        )
+        reset_stmt = (
+            sql_update(ProductModel)
+            .where(ProductModel.review_count != 0,
+                   ~exists().where(ReviewModel.product_id == ProductModel.id,
+                                   ReviewModel.is_active == True))
+            .values(rating=0.0, rating_sum=0, review_count=0,
+                    **{f'grade_{grade}_count': 0 for grade in GRADES})
+            .execution_options(synchronize_session=False)
+        )
+        rating = cast(reviews.c.rating_sum, Float) / reviews.c.review_count
+        fill_stmt = (
+            sql_update(ProductModel)
+            .where(ProductModel.id == reviews.c.product_id,
+                   or_(ProductModel.rating.is_distinct_from(rating),
+                       *(getattr(ProductModel, column).is_distinct_from(reviews.c[column]) for column in aggregates)))
+            .values(rating=rating, **{column: reviews.c[column] for column in aggregates})
+            .execution_options(synchronize_session=False)
+        )
+        reset = await self.db.execute(reset_stmt)
+        fill = await self.db.execute(fill_stmt)
+        return reset.rowcount + fill.rowcount
 
+    async def rebuild_category_stats(self):
+        """
+        Сверяет статистику категорий с активными товарами (агрегаты отзывов берутся из товаров,
+        поэтому после rebuild_rating_aggregates). Три set-based выражения: строки для категорий без статистики,
+        обнуление категорий без активных товаров и заполнение по GROUP BY.
+        Меняются только разошедшиеся строки: версии остальных (и ETag списка категорий) не растут.
+        """
+        columns = ('product_count', 'min_price', 'max_price', 'rating_sum', 'review_count')
+        products = (
+            select(ProductModel.category_id,
+                   func.count().label('product_count'),
+                   func.min(ProductModel.price).label('min_price'),
+                   func.max(ProductModel.price).label('max_price'),
+                   func.sum(ProductModel.rating_sum).label('rating_sum'),
+                   func.sum(ProductModel.review_count).label('review_count'))
+            .where(ProductModel.is_active == True)
+            .group_by(ProductModel.category_id)
+            .subquery()
+        )
+        insert_stmt = insert(CategoryStatsModel).from_select(
+            ['category_id'],
+            select(CategoryModel.id).where(~exists().where(CategoryStatsModel.category_id == CategoryModel.id))
+        )
+        reset_stmt = (
+            sql_update(CategoryStatsModel)
+            .where(or_(CategoryStatsModel.product_count != 0,
+                       CategoryStatsModel.min_price.is_not(None),
+                       CategoryStatsModel.max_price.is_not(None),
+                       CategoryStatsModel.rating_sum != 0,
+                       CategoryStatsModel.review_count != 0),
+                   ~exists().where(ProductModel.category_id == CategoryStatsModel.category_id,
+                                   ProductModel.is_active == True))
+            .values(product_count=0, min_price=None, max_price=None, rating_sum=0, review_count=0, avg_rating=0.0)
+            .execution_options(synchronize_session=False)
+        )
+        fill_stmt = (
+            sql_update(CategoryStatsModel)
+            .where(CategoryStatsModel.category_id == products.c.category_id,
+                   or_(*(getattr(CategoryStatsModel, column).is_distinct_from(products.c[column])
+                         for column in columns)))
+            .values(avg_rating=average(products.c.rating_sum, products.c.review_count),
+                    **{column: products.c[column] for column in columns})
+            .execution_options(synchronize_session=False)
+        )
+        inserted = await self.db.execute(insert_stmt)
+        reset = await self.db.execute(reset_stmt)
+        fill = await self.db.execute(fill_stmt)
+        return inserted.rowcount + reset.rowcount + fill.rowcount
 
     async def delete(self, id_: int):
         product = await self.get(id_)
@@ -87,4 +396,84 @@ class ProductRepository(BaseSQLRepository):
             return None
         product.is_active = False
         self.db.add(product)
+        # Пересчет границ цен в статистике должен видеть товар уже неактивным
+        await self.db.flush()
+        self._loader().forget(id_)
+        await self._remove_from_category_stats(product)
+        track_product_change(self.db.sync_session, product)
         return product
+
+    async def _add_to_category_stats(self, products: Iterable):
+        """
+        Добавляет активные товары в статистику их категорий одним INSERT ... ON CONFLICT DO UPDATE:
+        строки статистики для категории может еще не быть.
+        """
+        stats: dict[int, dict] = {}
+        for product in products:
+            if not product.is_active:
+                continue
+            row = stats.setdefault(product.category_id, {
+                'category_id': product.category_id, 'product_count': 0, 'min_price': product.price,
+                'max_price': product.price, 'rating_sum': 0, 'review_count': 0,
+            })
+            row['product_count'] += 1
+            row['min_price'] = min(row['min_price'], product.price)
+            row['max_price'] = max(row['max_price'], product.price)
+            row['rating_sum'] += product.rating_sum
+            row['review_count'] += product.review_count
+        if not stats:
+            return
+        for row in stats.values():
+            row['avg_rating'] = row['rating_sum'] / row['review_count'] if row['review_count'] else 0.0
+        stmt = upsert(self.db, CategoryStatsModel).values(list(stats.values()))
+        rating_sum = CategoryStatsModel.rating_sum + stmt.excluded.rating_sum
+        review_count = CategoryStatsModel.review_count + stmt.excluded.review_count
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CategoryStatsModel.category_id],
+            set_={'product_count': CategoryStatsModel.product_count + stmt.excluded.product_count,
+                  'min_price': least_price(CategoryStatsModel.min_price, stmt.excluded.min_price),
+                  'max_price': greatest_price(CategoryStatsModel.max_price, stmt.excluded.max_price),
+                  'rating_sum': rating_sum,
+                  'review_count': review_count,
+                  'avg_rating': average(rating_sum, review_count),
+                  'version': CategoryStatsModel.version + 1,
+                  'updated_at': func.now()}
+        )
+        await self.db.execute(stmt)
+
+    async def _remove_from_category_stats(self, product):
+        """ Убирает товар (уже неактивный в БД) из статистики его категории """
+        await self._shift_category_stats(product.category_id, products=-1, prices=True,
+                                         rating_sum=-product.rating_sum, review_count=-product.review_count)
+
+    async def _move_in_category_stats(self, old_category_id: int, product: ProductModel):
+        """ Учитывает в статистике обновленный товар: новую цену или переход из old_category_id """
+        if product.category_id == old_category_id:
+            await self._shift_category_stats(old_category_id, prices=True)
+            return
+        await self._shift_category_stats(old_category_id, products=-1, prices=True,
+                                         rating_sum=-product.rating_sum, review_count=-product.review_count)
+        await self._add_to_category_stats([product])
+
+    async def _shift_category_stats(self, category_id: int, products: int = 0, prices: bool = False,
+                                    rating_sum: int = 0, review_count: int = 0):
+        """
+        Относительное изменение счетчиков статистики категории одним UPDATE.
+        prices — цены товаров категории изменились (товар уже изменен в БД): min и max берутся пробой индекса.
+        """
+        rating_sum = CategoryStatsModel.rating_sum + rating_sum
+        review_count = CategoryStatsModel.review_count + review_count
+        values = {CategoryStatsModel.product_count: CategoryStatsModel.product_count + products,
+                  CategoryStatsModel.rating_sum: rating_sum,
+                  CategoryStatsModel.review_count: review_count,
+                  CategoryStatsModel.avg_rating: average(rating_sum, review_count)}
+        if prices:
+            values[CategoryStatsModel.min_price] = category_price(func.min, category_id)
+            values[CategoryStatsModel.max_price] = category_price(func.max, category_id)
+        stmt = (
+            sql_update(CategoryStatsModel)
+            .where(CategoryStatsModel.category_id == category_id)
+            .values(values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
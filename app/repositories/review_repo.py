@@ -1,4 +1,4 @@
-from app.repositories.base_repo import BaseSQLRepository
+from app.repositories.base_repo import BaseSQLRepository, LoaderOptions
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update as sql_update
 from app.database import Base
@@ -10,25 +10,45 @@ class ReviewRepository(BaseSQLRepository):
     def __init__(self, db: AsyncSession, model: Base):
         super().__init__(db, model)
 
-    async def get(self, id_: int):
+    async def get(self, id_: int, options: LoaderOptions = ()):
         """ Get review from database """
         stmt = select(ReviewModel).where(ReviewModel.id == id_,
-                                         ReviewModel.is_active == True)
+                                         ReviewModel.is_active == True).options(*options)
         return await self.db.scalar(stmt)
 
-    async def get_all(self):
+    async def get_all(self, options: LoaderOptions = ()):
         """ Get all reviews from database """
-        stmt = select(ReviewModel).where(ReviewModel.is_active == True)
+        stmt = select(ReviewModel).where(ReviewModel.is_active == True).options(*options)
         result = await self.db.scalars(stmt)
         return result.all()
 
-    async def get_reviews_by_product_id(self, id_: int):
-        """ Get review by product ID from database"""
-        stmt = select(ReviewModel).where(ReviewModel.product_id == id_,
-                                         ReviewModel.is_active == True)
-        result = await self.db.scalars(stmt)
-        result = result.all()
-        return result
+    def get_query_for_pagination(self, options: LoaderOptions = ()):
+        """ Query of all active reviews, to be filtered and paginated """
+        return select(ReviewModel).where(ReviewModel.is_active == True).options(*options)
+
+    async def stream_all(self, yield_per: int = 1000):
+        """ Stream all active reviews with a server-side cursor, yield_per rows at a time """
+        stmt = (
+            select(ReviewModel)
+            .where(ReviewModel.is_active == True)
+            .order_by(ReviewModel.id)
+            .execution_options(yield_per=yield_per)
+        )
+        return await self.db.stream_scalars(stmt)
+
+    def get_query_for_product(self, product_id: int, options: LoaderOptions = ()):
+        """
+        Active reviews of a product, newest first. The ordering matches the index
+        ix_reviews_product_id_comment_date_active, so keyset pages are index range scans
+        """
+        stmt = (
+            select(ReviewModel)
+            .where(ReviewModel.product_id == product_id,
+                   ReviewModel.is_active == True)
+            .order_by(ReviewModel.comment_date.desc(), ReviewModel.id.desc())
+            .options(*options)
+        )
+        return stmt
 
     async def get_review_by_user(self,
                                  product_id: int,
@@ -44,6 +64,7 @@ class ReviewRepository(BaseSQLRepository):
         """ Create review in database """
         review = ReviewModel(**review)
         self.db.add(review)
+        await self.db.flush()
         return review
 
 
@@ -56,17 +77,16 @@ class ReviewRepository(BaseSQLRepository):
             .values(**updated_data)
         )
         await self.db.execute(stmt)
-        return self.get(id_)
+        return await self.get(id_)
 
     async def delete(self, id_):
-        """ Soft delete review """
-        stmt = select(ReviewModel).where(ReviewModel.id == id_,
-                                         ReviewModel.is_active == True)
-        review = await self.db.scalar(stmt)
-        if not review:
-            return None
-        review.is_active = False
-        self.db.add(review)
-        return review
-
-
+        """ Soft delete review. Returns (product_id, grade) only if review was active """
+        stmt = (
+            sql_update(ReviewModel)
+            .where(ReviewModel.id == id_,
+                   ReviewModel.is_active == True)
+            .values(is_active=False)
+            .returning(ReviewModel.product_id, ReviewModel.grade)
+        )
+        result = await self.db.execute(stmt)
+        return result.first()
@@ -1,57 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi_filter import FilterDepends
 from fastapi_pagination import Page, Params
 
 from app.schemas import Category as CategoryResponseSchema, CategoryCreate as CategoryCreateSchema, CategoryOut, \
-    CategoryFilter, ResponseModel
+    CategoryFilter, ResponseModel, CategoryTreeNode, CategoryDetail, CategoryWithStats
 from app.core.dependecies.services.category_service import CategoryService, get_category_service
+from app.core.conditional import is_not_modified, not_modified
+from app.core.pagination import KeysetPage, KeysetParams
+from app.core.serialization import json_response
+from app.core.unit_of_work import UnitOfWork
+from app.db_depends import get_unit_of_work
 
 router = APIRouter(
     prefix='/categories',
     tags=['categories']
                    )
 
-@router.get('/', response_model=Page[CategoryOut], status_code=200)
-async def get_category(category_service: CategoryService = Depends(get_category_service),
+@router.get('/', response_model=Page[CategoryWithStats], status_code=200)
+async def get_category(request: Request,
+                       category_service: CategoryService = Depends(get_category_service),
                        filter_: CategoryFilter = FilterDepends(CategoryFilter),
                        params: Params = Depends()):
     """
-    Возвращает список категорий.
+    Возвращает список категорий со статистикой товаров (тем же запросом, что и страница).
+    ETag строится по версиям строк загруженной страницы, отдельного запроса версии нет.
+    Поддерживает If-None-Match: при совпадении отвечает 304 без сериализации страницы.
     """
-    categories = await category_service.get_paginate_categories(filter_=filter_, params=params)
-    return categories
+    categories, validators = await category_service.get_paginate_categories(
+        filter_, params, *sorted(request.query_params.multi_items()))
+    if is_not_modified(request, validators):
+        return not_modified(validators)
+    return json_response(Page[CategoryWithStats], categories, headers=validators.headers)
+
+
+@router.get('/cursor', response_model=KeysetPage[CategoryOut], status_code=200)
+async def get_category_by_cursor(category_service: CategoryService = Depends(get_category_service),
+                                 filter_: CategoryFilter = FilterDepends(CategoryFilter),
+                                 params: KeysetParams = Depends()):
+    """
+    Возвращает список категорий с курсорной пагинацией (без общего количества).
+    """
+    categories = await category_service.get_cursor_categories(filter_=filter_, params=params)
+    return json_response(KeysetPage[CategoryOut], categories)
+
+
+@router.get('/tree', response_model=list[CategoryTreeNode], status_code=200)
+async def get_category_tree(category_service: CategoryService = Depends(get_category_service)):
+    """
+    Возвращает дерево активных категорий из снимка в памяти.
+    К БД обращается только для сверки версии снимка, не чаще раза в CATEGORY_TREE_CHECK_SECONDS.
+    """
+    tree = await category_service.get_category_tree()
+    return Response(content=tree.body, media_type='application/json')
+
+@router.get('/{category_id}', response_model=ResponseModel[CategoryDetail], status_code=200)
+async def get_category_by_id(category_id: int,
+                             category_service: CategoryService = Depends(get_category_service)):
+    """
+    Возвращает категорию по ее ID вместе с активными подкатегориями
+    """
+    category = await category_service.find_category_with_children(category_id)
+    return json_response(ResponseModel[CategoryDetail], {'status': 'success', 'data': category})
 
 @router.post('/', response_model=ResponseModel[CategoryResponseSchema], status_code=201)
 async def create_category(category: CategoryCreateSchema,
-                          category_service: CategoryService = Depends(get_category_service)):
+                          category_service: CategoryService = Depends(get_category_service),
+                          uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Создает новую категорию
     """
-    category = await category_service.create_category(category)
-    return ResponseModel(status='success',
-                        data=category)
+    async with uow:
+        category = await category_service.create_category(category)
+    return json_response(ResponseModel[CategoryResponseSchema], {'status': 'success', 'data': category},
+                         status_code=201)
 
 
 @router.put('/{category_id}', response_model=ResponseModel[CategoryResponseSchema], status_code=200)
 async def update_category(category_id: int,
                           category: CategoryCreateSchema,
-                          category_service: CategoryService = Depends(get_category_service)):
+                          category_service: CategoryService = Depends(get_category_service),
+                          uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Обновляет выбранную категорию по ее ID
     """
-    updated_category = await category_service.update_category(category, category_id)
-    return ResponseModel(status='success',
-                         data=updated_category)
+    async with uow:
+        updated_category = await category_service.update_category(category, category_id)
+    return json_response(ResponseModel[CategoryResponseSchema], {'status': 'success', 'data': updated_category})
 
 
 
 @router.delete('/{category_id}', status_code=200)
 async def delete_category(category_id: int,
-                          category_service: CategoryService = Depends(get_category_service)):
+                          category_service: CategoryService = Depends(get_category_service),
+                          uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Удаляет категорию по ее ID
     """
-    await category_service.delete_category(category_id)
+    async with uow:
+        await category_service.delete_category(category_id)
     return {'message': f'category with ID: {category_id} was deleted successfully'}
 
 
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends
+
+from app.auth import get_current_admin
+from app.database import async_engine, pool_status, replica_set
+
+router = APIRouter(prefix='/internal',
+                   tags=['internal'],
+                   dependencies=[Depends(get_current_admin)])
+
+
+@router.get('/pool')
+async def get_pool_status():
+    """
+    Состояние пула соединений с БД: занятые соединения, overflow и ожидание соединения.
+    """
+    return pool_status(async_engine)
+
+
+@router.get('/replicas')
+async def get_replicas_status():
+    """
+    Состояние реплик для чтения: доступность, отставание и пул соединений.
+    """
+    return [status | {'pool': pool_status(engine)}
+            for status, engine in zip(replica_set.status(), replica_set.engines)]
@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from app.auth import principal_cache
+from app.core.metrics import CONTENT_TYPE, registry
+from app.core.product_suggest import product_suggest_index
+from app.core.response_cache import product_list_cache
+from app.database import InstrumentedQueuePool, async_engine, pool_status, replica_set
+
+router = APIRouter(tags=['metrics'])
+
+pool_connections = registry.gauge('db_pool_connections', 'Pooled connections by state.', ('engine', 'state'))
+pool_checkout_waits = registry.counter('db_pool_checkout_waits_total',
+                                       'Checkouts that waited for a connection: pool and overflow exhausted.',
+                                       ('engine',))
+pool_checkout_wait = registry.counter('db_pool_checkout_wait_seconds_total',
+                                      'Time checkouts spent waiting for a connection to be returned.', ('engine',))
+pool_checkout_wait_max = registry.gauge('db_pool_checkout_wait_seconds_max',
+                                        'Longest wait for a pooled connection.', ('engine',))
+cache_hits = registry.counter('cache_hits_total', 'Cache lookups that found an entry.', ('cache',))
+cache_misses = registry.counter('cache_misses_total', 'Cache lookups that missed.', ('cache',))
+cache_hit_ratio = registry.gauge('cache_hit_ratio', 'Hits divided by lookups since start.', ('cache',))
+
+# Кэши приложения: у каждого есть счетчики hits и misses
+CACHES = {
+    'auth_principals': principal_cache,
+    'product_list': product_list_cache,
+    'product_suggest': product_suggest_index.result_cache,
+}
+
+
+def collect_pools():
+    engines = {'primary': async_engine}
+    engines |= {f'replica{number}': engine for number, engine in enumerate(replica_set.engines, start=1)}
+    for name, engine in engines.items():
+        if not isinstance(engine.pool, InstrumentedQueuePool):
+            continue
+        status = pool_status(engine)
+        for state in ('checked_out', 'checked_in', 'overflow'):
+            pool_connections.set((name, state), status[state])
+        pool_checkout_waits.set((name,), engine.pool.wait_count)
+        pool_checkout_wait.set((name,), engine.pool.wait_time_total)
+        pool_checkout_wait_max.set((name,), engine.pool.wait_time_max)
+
+
+def collect_caches():
+    for name, cache in CACHES.items():
+        lookups = cache.hits + cache.misses
+        cache_hits.set((name,), cache.hits)
+        cache_misses.set((name,), cache.misses)
+        cache_hit_ratio.set((name,), cache.hits / lookups if lookups else 0)
+
+
+registry.add_collector(collect_pools)
+registry.add_collector(collect_caches)
+
+
+@router.get('/metrics', include_in_schema=False)
+async def get_metrics():
+    """
+    Метрики процесса в текстовом формате Prometheus. Каждый воркер отдает свои счетчики.
+    """
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request
 from fastapi_filter import FilterDepends
 from fastapi_pagination import Page, Params
 from starlette.responses import JSONResponse
 
-from app.auth import get_current_seller, get_current_user
+from app.auth import get_current_seller, get_current_user, get_current_admin
+from app.config import PRODUCT_BATCH_MAX_IDS
+from app.core.conditional import is_conditional, is_not_modified, not_modified
+from app.core.bulk_import import NDJSON_CONTENT_TYPES, CSV_CONTENT_TYPES, iter_ndjson_records, iter_csv_records
+from app.core.exceptions import UnsupportedImportFormat, InvalidProductIds
+from app.core.export import ExportFormat, export_response
+from app.core.pagination import KeysetPage, KeysetParams
+from app.core.serialization import json_response, RenderedJSONResponse
+from app.core.unit_of_work import UnitOfWork
+from app.db_depends import get_unit_of_work
 from app.core.dependecies.services.product_service import get_product_service
+from app.core.dependecies.services.review_service import get_review_service
 from app.models.users import User as UserModel
 from app.schemas import ProductCreate as ProductCreateSchema, ProductOut, Product as ProductSchema, ProductFilter, \
-    ResponseModel
+    ProductSearch, ProductSuggestion, ProductImportReport, ProductExport, ResponseModel, Review as ReviewSchema, \
+    ProductBatch
 from app.services.product_service import ProductService
+from app.services.review_service import ReviewService
 
 router = APIRouter(
     prefix='/products',
@@ -21,42 +33,123 @@ async def get_products(product_service:ProductService = Depends(get_product_serv
         params: Params = Depends()):
     """
     Returns a list of filtered or paginated products.
+    Pages are served from the response cache and invalidated by product and rating writes.
     """
-    products = await product_service.get_filtered_products(product_filter, params)
-    return products
+    body = await product_service.get_cached_filtered_products(product_filter, params)
+    return RenderedJSONResponse(body)
+
+
+@router.get('/cursor', response_model=KeysetPage[ProductOut], status_code=200)
+async def get_products_by_cursor(product_service: ProductService = Depends(get_product_service),
+                                 product_filter: ProductFilter = FilterDepends(ProductFilter),
+                                 params: KeysetParams = Depends()):
+    """
+    Returns a list of filtered products with cursor pagination (without total count).
+    """
+    products = await product_service.get_cursor_products(product_filter, params)
+    return json_response(KeysetPage[ProductOut], products)
+
+
+@router.get('/suggest', response_model=list[ProductSuggestion], status_code=200)
+async def suggest_products(q: str = Query(min_length=1, max_length=100),
+                           limit: int = Query(default=10, ge=1, le=50),
+                           product_service: ProductService = Depends(get_product_service)):
+    """
+    Autocomplete by product name prefixes, weighted by rating.
+    Served from an in-memory index and tolerates one typo per word.
+    """
+    suggestions = await product_service.suggest_products(q, limit)
+    return json_response(list[ProductSuggestion], suggestions)
 
 
 @router.get("/search/{product_id}", response_model=ResponseModel[ProductSchema], status_code=200)  ###### refactoring --->
 async def get_product(product_id: int,
+                      request: Request,
                       product_service: ProductService = Depends(get_product_service)):
     """
     Returns a product by ID.
+    Honors If-None-Match/If-Modified-Since: a matching row version is answered with 304
+    without loading or serializing the product. Requests without these headers run only the product query.
     """
+    if is_conditional(request):
+        validators = await product_service.get_product_validators(product_id)
+        if is_not_modified(request, validators):
+            return not_modified(validators)
     product = await product_service.find_active_product(product_id)
-    return ResponseModel(status='success',
-                         data=product)
+    validators = product_service.product_validators(product)
+    return json_response(ResponseModel[ProductSchema], {'status': 'success', 'data': product},
+                         headers=validators.headers)
+
+def batch_ids(ids: list[str] = Query(description='Product IDs: ids=1,2,3 or ids=1&ids=2')) -> list[int]:
+    """ Разбирает id из повторяющегося параметра и/или через запятую """
+    try:
+        parsed = [int(id_) for value in ids for id_ in value.split(',') if id_.strip()]
+    except ValueError:
+        raise InvalidProductIds(PRODUCT_BATCH_MAX_IDS)
+    if not 0 < len(parsed) <= PRODUCT_BATCH_MAX_IDS:
+        raise InvalidProductIds(PRODUCT_BATCH_MAX_IDS)
+    return parsed
+
+
+@router.get('/batch', response_model=ProductBatch, status_code=200)
+async def get_products_batch(ids: list[int] = Depends(batch_ids),
+                             product_service: ProductService = Depends(get_product_service)):
+    """
+    Returns active products by IDs with a single query, in the order requested.
+    IDs of missing or inactive products are returned in `missing`.
+    """
+    batch = await product_service.find_products_batch(ids)
+    return json_response(ProductBatch, batch)
 
-@router.get('/search/{search}/all',response_model=ResponseModel[list[ProductSchema]], status_code=200)
-async def get_product_with_search(search_by_name: str | None,
-                                  search_by_price: int | float | None,
-                                  product_service: ProductService = Depends(get_product_service)):
+@router.get('/search', response_model=KeysetPage[ProductOut], status_code=200)
+async def search_products(search: ProductSearch = Depends(),
+                          params: KeysetParams = Depends(),
+                          product_service: ProductService = Depends(get_product_service)):
     """
-    Find a product with a search string.
+    Full-text search by name and description, ranked by relevance.
+    Optional price and rating ranges are applied in the same query.
     """
-    products = await product_service.get_product_by_search(search_by_name, search_by_price)
-    return ResponseModel(status='success',
-                         data=products)
+    products = await product_service.search_products(search, params)
+    return json_response(KeysetPage[ProductOut], products)
 
 @router.post('/',response_model=ResponseModel[ProductSchema], status_code=201)
 async def create_product(product: ProductCreateSchema,
                          current_user: UserModel = Depends(get_current_seller),
-                         product_service: ProductService = Depends(get_product_service)):
+                         product_service: ProductService = Depends(get_product_service),
+                         uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Add a new product. Available only for users with role 'seller'.
     """
-    product = await product_service.create_product(product, current_user)
-    return ResponseModel(status='success',
-                         data=product)
+    async with uow:
+        product = await product_service.create_product(product, current_user)
+    return json_response(ResponseModel[ProductSchema], {'status': 'success', 'data': product}, status_code=201)
+
+@router.post('/import', response_model=ProductImportReport, status_code=200)
+async def import_products(request: Request,
+                          current_user: UserModel = Depends(get_current_seller),
+                          product_service: ProductService = Depends(get_product_service)):
+    """
+    Bulk import of products from a streamed NDJSON (application/x-ndjson) or CSV (text/csv) body.
+    Valid rows are inserted in batches; invalid rows are reported by row number.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        records = iter_ndjson_records(request.stream())
+    elif content_type in CSV_CONTENT_TYPES:
+        records = iter_csv_records(request.stream())
+    else:
+        raise UnsupportedImportFormat()
+    return await product_service.import_products(records, current_user)
+
+@router.get('/export', status_code=200, dependencies=[Depends(get_current_admin)])
+async def export_products(format: ExportFormat = 'ndjson',
+                          gzip: bool = False,
+                          product_service: ProductService = Depends(get_product_service)):
+    """
+    Streams all active products as NDJSON or CSV, optionally gzip-compressed. Admin only.
+    """
+    products = await product_service.stream_products()
+    return export_response(products, ProductExport, 'products', format, gzip)
 
 @router.get('/search/{category_id}', response_model=list[ProductSchema])
 async def get_products_by_category(category_id: int,
@@ -65,26 +158,39 @@ async def get_products_by_category(category_id: int,
     Returns a list of products by category ID.
     """
     products = await product_service.find_products_by_category(category_id)
-    return products
+    return json_response(list[ProductSchema], products)
+
+@router.get('/{product_id}/reviews', response_model=KeysetPage[ReviewSchema], status_code=200)
+async def get_product_reviews(product_id: int,
+                              params: KeysetParams = Depends(),
+                              review_service: ReviewService = Depends(get_review_service)):
+    """
+    Returns reviews of a product, newest first, with cursor pagination on (comment_date, id).
+    """
+    reviews = await review_service.get_product_reviews(product_id, params)
+    return json_response(KeysetPage[ReviewSchema], reviews)
 
 @router.put('/{product_id}', response_model=ResponseModel[ProductSchema], status_code=200)
 async def update_product(product_id: int,
                          product_data: ProductCreateSchema,
                          user: UserModel = Depends(get_current_user),
-                         product_service: ProductService = Depends(get_product_service)
+                         product_service: ProductService = Depends(get_product_service),
+                         uow: UnitOfWork = Depends(get_unit_of_work)
                          ):
     """ Updating product by ID """
-    product = await product_service.update_product(product_id, product_data, user)
-    return ResponseModel(status='success',
-                         data=product)
+    async with uow:
+        product = await product_service.update_product(product_id, product_data, user)
+    return json_response(ResponseModel[ProductSchema], {'status': 'success', 'data': product})
 
 @router.delete("/{product_id}", status_code=200)
 async def delete_product(product_id: int,
                          user: UserModel = Depends(get_current_user),
-                         product_service: ProductService = Depends(get_product_service)):
+                         product_service: ProductService = Depends(get_product_service),
+                         uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Delete product by ID.
     """
-    await product_service.delete_product(product_id, user)
+    async with uow:
+        await product_service.delete_product(product_id, user)
     return {'message':f'product with id {product_id} has been deleted'}
 
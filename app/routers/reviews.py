@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends
+from fastapi_filter import FilterDepends
 
 from app.core.dependecies.services.review_service import get_review_service
 
 from app.auth import get_current_user, get_current_admin
-from app.schemas import ReviewCreate as ReviewCreateSchema, Review as ReviewSchema
+from app.core.export import ExportFormat, export_response
+from app.core.pagination import KeysetPage, KeysetParams
+from app.core.serialization import json_response
+from app.core.unit_of_work import UnitOfWork
+from app.db_depends import get_unit_of_work
+from app.schemas import ReviewCreate as ReviewCreateSchema, Review as ReviewSchema, ReviewFilter
 from app.models.users import User as UserModel
 from app.services.review_service import ReviewService
 
@@ -12,24 +18,40 @@ router = APIRouter(
     tags=['reviews']
 )
 
-@router.get('/', status_code=200)
-async def get_all_reviews(review_service: ReviewService = Depends(get_review_service)):
-    """ Return list of reviews """
-    return await review_service.get_reviews()
+@router.get('/', response_model=KeysetPage[ReviewSchema], status_code=200)
+async def get_all_reviews(review_service: ReviewService = Depends(get_review_service),
+                          filter_: ReviewFilter = FilterDepends(ReviewFilter),
+                          params: KeysetParams = Depends()):
+    """ Return filtered reviews with cursor pagination, newest first by default """
+    reviews = await review_service.get_reviews(filter_, params)
+    return json_response(KeysetPage[ReviewSchema], reviews)
+
+@router.get('/export', status_code=200, dependencies=[Depends(get_current_admin)])
+async def export_reviews(format: ExportFormat = 'ndjson',
+                         gzip: bool = False,
+                         review_service: ReviewService = Depends(get_review_service)):
+    """ Stream all active reviews as NDJSON or CSV, optionally gzip-compressed. Admin only. """
+    reviews = await review_service.stream_reviews()
+    return export_response(reviews, ReviewSchema, 'reviews', format, gzip)
 
 @router.post('/', response_model=ReviewSchema, status_code=201)
 async def create_review(review_data: ReviewCreateSchema,
                         review_service: ReviewService = Depends(get_review_service),
-                        user: UserModel = Depends(get_current_user)):
+                        user: UserModel = Depends(get_current_user),
+                        uow: UnitOfWork = Depends(get_unit_of_work)):
     """ Create a review """
-    return await review_service.create_review(review_data, user)
+    async with uow:
+        review = await review_service.create_review(review_data, user)
+    return json_response(ReviewSchema, review, status_code=201)
 
 @router.delete('/{review_id}', status_code=200)
 async def delete_review(review_id: int,
                         user: UserModel = Depends(get_current_admin),
-                        review_service: ReviewService = Depends(get_review_service)):
+                        review_service: ReviewService = Depends(get_review_service),
+                        uow: UnitOfWork = Depends(get_unit_of_work)):
     """ Delete a review """
-    await review_service.delete_review(review_id, user)
+    async with uow:
+        await review_service.delete_review(review_id, user)
     return {'message': f'review with id {review_id} was deleted successfully'}
 
 
@@ -4,10 +4,11 @@ from sqlalchemy import select
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.models.users import User as UserModel
-from app.schemas import UserCreate, User as UserSchema
+from app.schemas import UserCreate, UserUpdate, User as UserSchema
+from app.core.unit_of_work import UnitOfWork
 from app.db_depends import get_async_db
-from app.auth import hash_password, verify_password, create_access_token, get_current_user, get_current_admin,  create_refresh_token, \
-    oauth2_scheme
+from app.auth import hash_password_async, verify_password_async, create_access_token, get_current_user, get_current_admin,  create_refresh_token, \
+    oauth2_scheme, invalidate_principal, ACCESS_TOKEN_TYPE
 from app.config import SECRET_KEY, ALGORITHM
 
 import jwt
@@ -34,12 +35,12 @@ async def create_user(user: UserCreate,
 
     # --- Создаем ORM пользователя с хеш-паролем ---
     new_user = UserModel(email=user.email,
-                         hashed_password=hash_password(user.password),
+                         hashed_password=await hash_password_async(user.password),
                          role=user.role)
     # --- Работаем с DB ---
-    db.add(new_user)
-    await db.commit()
-    await db.refresh(new_user)
+    async with UnitOfWork.for_session(db):
+        db.add(new_user)
+        await db.flush()
     return new_user
 
 
@@ -55,7 +56,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(),
                             detail='User with this login not exist',
                             headers={'WWW-Authentication':'Bearer'})
     # --- Проверка правильности введенного пароля ---
-    if not verify_password(form_data.password, user.hashed_password):
+    if not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(status_code=400,
                             detail='Not correct user or password',
                             headers={'WWW-Authentication': 'Bearer'})
@@ -80,9 +81,10 @@ async def refresh_token(refresh_token: str = Depends(oauth2_scheme),
                                           headers={'WWW-Authenticate': 'Bearer'})
     # --- Проверка refresh-token ---
     try:
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithm=ALGORITHM)
+        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get('sub')
-        if not email:
+        # Access-токен не продлевает сам себя; refresh-токены без type выпущены до его появления
+        if not email or payload.get('type') == ACCESS_TOKEN_TYPE:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
@@ -118,3 +120,22 @@ async def get_user_by_id(id: int,
         raise HTTPException(status_code=404, detail='User not found')
     return user
 
+
+@router.patch('/{id}', response_model=UserSchema, status_code=200)
+async def update_user(id: int,
+                      user_data: UserUpdate,
+                      current_user: UserModel = Depends(get_current_admin),
+                      db: AsyncSession = Depends(get_async_db)):
+    """
+    Меняет роль или активность пользователя (только для admin).
+    """
+    user = await db.scalar(select(UserModel).where(UserModel.id == id))
+    if not user:
+        raise HTTPException(status_code=404, detail='User not found')
+    # --- Применяем только переданные поля ---
+    async with UnitOfWork.for_session(db):
+        for field, value in user_data.model_dump(exclude_none=True).items():
+            setattr(user, field, value)
+    # --- Сбрасываем кэш, чтобы новая роль/деактивация применились сразу ---
+    invalidate_principal(user.email)
+    return user
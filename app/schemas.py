@@ -4,6 +4,7 @@ from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from fastapi_filter.contrib.sqlalchemy import Filter as SQLAlchemyFilter
 from app.models.products import Product as ProductModel
 from app.models.categories import Category as CategoryModel
+from app.models.reviews import Review as ReviewModel
 from decimal import Decimal
 from datetime import datetime
 
@@ -53,6 +54,47 @@ class CategoryOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class CategoryStats(BaseModel):
+    """
+    Модель статистики активных товаров категории
+    """
+    product_count: int = Field(description='Количество активных товаров')
+    min_price: Decimal | None = Field(description='Минимальная цена (null, если товаров нет)')
+    max_price: Decimal | None = Field(description='Максимальная цена (null, если товаров нет)')
+    avg_rating: float = Field(description='Средняя оценка по отзывам товаров категории')
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryWithStats(CategoryOut):
+    """
+    Модель для ответа категорий со статистикой товаров.
+    Используется в GET /categories/
+    """
+    stats: CategoryStats | None = Field(description='Статистика товаров (null, если еще не посчитана)')
+
+
+class CategoryDetail(Category):
+    """
+    Модель для ответа с данными категории и ее активными подкатегориями.
+    Используется в GET /categories/{category_id}
+    """
+    children: list[CategoryOut] = Field(description='Активные подкатегории')
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryTreeNode(BaseModel):
+    """
+    Модель узла дерева категорий.
+    Используется в GET /categories/tree
+    """
+    id: int
+    name: str
+    parent_id: int | None
+    children: list['CategoryTreeNode'] = Field(default_factory=list)
+
+
 class CategoryFilter(SQLAlchemyFilter):
     id: int | None = Field(default=None,
                            description='Фильтрация по ID категории')
@@ -61,6 +103,8 @@ class CategoryFilter(SQLAlchemyFilter):
     parent_id: int | None = Field(default=None,
                                   description='Фильтрация по родительской категории')
 
+    order_by: list[str] | None = Field(default=None)
+
     class Constants(SQLAlchemyFilter.Constants):
         model = CategoryModel
 
@@ -100,6 +144,21 @@ class ProductCreate(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductImportError(BaseModel):
+    """ Ошибки одной строки файла импорта """
+    row: int = Field(description='Номер строки данных (без заголовка CSV), с 1')
+    errors: list[str]
+
+
+class ProductImportReport(BaseModel):
+    """ Итог импорта товаров """
+    inserted: int = 0
+    failed: int = 0
+    errors: list[ProductImportError] = Field(default_factory=list,
+                                             description='Ошибки строк (не больше первых max_errors)')
+    errors_truncated: bool = False
+
+
 class Product(ProductCreate):
     """
     Модель для ответа с данными товара.
@@ -110,6 +169,22 @@ class Product(ProductCreate):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductExport(Product):
+    """ Строка выгрузки товаров """
+    id: int
+
+
+class ProductBatchItem(Product):
+    """ Товар в ответе GET /products/batch """
+    id: int
+
+
+class ProductBatch(BaseModel):
+    """ Ответ GET /products/batch: найденные товары и id, которых нет среди активных """
+    items: list[ProductBatchItem]
+    missing: list[int]
+
+
 class UserCreate(BaseModel):
     """
     Модель для создания пользователей.
@@ -120,6 +195,15 @@ class UserCreate(BaseModel):
     role: str = Field(default='buyer', pattern='^(buyer|seller|admin)$', description='Роль: "buyer" / "seller" / "admin"')
 
 
+class UserUpdate(BaseModel):
+    """
+    Модель для изменения роли или активности пользователя администратором.
+    Используется в PATCH запросах
+    """
+    role: str | None = Field(default=None, pattern='^(buyer|seller|admin)$', description='Новая роль пользователя')
+    is_active: bool | None = Field(default=None, description='Активность пользователя')
+
+
 class User(BaseModel):
     """
     Модель для ответа.
@@ -163,6 +247,22 @@ class Review(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class ReviewFilter(SQLAlchemyFilter):
+    """ Фильтрация списка отзывов. По умолчанию новые первыми """
+    product_id: int | None = Field(default=None)
+    user_id: int | None = Field(default=None)
+    grade: int | None = Field(default=None, ge=1, le=5)
+    grade__gte: int | None = Field(default=None, ge=1, le=5, description='Оценка больше или равна')
+    grade__lte: int | None = Field(default=None, ge=1, le=5, description='Оценка меньше или равна')
+    comment_date__gte: datetime | None = Field(default=None, description='Оставлен не раньше')
+    comment_date__lte: datetime | None = Field(default=None, description='Оставлен не позже')
+
+    order_by: list[str] | None = Field(default=['-comment_date', '-id'])
+
+    class Constants(SQLAlchemyFilter.Constants):
+        model = ReviewModel
+
+
 class ProductList(BaseModel):
     items: list[Product] = Field(description='Товары текущей страницы')
     total: int = Field(ge=0, description='Общее количество товаров')
@@ -181,10 +281,39 @@ class ProductOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ProductSuggestion(BaseModel):
+    """ Модель подсказки автодополнения """
+    id: int
+    name: str
+    rating: float
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductSearch(BaseModel):
+    """ Параметры полнотекстового поиска товаров """
+    q: str = Field(min_length=1,
+                   max_length=100,
+                   title='Строка поиска',
+                   description='Слова ищутся в названии и описании как префиксы')
+    price__gte: float | None = Field(title='Минимальная цена',
+                                     description='Цена больше или равна',
+                                     default=None)
+    price__lte: float | None = Field(title='Максимальная цена',
+                                     description='Цена меньше или равна',
+                                     default=None)
+    rating__gte: float | None = Field(title='Минимальный рейтинг',
+                                      description='Рейтинг больше или равен',
+                                      default=None)
+    rating__lte: float | None = Field(title='Максимальный рейтинг',
+                                      description='Рейтинг меньше или равен',
+                                      default=None)
+
+
 class ProductFilter(SQLAlchemyFilter):
     """ Модель для ответа с данными продукта с примененной фильтрацией"""
     id: int | None = Field(default=None)
     name: str | None = Field(default=None)
+    category_id: int | None = Field(default=None)
 
     price__gte: float | None = Field(title='Минимальная цена',
                                      description='Цена больше или равна',
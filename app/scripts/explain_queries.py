@@ -0,0 +1,173 @@
+"""
+Проверка планов запросов репозиториев.
+Каждый read-метод ProductRepository, ReviewRepository и CategoryRepository выполняется
+на базе, его SQL прогоняется через EXPLAIN с отключенным enable_seqscan, и скрипт
+завершается с кодом 1, если в плане остался Seq Scan (т.е. ни один индекс не подошел).
+Запуск: python -m app.scripts.explain_queries [--seed 100000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.pagination import apply_keyset_order
+from app.database import async_engine, async_session_maker
+from app.models import Category as CategoryModel, Product as ProductModel, Review as ReviewModel
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.repositories.review_repo import ReviewRepository
+from app.schemas import ProductFilter
+
+SEED_SQL = (
+    """
+    INSERT INTO users (email, hashed_password, is_active, role)
+    SELECT 'seed-' || md5(random()::text) || '@example.com', 'seed', true,
+           CASE WHEN g % 10 = 0 THEN 'seller' ELSE 'buyer' END
+    FROM generate_series(1, :size / 100 + 10) AS g
+    """,
+    """
+    INSERT INTO categories (name, is_active, parent_id)
+    SELECT 'Seed ' || g, g % 20 <> 0, NULL
+    FROM generate_series(1, :size / 1000 + 10) AS g
+    """,
+    """
+    WITH c AS (SELECT array_agg(id) AS ids FROM categories),
+         s AS (SELECT array_agg(id) AS ids FROM users WHERE role = 'seller')
+    INSERT INTO products (name, description, price, stock, is_active, category_id, seller_id, rating)
+    SELECT initcap(md5(g::text)), NULL, round((random() * 1000)::numeric, 2) + 0.01, 10, g % 10 <> 0,
+           c.ids[1 + g % array_length(c.ids, 1)], s.ids[1 + g % array_length(s.ids, 1)],
+           round((1 + random() * 4)::numeric, 2)
+    FROM generate_series(1, :size) AS g, c, s
+    """,
+    """
+    WITH b AS (SELECT array_agg(id) AS ids FROM users WHERE role = 'buyer')
+    INSERT INTO reviews (user_id, product_id, grade, is_active)
+    SELECT b.ids[1 + p.id % array_length(b.ids, 1)], p.id, 1 + p.id % 5, p.id % 7 <> 0
+    FROM products AS p, b
+    """,
+)
+
+
+def repository_queries(products: ProductRepository,
+                       reviews: ReviewRepository,
+                       categories: CategoryRepository):
+    """ (название, вызов метода, допустим ли полный проход по таблице) """
+
+    async def filtered_page(filter_: ProductFilter, keyset: bool = False):
+        query = filter_.filter(await products.get_query_for_pagination())
+        if keyset:
+            query = apply_keyset_order(query, ProductModel, filter_)
+        return (await products.db.scalars(query.limit(50))).all()
+
+    async def page(query):
+        return (await reviews.db.scalars(query.limit(50))).all()
+
+    async def search_page(search: str, **ranges):
+        query = await products.get_query_for_search(search, **ranges)
+        return (await products.db.scalars(query.limit(50))).all()
+
+    return [
+        ('ProductRepository.get', lambda: products.get(1), False),
+        ('ProductRepository search: full text', lambda: search_page('abc'), False),
+        ('ProductRepository search: full text + price range',
+         lambda: search_page('abc', price_from=10, price_to=500), False),
+        ('ProductRepository.get_all', lambda: products.get_all(), True),
+        ('ProductRepository.get_all_by_category', lambda: products.get_all_by_category(1), False),
+        ('ProductRepository.get_product_by_seller', lambda: products.get_product_by_seller(1, 1), False),
+        ('ProductRepository page: price range',
+         lambda: filtered_page(ProductFilter(price__gte=10, price__lte=20)), False),
+        ('ProductRepository page: rating range',
+         lambda: filtered_page(ProductFilter(rating__gt=4.5, rating__lt=5)), False),
+        ('ProductRepository keyset page: order by -rating',
+         lambda: filtered_page(ProductFilter(order_by=['-rating']), keyset=True), False),
+        ('ReviewRepository.get', lambda: reviews.get(1), False),
+        ('ReviewRepository page: newest first',
+         lambda: page(reviews.get_query_for_pagination()
+                      .order_by(ReviewModel.comment_date.desc(), ReviewModel.id.desc())), False),
+        ('ReviewRepository product page: newest first', lambda: page(reviews.get_query_for_product(1)), False),
+        ('ReviewRepository.get_review_by_user', lambda: reviews.get_review_by_user(1, 1), False),
+        ('CategoryRepository.get', lambda: categories.get(1), False),
+        ('CategoryRepository.get_category_by_parent', lambda: categories.get_category_by_parent(1), False),
+        ('CategoryRepository.get_all', lambda: categories.get_all(), True),
+    ]
+
+
+def find_seq_scans(plan: dict) -> list[str]:
+    """ Возвращает таблицы, которые план читает последовательным сканированием """
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name', '?'))
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+async def seed(size: int):
+    """ Засевает базу синтетическим каталогом и обновляет статистику планировщика """
+    async with async_session_maker() as session:
+        for statement in SEED_SQL:
+            await session.execute(text(statement), {'size': size})
+        await session.commit()
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level='AUTOCOMMIT')
+        await conn.execute(text('ANALYZE users, categories, products, reviews'))
+
+
+async def explain_method(session: AsyncSession, call) -> list[str]:
+    """ Выполняет метод репозитория, собирает его SQL и возвращает найденные Seq Scan """
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    await session.execute(text('SET LOCAL enable_seqscan = off'))
+    event.listen(async_engine.sync_engine, 'before_cursor_execute', capture)
+    try:
+        await call()
+    finally:
+        event.remove(async_engine.sync_engine, 'before_cursor_execute', capture)
+
+    conn = await session.connection()
+    seq_scans = []
+    for statement, parameters in captured:
+        result = await conn.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters)
+        plan = result.scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        seq_scans.extend(find_seq_scans(plan[0]['Plan']))
+    return seq_scans
+
+
+async def main(seed_size: int) -> int:
+    if seed_size:
+        await seed(seed_size)
+
+    failures = 0
+    async with async_session_maker() as session:
+        checks = repository_queries(ProductRepository(db=session, model=ProductModel),
+                                    ReviewRepository(db=session, model=ReviewModel),
+                                    CategoryRepository(db=session, model=CategoryModel))
+        for name, call, full_scan_allowed in checks:
+            seq_scans = await explain_method(session, call)
+            await session.rollback()
+            if seq_scans and not full_scan_allowed:
+                failures += 1
+                print(f'FAIL  {name}: Seq Scan on {", ".join(seq_scans)}')
+            else:
+                print(f'OK    {name}')
+    await async_engine.dispose()
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='EXPLAIN repository queries and fail on sequential scans')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Засеять базу указанным количеством товаров перед проверкой')
+    args = parser.parse_args()
+    failures = asyncio.run(main(args.seed))
+    if failures:
+        print(f'{failures} repository queries fall back to a sequential scan')
+    sys.exit(1 if failures else 0)
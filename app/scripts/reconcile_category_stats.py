@@ -0,0 +1,33 @@
+"""
+Сверка статистики категорий (category_stats) с активными товарами.
+Статистика обновляется инкрементально при каждой записи; сверка исправляет расхождения
+(прямые правки в БД, гонки параллельных записей) и запускается периодически, после reconcile_ratings.
+Запуск: python -m app.scripts.reconcile_category_stats
+"""
+import asyncio
+
+from app.core.unit_of_work import UnitOfWork
+from app.database import async_session_maker
+from app.models import Category as CategoryModel, Product as ProductModel, Review as ReviewModel
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.repositories.review_repo import ReviewRepository
+from app.services.product_service import ProductService
+
+
+async def reconcile_category_stats() -> int:
+    """ Пересобирает разошедшиеся строки статистики set-based запросами и коммитит результат """
+    async with async_session_maker() as session:
+        product_service = ProductService(
+            product_repository=ProductRepository(db=session, model=ProductModel),
+            review_repository=ReviewRepository(db=session, model=ReviewModel),
+            category_repository=CategoryRepository(db=session, model=CategoryModel)
+        )
+        async with UnitOfWork.for_session(session):
+            updated = await product_service.reconcile_category_stats()
+        return updated
+
+
+if __name__ == '__main__':
+    updated = asyncio.run(reconcile_category_stats())
+    print(f'Category stats reconciled, rows changed: {updated}')
@@ -0,0 +1,31 @@
+"""
+Пересчет агрегатов рейтинга товаров (rating, rating_sum, review_count, grade_N_count)
+по активным отзывам. Запуск: python -m app.scripts.reconcile_ratings
+"""
+import asyncio
+
+from app.core.unit_of_work import UnitOfWork
+from app.database import async_session_maker
+from app.models import Category as CategoryModel, Product as ProductModel, Review as ReviewModel
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+from app.repositories.review_repo import ReviewRepository
+from app.services.product_service import ProductService
+
+
+async def reconcile_ratings() -> int:
+    """ Пересобирает агрегаты одним проходом по reviews и коммитит результат """
+    async with async_session_maker() as session:
+        product_service = ProductService(
+            product_repository=ProductRepository(db=session, model=ProductModel),
+            review_repository=ReviewRepository(db=session, model=ReviewModel),
+            category_repository=CategoryRepository(db=session, model=CategoryModel)
+        )
+        async with UnitOfWork.for_session(session):
+            updated = await product_service.reconcile_product_ratings()
+        return updated
+
+
+if __name__ == '__main__':
+    updated = asyncio.run(reconcile_ratings())
+    print(f'Rating aggregates rebuilt, products updated: {updated}')
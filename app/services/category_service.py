@@ -1,5 +1,11 @@
-from fastapi_pagination import Params
+from fastapi_pagination import Page, Params
+from sqlalchemy.orm import joinedload, selectinload
+from app.core.category_tree import CategoryTree, CategoryTreeHolder
+from app.core.conditional import Validators
 from app.core.exceptions import CategoryNotFound
+from app.core.unit_of_work import UnitOfWork
+from app.core.pagination import KeysetParams, apply_keyset_order
+from app.models.categories import Category as CategoryModel
 from app.repositories.category_repo import CategoryRepository
 from app.schemas import CategoryFilter, CategoryCreate as CategoryCreateSchema
 from fastapi_pagination.ext.sqlalchemy import paginate
@@ -7,16 +13,30 @@ from fastapi_pagination.ext.sqlalchemy import paginate
 
 
 class CategoryService:
-    def __init__(self, repository: CategoryRepository):
+    def __init__(self, repository: CategoryRepository, tree: CategoryTreeHolder):
         self._repository = repository
+        self._tree = tree
+        self._uow = UnitOfWork.for_session(repository.db)
 
     async def find_parent_category(self, parent_id):
-        """ Finds a parent category """
+        """ Finds an active parent category in database: tree snapshot may lag behind writes of other workers """
         parent = await self._repository.get_category_by_parent(parent_id)
         if not parent:
             raise CategoryNotFound()
         return parent
 
+    async def find_category_with_children(self, id_: int):
+        """ Finds active category with its active children loaded explicitly """
+        children = selectinload(CategoryModel.children.and_(CategoryModel.is_active == True))
+        category = await self._repository.get(id_, options=[children])
+        if not category:
+            raise CategoryNotFound()
+        return category
+
+    async def get_category_tree(self) -> CategoryTree:
+        """ Returns in-memory snapshot of active categories tree """
+        return await self._tree.get(self._repository)
+
     async def find_all_active_categories(self):
         """ Finds all active categories """
         categories = await self._repository.get_all()
@@ -26,14 +46,40 @@ class CategoryService:
 
     async def get_paginate_categories(self,
                                         filter_: CategoryFilter,
-                                        params: Params
-                                        ) :
-        """ Finds and return filtered & paginated categories """
+                                        params: Params,
+                                        *query_parts
+                                        ) -> tuple[Page, Validators]:
+        """
+        Finds and return filtered & paginated categories with their product stats joined into the same query,
+        and ETag of the page built from row versions of its categories and their stats (no extra query);
+        query_parts make ETag differ per filter and page.
+        No Last-Modified: a category leaving the page can make the newest updated_at of the page older
+        """
+        versions = []
 
-        query = self._repository.get_query_for_pagination()
+        def remember_versions(categories):
+            versions.extend((category.id, category.version, category.stats.version if category.stats else 0)
+                            for category in categories)
+            return categories
 
+        query = self._repository.get_query_for_pagination(options=[joinedload(CategoryModel.stats)])
+        query = filter_.filter(query)
+        page = await paginate(
+            query=query,
+            conn=self._repository.db,
+            params=params,
+            transformer=remember_versions
+        )
+        return page, Validators.build('categories', page.total, versions, *query_parts)
 
+    async def get_cursor_categories(self,
+                                    filter_: CategoryFilter,
+                                    params: KeysetParams
+                                    ):
+        """ Finds and return filtered categories with keyset (cursor) pagination """
+        query = self._repository.get_query_for_pagination()
         query = filter_.filter(query)
+        query = apply_keyset_order(query, CategoryModel, filter_)
         return await paginate(
             query=query,
             conn=self._repository.db,
@@ -47,6 +93,7 @@ class CategoryService:
             if not parent:
                 raise CategoryNotFound()
         category = await self._repository.create(category)
+        self._uow.after_commit(self._rebuild_tree)
         return category
 
     async def update_category(self, category: CategoryCreateSchema, id_: int):
@@ -62,6 +109,7 @@ class CategoryService:
 
         update_data = category.model_dump()
         updated_db_data = await self._repository.update(id_, update_data)
+        self._uow.after_commit(self._rebuild_tree)
         return updated_db_data
 
     async def delete_category(self, id_: int):
@@ -69,4 +117,9 @@ class CategoryService:
         if not category:
             raise CategoryNotFound()
         await self._repository.delete(id_)
+        self._uow.after_commit(self._rebuild_tree)
+
+    async def _rebuild_tree(self):
+        """ Snapshot is rebuilt from committed data only """
+        await self._tree.rebuild(self._repository)
 
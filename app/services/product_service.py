@@ -1,26 +1,49 @@
+from collections.abc import AsyncIterable
+
 from fastapi import HTTPException
-from fastapi_pagination import Params
+from fastapi_pagination import Page, Params
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError, DataError
 from fastapi_pagination.ext.sqlalchemy import paginate
 
+from app.config import PRODUCT_IMPORT_BATCH_SIZE, PRODUCT_IMPORT_MAX_ERRORS
+from app.core.bulk_import import ImportRecord, chunked
+from app.core.conditional import Validators
+from app.core.serialization import dump_json
+from app.core.unit_of_work import UnitOfWork
+from app.database import use_primary
+from app.core.pagination import KeysetParams, apply_keyset_order
+from app.core.product_suggest import ProductSuggestIndex, product_suggest_index
+from app.core.response_cache import ResponseCache, product_list_cache, canonical_key, category_tag, rating_tag, \
+    product_tag, ALL_TAG
+from app.models.products import Product as ProductORM
 from app.models.users import User as UserModel
-from app.repositories.products_repo import ProductRepository
+from app.repositories.products_repo import ProductRepository, prefix_tsquery
 from app.core.exceptions import (ProductOwnershipError,
                                  ProductNotFound,
                                  CategoryNotFound,
                                  AccessDenied)
 from app.repositories.review_repo import ReviewRepository
 from app.repositories.category_repo import CategoryRepository
-from app.schemas import Product as ProductModel, ProductFilter, ProductCreate as ProductCreateSchema
+from app.schemas import ProductFilter, ProductSearch, ProductCreate as ProductCreateSchema, \
+    ProductImportReport, ProductImportError, ProductOut
+
+ProductPage = Page[ProductOut]
 
 
 class ProductService:
     def __init__(self, product_repository: ProductRepository,
                  review_repository: ReviewRepository,
-                 category_repository: CategoryRepository):
+                 category_repository: CategoryRepository,
+                 suggest_index: ProductSuggestIndex = product_suggest_index,
+                 response_cache: ResponseCache = product_list_cache):
         self._product_repository = product_repository
         self._review_repository = review_repository
         self._category_repository = category_repository
-        
+        self._suggest_index = suggest_index
+        self._response_cache = response_cache
+        self._uow = UnitOfWork.for_session(product_repository.db)
+
     async def get_product_by_owner(self, product_id: int,
                                          current_user: UserModel):
         """ Returns the owners product """
@@ -38,20 +61,128 @@ class ProductService:
         query = filter_.filter(query)
         return await paginate(conn=self._product_repository.db, query=query, params=params)
 
+    @staticmethod
+    def _listing_tags(filter_: ProductFilter) -> list[str]:
+        """ Tags of the listing's row set: category scope, and rating when it filters or orders by rating """
+        tags = [ALL_TAG, category_tag(filter_.category_id)]
+        orders_by_rating = any(field.lstrip('+-') == 'rating' for field in filter_.order_by or ())
+        if filter_.rating__gt is not None or filter_.rating__lt is not None or orders_by_rating:
+            tags.append(rating_tag(filter_.category_id))
+        return tags
+
+    async def get_cached_filtered_products(self,
+                                           filter_: ProductFilter,
+                                           params: Params
+                                           ) -> bytes:
+        """
+        Returns serialized page of filtered products from response cache.
+        On miss runs get_filtered_products on the primary and stores the body tagged with listing scope
+        and page product IDs: a lagging replica would put pre-write data under the freshly bumped tag versions.
+        """
+        key = canonical_key('products:list', filter_.model_dump(exclude_none=True), params.model_dump())
+        body = await self._response_cache.get(key)
+        if body is not None:
+            return body
+        tags = self._listing_tags(filter_)
+        # Версии снимаются до запроса: запись, закоммиченная во время запроса, не попадет в кэш как свежая
+        versions = await self._response_cache.tag_versions(tags)
+        use_primary(self._product_repository.db)
+        page = await self.get_filtered_products(filter_, params)
+        body = dump_json(ProductPage, page)
+        await self._response_cache.set(key, body, tags + [product_tag(item.id) for item in page.items], versions)
+        return body
+
+    async def invalidate_product_cache(self, product_id: int, *category_ids: int | None):
+        """ Drops cached listings affected by a product write in given categories. Call after commit """
+        await self._response_cache.invalidate(product_tag(product_id), category_tag(None),
+                                              *(category_tag(id_) for id_ in category_ids if id_ is not None))
+
+    async def invalidate_rating_cache(self, product_id: int, category_id: int):
+        """ Drops cached listings which show the product or depend on ratings. Call after commit """
+        await self._response_cache.invalidate(product_tag(product_id), rating_tag(None), rating_tag(category_id))
+
+    async def get_cursor_products(self,
+                                  filter_: ProductFilter,
+                                  params: KeysetParams
+                                  ):
+        """ Returns filtered products with keyset (cursor) pagination, without total count """
+        query = await self._product_repository.get_query_for_pagination()
+        query = filter_.filter(query)
+        query = apply_keyset_order(query, ProductORM, filter_)
+        return await paginate(conn=self._product_repository.db, query=query, params=params)
+
     async def create_product(self, product_data: ProductCreateSchema, user: UserModel):
         if user.role != 'seller' and user.role != 'admin':
             raise AccessDenied()
-        category = self._product_repository.get(product_data.category_id)
+        category = await self._category_repository.load(product_data.category_id)
         if not category:
             raise CategoryNotFound()
         data = product_data.model_dump()
         data.update({'seller_id': user.id})
         new_product = await self._product_repository.create(data)
+        self._uow.after_commit(lambda: self.invalidate_product_cache(new_product.id, new_product.category_id))
         return new_product
 
+    async def import_products(self, records: AsyncIterable[ImportRecord], user: UserModel,
+                              batch_size: int = PRODUCT_IMPORT_BATCH_SIZE,
+                              max_errors: int = PRODUCT_IMPORT_MAX_ERRORS) -> ProductImportReport:
+        """
+        Bulk import of streamed rows. Each chunk of batch_size rows is validated against ProductCreate,
+        checked against one prefetched set of category IDs and inserted with one executemany
+        in its own transaction, so memory and transaction size do not grow with the file.
+        The only service that commits itself: one unit of work per batch, not per request.
+        """
+        if user.role != 'seller' and user.role != 'admin':
+            raise AccessDenied()
+        category_ids = await self._category_repository.get_active_ids()
+        report = ProductImportReport()
+
+        def reject(row: int, errors: list[str]):
+            report.failed += 1
+            if len(report.errors) < max_errors:
+                report.errors.append(ProductImportError(row=row, errors=errors))
+            else:
+                report.errors_truncated = True
+
+        async for chunk in chunked(records, batch_size):
+            rows, batch = [], []
+            for record in chunk:
+                if record.error:
+                    reject(record.row, [record.error])
+                    continue
+                try:
+                    product = ProductCreateSchema.model_validate(record.data)
+                except ValidationError as error:
+                    reject(record.row, [f"{'.'.join(map(str, item['loc']))}: {item['msg']}"
+                                        for item in error.errors()])
+                    continue
+                if product.category_id not in category_ids:
+                    reject(record.row, ['category_id: Category not found'])
+                    continue
+                rows.append(record.row)
+                batch.append(product.model_dump() | {'seller_id': user.id})
+            if not batch:
+                continue
+            try:
+                await self._product_repository.bulk_create(batch)
+                await self._uow.commit()
+            except (IntegrityError, DataError) as error:
+                await self._uow.rollback()
+                for row in rows:
+                    reject(row, [f'Batch rejected by database: {error.orig}'])
+            else:
+                report.inserted += len(batch)
+        if report.inserted:
+            await self._response_cache.invalidate(ALL_TAG)
+        return report
+
+    async def stream_products(self):
+        """ Returns an async stream of all active products for export """
+        return await self._product_repository.stream_all()
+
     async def find_products_by_category(self, category_id: int):
         """ Find and returns all products by category ID"""
-        category = await self._category_repository.get(category_id)
+        category = await self._category_repository.load(category_id)
         if not category:
             raise CategoryNotFound()
         products = await self._product_repository.get_all_by_category(category_id)
@@ -67,79 +198,113 @@ class ProductService:
             raise ProductNotFound()
         return all_products
 
-    async def get_product_by_search(self, search_name: str | None,
-                                    search_price: int | float | None):
-        #--- поиск по имени ---
-        search_name = search_name.strip()
-        if not search_name:
-            raise ProductNotFound()
-        products_name = await self._product_repository.get_searched_products_by_name(search_name)
-        if not products_name:
+    async def search_products(self, search: ProductSearch, params: KeysetParams):
+        """ Returns products ranked by full-text relevance with keyset pagination """
+        if not prefix_tsquery(search.q):
             raise ProductNotFound()
-        # --- поиск по цене
-        products_price = await self._product_repository.get_searched_products_by_price(search_price)
-        if not products_price:
-            raise ProductNotFound()
-        products_name = [ProductModel.model_validate(p) for p in products_name]
-        products_price = [ProductModel.model_validate(p) for p in products_price]
-        total_prods = products_name + products_price
-        return total_prods
+        query = await self._product_repository.get_query_for_search(search.q,
+                                                                     price_from=search.price__gte,
+                                                                     price_to=search.price__lte,
+                                                                     rating_from=search.rating__gte,
+                                                                     rating_to=search.rating__lte)
+        return await paginate(conn=self._product_repository.db, query=query, params=params)
 
 
-    async def find_active_product(self, product_id: int, search: str | None):
+    async def suggest_products(self, query: str, limit: int):
+        """
+        Returns autocomplete suggestions from the in-memory index.
+        Database is queried only to load it or, once in a refresh interval, to pick up changes of other processes
+        """
+        index = await self._suggest_index.ensure_fresh(self._product_repository)
+        return index.suggest(query, limit)
+
+    async def find_active_product(self, product_id: int, search: str | None = None):
         """ Finds active product by ID """
         product = await self._product_repository.get(product_id)
         if not product:
             raise ProductNotFound()
         return product
 
-    async def calculate_avg_rating(self, product_id: int):
-        """ Method for calculating the average rating of a product"""
-        product = await self._product_repository.get(product_id)
-        if not product:
+    async def find_products_batch(self, ids: list[int]) -> dict:
+        """
+        Finds active products by IDs with one query. Items keep the order of the first occurrence
+        of each ID; IDs of missing or inactive products are listed in `missing`.
+        """
+        ids = list(dict.fromkeys(ids))
+        found = {product.id: product for product in await self._product_repository.get_many(ids)}
+        return {'items': [found[id_] for id_ in ids if id_ in found],
+                'missing': [id_ for id_ in ids if id_ not in found]}
+
+    async def get_product_validators(self, product_id: int) -> Validators:
+        """ Returns ETag/Last-Modified of active product from its row version only """
+        version = await self._product_repository.get_version(product_id)
+        if not version:
             raise ProductNotFound()
-        reviews = await self._review_repository.get_reviews_by_product_id(product_id)
-        if not reviews:
-            return 0.0
-        total = sum(rev.grade for rev in reviews)
-        avg = total / len(reviews)
-        return avg
-
-    async def push_product_rating(self, product_id: int):
-        """ Method is pushing product rating """
-        new_rating = await self.calculate_avg_rating(product_id)
-        await self._product_repository.update_product_rating(product_id, new_rating)
-        await self._product_repository.db.commit()
+        return self.product_validators(version)
+
+    @staticmethod
+    def product_validators(product) -> Validators:
+        """ ETag/Last-Modified from version and updated_at of an already loaded product (or its version row) """
+        return Validators.build('product', product.id, product.version, last_modified=product.updated_at)
+
+    async def push_product_rating(self, product_id: int, grade: int, delta: int = 1):
+        """ Method is pushing one review grade (delta=1) or removing it (delta=-1) from product rating """
+        await self._product_repository.update_product_rating(product_id, grade, delta)
+
+    async def reconcile_product_ratings(self):
+        """ Method rebuilds rating aggregates of all products from reviews """
+        updated = await self._product_repository.rebuild_rating_aggregates()
+        if updated:
+            self._uow.after_commit(lambda: self._response_cache.invalidate(ALL_TAG))
+        return updated
+
+    async def reconcile_category_stats(self):
+        """ Method reconciles category stats with active products; only drifted rows are rewritten """
+        return await self._product_repository.rebuild_category_stats()
 
     async def update_product(self, product_id: int,
                              product_data: ProductCreateSchema,
                              user: UserModel):
-        """ Method is updating product data """
-        product = await self._product_repository.get(product_id)
-        if not product:
-            raise ProductNotFound()
-        owner_product = await self._product_repository.get_product_by_seller(product_id, user.id)
-        if not owner_product:
-            raise ProductOwnershipError()
-        category = await self._category_repository.get(product_data.category_id)
-        if not category:
-            raise CategoryNotFound()
-
-        updated_product = await self._product_repository.update(product_id, product_data.model_dump())
-        await self._product_repository.db.commit()  # Обратить внимание! Нужно переделать, чтобы транзакциями управлял не сервис!
-        await self._product_repository.db.refresh(updated_product)
+        """
+        Method is updating product data.
+        Fast path is one ownership-checked UPDATE ... RETURNING for a product that stays in its category.
+        Only when it matches no row the product is read to tell not found, forbidden,
+        missing category and a category move apart.
+        """
+        data = product_data.model_dump()
+        updated_product = await self._product_repository.update_owned(product_id, user.id, data, same_category=True)
+        if updated_product is not None:
+            old_category_id = updated_product.category_id
+        else:
+            product = await self._product_repository.load(product_id)
+            if not product:
+                raise ProductNotFound()
+            if product.seller_id != user.id:
+                raise ProductOwnershipError()
+            category = await self._category_repository.load(data['category_id'])
+            if not category:
+                raise CategoryNotFound()
+            # Товар переходит в другую категорию: старую запоминаем до UPDATE, он синхронизирует объект
+            old_category_id = product.category_id
+            updated_product = await self._product_repository.update_owned(product_id, user.id, data)
+            if updated_product is None:
+                raise ProductNotFound()
+        self._uow.after_commit(lambda: self.invalidate_product_cache(product_id, old_category_id,
+                                                                     updated_product.category_id))
         return updated_product
 
     async def delete_product(self, product_id, user):
-        """ Method is deleting product """
-        product = await self._product_repository.get(product_id)
-        if not product:
-            raise ProductNotFound()
-        owner_product = self._product_repository.get_product_by_seller(product_id, user.id)
-        if not owner_product:
+        """
+        Method is deleting product with one ownership-checked UPDATE ... RETURNING.
+        The product is read only when no row matched, to tell not found from forbidden.
+        """
+        deleted = await self._product_repository.delete_owned(product_id, user.id)
+        if deleted is None:
+            product = await self._product_repository.get(product_id)
+            if not product:
+                raise ProductNotFound()
             raise ProductOwnershipError()
-        await self._product_repository.delete(product_id)
-        await self._product_repository.db.commit()  # Обратить внимание! Нужно переделать, чтобы транзакциями управлял не сервис!
+        self._uow.after_commit(lambda: self.invalidate_product_cache(product_id, deleted.category_id))
 
 
 
@@ -1,14 +1,17 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi_pagination.ext.sqlalchemy import paginate
 
 from app.models.users import User as UserModel
 from app.models.reviews import Review as ReviewModel
+from app.core.pagination import KeysetParams, apply_keyset_order
+from app.core.unit_of_work import UnitOfWork
 
 from app.core.exceptions import ReviewNotFound, ProductNotFound, SellerCannotLeaveReview, CanReviewOnlyOnce, \
     AccessDenied
 from app.repositories.products_repo import ProductRepository
 from app.repositories.review_repo import ReviewRepository
-from app.schemas import ReviewCreate as ReviewCreateSchema
+from app.schemas import ReviewCreate as ReviewCreateSchema, ReviewFilter
 from app.services.product_service import ProductService
 
 
@@ -21,18 +24,32 @@ class ReviewService:
         self._review_repository = review_repository
         self._product_repository = product_repository
         self._product_service = product_service
+        self._uow = UnitOfWork.for_session(review_repository.db)
 
-    async def get_reviews(self):
-        """ Returns review list """
-        return await self._review_repository.get_all()
+    async def get_reviews(self, filter_: ReviewFilter, params: KeysetParams):
+        """ Returns filtered reviews with keyset (cursor) pagination """
+        query = filter_.filter(self._review_repository.get_query_for_pagination())
+        query = apply_keyset_order(query, ReviewModel, filter_)
+        return await paginate(conn=self._review_repository.db, query=query, params=params)
 
+    async def get_product_reviews(self, product_id: int, params: KeysetParams):
+        """ Returns active reviews of an active product, newest first, with keyset pagination """
+        product = await self._product_repository.load(product_id)
+        if not product:
+            raise ProductNotFound()
+        query = self._review_repository.get_query_for_product(product_id)
+        return await paginate(conn=self._review_repository.db, query=query, params=params)
+
+    async def stream_reviews(self):
+        """ Returns an async stream of all active reviews for export """
+        return await self._review_repository.stream_all()
 
     async def create_review(self, review_data: ReviewCreateSchema,
                             user: UserModel):
         """ Method allows a user to leave a review for a product """
         if user.role == 'seller':
             raise SellerCannotLeaveReview()
-        product = await self._product_repository.get(review_data.product_id)
+        product = await self._product_repository.load(review_data.product_id)
         if not product:
             raise ProductNotFound()
         if await self.user_already_reviewed_product(product.id, user.id):
@@ -40,9 +57,9 @@ class ReviewService:
         review_data = review_data.model_dump()
         review_data.update({'user_id': user.id})
         review = await self._review_repository.create(review_data)
-        await self._product_service.push_product_rating(product.id)
-        await self._review_repository.db.commit() # Обратить внимание! Нужно переделать, чтобы транзакциями управлял не сервис!
-        await self._review_repository.db.refresh(review)
+        await self._product_service.push_product_rating(product.id, review.grade)
+        self._uow.after_commit(lambda: self._product_service.invalidate_rating_cache(product.id,
+                                                                                     product.category_id))
         return review
 
     async def user_already_reviewed_product(self,
@@ -63,13 +80,14 @@ class ReviewService:
         review = await self._review_repository.get(review_id)
         if not review:
             raise ReviewNotFound()
-        product = await self._product_repository.get(review.product_id)
+        product = await self._product_repository.load(review.product_id)
         if not product:
             raise ProductNotFound()
-        await self._review_repository.delete(review_id)
-        await self._review_repository.db.commit() # Обратить внимание! Нужно переделать, чтобы транзакциями управлял не сервис!
-        await self._product_service.push_product_rating(product.id)
-        await self._review_repository.db.commit() # Обратить внимание! Нужно переделать, чтобы транзакциями управлял не сервис!
+        deleted = await self._review_repository.delete(review_id)
+        if deleted:
+            await self._product_service.push_product_rating(deleted.product_id, deleted.grade, delta=-1)
+            self._uow.after_commit(lambda: self._product_service.invalidate_rating_cache(product.id,
+                                                                                         product.category_id))
 
 
 
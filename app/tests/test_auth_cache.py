@@ -0,0 +1,78 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.auth
+import app.routers.users
+from app.auth import create_refresh_token
+from app.core.cache import TTLCache
+from app.models import User
+
+
+@pytest.fixture
+def users(seed_catalog, auth_headers) -> dict[str, dict]:
+    """ Покупатель и админ в базе, возвращает их заголовки авторизации """
+    seed_catalog(User(id=2, email='buyer@mail.com', hashed_password='x', role='buyer'),
+                 User(id=3, email='admin@mail.com', hashed_password='x', role='admin'))
+    return {'buyer': auth_headers('buyer', 2), 'admin': auth_headers('admin', 3)}
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    now[0] = 11
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_principal_is_cached_until_role_change(db_client: TestClient, users, sql_statements):
+    buyer = users['buyer']
+    assert db_client.get('/users/me', headers=buyer).json()['role'] == 'buyer'
+    sql_statements.clear()
+
+    assert db_client.get('/users/me', headers=buyer).status_code == 200
+    assert sql_statements == []
+
+    db_client.patch('/users/2', json={'role': 'seller'}, headers=users['admin'])
+
+    assert db_client.get('/users/me', headers=buyer).json()['role'] == 'seller'
+
+
+def test_deactivated_user_is_rejected_immediately(db_client: TestClient, users):
+    buyer = users['buyer']
+    db_client.get('/users/me', headers=buyer)
+
+    db_client.patch('/users/2', json={'is_active': False}, headers=users['admin'])
+
+    assert db_client.get('/users/me', headers=buyer).status_code == 401
+
+
+def test_trusted_claims_skip_database(db_client: TestClient, users, sql_statements, monkeypatch):
+    monkeypatch.setattr(app.auth, 'AUTH_TRUST_TOKEN_CLAIMS', True)
+    sql_statements.clear()
+
+    response = db_client.get('/users/me', headers=users['buyer'])
+
+    assert response.json() == {'id': 2, 'email': 'buyer@mail.com', 'is_active': True, 'role': 'buyer'}
+    assert sql_statements == []
+
+
+@pytest.mark.parametrize('trust_claims', [False, True])
+def test_refresh_token_is_not_accepted_as_access_token(db_client: TestClient, users, monkeypatch, trust_claims):
+    monkeypatch.setattr(app.auth, 'AUTH_TRUST_TOKEN_CLAIMS', trust_claims)
+    monkeypatch.setattr(app.routers.users, 'SECRET_KEY', app.auth.SECRET_KEY)
+    token = create_refresh_token({'sub': 'buyer@mail.com', 'role': 'buyer', 'id': 2})
+
+    response = db_client.get('/users/me', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 401
+    refreshed = db_client.post('/users/refresh-token', headers={'Authorization': f'Bearer {token}'})
+    assert refreshed.status_code == 200
+    assert db_client.get('/users/me', headers={'Authorization': f"Bearer {refreshed.json()['access_token']}"}) \
+        .status_code == 200
@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import Category
+
+
+@pytest.fixture
+def catalog(seed_catalog):
+    """ Две категории, у первой подкатегория и по 5 товаров в каждой """
+    seed_catalog(Category(id=2, name='Smartphones', parent_id=1), Category(id=3, name='Books'),
+                 products=[{'category_id': 1 + i % 3} for i in range(1, 16)])
+
+
+def selects(statements: list[str]) -> list[str]:
+    return [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('/categories/', 2),          # COUNT + страница (ETag по версиям ее строк)
+    ('/categories/cursor', 1),    # только страница
+    ('/categories/tree', 2),      # версия таблицы + загрузка снимка при первом обращении
+    ('/categories/1', 2),         # категория + явно запрошенные подкатегории
+])
+def test_category_read_statement_count(db_client: TestClient, catalog, sql_statements, url, expected):
+    sql_statements.clear()
+
+    response = db_client.get(url)
+
+    assert response.status_code == 200
+    assert len(selects(sql_statements)) == expected
+    assert not any('FROM products' in statement for statement in sql_statements)
+
+
+def test_category_tree_is_served_without_sql(db_client: TestClient, catalog, sql_statements):
+    db_client.get('/categories/tree')
+    sql_statements.clear()
+
+    db_client.get('/categories/tree')
+
+    assert sql_statements == []
+
+
+def test_category_detail_includes_children(db_client: TestClient, catalog):
+    response = db_client.get('/categories/1')
+
+    assert [child['id'] for child in response.json()['data']['children']] == [2]
+
+
+@pytest.mark.parametrize('method, url, payload, expected', [
+    ('post', '/categories/', {'name': 'Games'}, 3),                    # INSERT + перестроение дерева (версия + строки)
+    ('put', '/categories/2', {'name': 'Mobiles', 'parent_id': 1}, 6),  # get + родитель + UPDATE + get + дерево
+    ('delete', '/categories/3', None, 5),                               # get x2 + UPDATE + дерево
+])
+def test_category_write_statement_count(db_client: TestClient, catalog, sql_statements,
+                                        method, url, payload, expected):
+    db_client.get('/categories/tree')
+    sql_statements.clear()
+
+    response = db_client.request(method.upper(), url, json=payload)
+
+    assert response.status_code in (200, 201)
+    assert len(sql_statements) == expected
@@ -0,0 +1,129 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update, delete
+
+from app.models import Category, CategoryStats, Product, User
+from app.repositories.products_repo import ProductRepository
+
+STATS = ('product_count', 'min_price', 'max_price', 'rating_sum', 'review_count', 'avg_rating')
+USERS = {'seller': 1, 'buyer': 2, 'admin': 3}
+
+
+@pytest.fixture
+def catalog(seed_catalog):
+    seed_catalog(User(id=2, email='buyer@mail.com', hashed_password='x', role='buyer'),
+                 User(id=3, email='admin@mail.com', hashed_password='x', role='admin'),
+                 Category(id=2, name='Tablets'))
+
+
+@pytest.fixture
+def headers(auth_headers):
+    return lambda role: auth_headers(role, USERS[role])
+
+
+def run(session_maker, scenario):
+    async def execute():
+        async with session_maker() as session:
+            result = await scenario(session)
+            await session.commit()
+            return result
+
+    return asyncio.run(execute())
+
+
+def read_stats(session_maker) -> dict[int, tuple]:
+    async def scenario(session):
+        rows = await session.scalars(select(CategoryStats))
+        return {row.category_id: tuple(getattr(row, column) for column in STATS) for row in rows}
+
+    return run(session_maker, scenario)
+
+
+def reconcile(session_maker) -> int:
+    return run(session_maker, lambda session: ProductRepository(session, Product).rebuild_category_stats())
+
+
+def test_stats_follow_product_and_review_writes(db_client: TestClient, catalog, session_maker, headers):
+    seller, buyer, admin = headers('seller'), headers('buyer'), headers('admin')
+    for price in ('10.00', '25.00', '40.00'):
+        response = db_client.post('/products/', json={'name': f'Phone {price}', 'price': price, 'stock': 1,
+                                                      'category_id': 1}, headers=seller)
+        assert response.status_code == 201, response.text
+    ids = [1, 2, 3]
+    db_client.post('/reviews/', json={'product_id': ids[0], 'grade': 5}, headers=buyer)
+    review = db_client.post('/reviews/', json={'product_id': ids[1], 'grade': 2}, headers=buyer)
+    assert review.status_code == 201, review.text
+    review = review.json()
+
+    assert read_stats(session_maker)[1] == (3, Decimal('10.00'), Decimal('40.00'), 7, 2, 3.5)
+
+    # Граничная цена уходит: максимум перечитывается по оставшимся товарам
+    db_client.put(f'/products/{ids[2]}', json={'name': 'Phone 40', 'price': '15.00', 'stock': 1, 'category_id': 1},
+                  headers=seller)
+    # Товар с отзывом переезжает вместе с оценкой
+    db_client.put(f'/products/{ids[1]}', json={'name': 'Phone 25', 'price': '25.00', 'stock': 1, 'category_id': 2},
+                  headers=seller)
+    db_client.delete(f'/products/{ids[0]}', headers=seller)
+
+    stats = read_stats(session_maker)
+    assert stats[1] == (1, Decimal('15.00'), Decimal('15.00'), 0, 0, 0.0)
+    assert stats[2] == (1, Decimal('25.00'), Decimal('25.00'), 2, 1, 2.0)
+
+    db_client.delete(f"/reviews/{review['id']}", headers=admin)
+
+    assert read_stats(session_maker)[2] == (1, Decimal('25.00'), Decimal('25.00'), 0, 0, 0.0)
+    # Инкрементальные изменения совпадают с полным пересчетом
+    assert reconcile(session_maker) == 0
+
+
+def test_category_list_includes_stats_and_revalidates_on_product_writes(db_client: TestClient, catalog,
+                                                                        sql_statements, headers):
+    db_client.post('/products/', json={'name': 'Phone', 'price': '10.00', 'stock': 1, 'category_id': 1},
+                   headers=headers('seller'))
+    sql_statements.clear()
+
+    first = db_client.get('/categories/')
+
+    stats = {item['id']: item['stats'] for item in first.json()['items']}
+    assert stats == {1: {'product_count': 1, 'min_price': '10.00', 'max_price': '10.00', 'avg_rating': 0.0},
+                     2: None}
+    assert len(sql_statements) == 2  # COUNT + страница со статистикой
+
+    db_client.post('/products/', json={'name': 'Phone 2', 'price': '5.00', 'stock': 1, 'category_id': 1},
+                   headers=headers('seller'))
+    response = db_client.get('/categories/', headers={'If-None-Match': first.headers['etag']})
+
+    assert response.status_code == 200
+    assert response.json()['items'][0]['stats']['min_price'] == '5.00'
+
+
+def test_reconciliation_repairs_only_drifted_rows(catalog, session_maker):
+    async def seed(session):
+        session.add_all([Category(id=3, name='Archive'),
+                         Product(id=1, name='Phone', price=Decimal(10), stock=1, category_id=1, seller_id=1,
+                                 rating_sum=9, review_count=2),
+                         Product(id=2, name='Phone 2', price=Decimal(30), stock=1, category_id=1, seller_id=1),
+                         Product(id=3, name='Old tablet', price=Decimal(5), stock=1, category_id=2, seller_id=1,
+                                 is_active=False)])
+        session.add_all([CategoryStats(category_id=1, product_count=7, min_price=Decimal(1), max_price=Decimal(30)),
+                         CategoryStats(category_id=2, product_count=1, min_price=Decimal(5), max_price=Decimal(5))])
+
+    run(session_maker, seed)
+
+    assert reconcile(session_maker) == 3  # строка для категории 3 + обнуление категории 2 + категория 1
+    assert read_stats(session_maker) == {1: (2, Decimal('10.00'), Decimal('30.00'), 9, 2, 4.5),
+                                         2: (0, None, None, 0, 0, 0.0),
+                                         3: (0, None, None, 0, 0, 0.0)}
+    assert reconcile(session_maker) == 0
+
+    async def corrupt(session):
+        await session.execute(update(CategoryStats).where(CategoryStats.category_id == 1).values(rating_sum=0))
+        await session.execute(delete(CategoryStats).where(CategoryStats.category_id == 3))
+
+    run(session_maker, corrupt)
+
+    assert reconcile(session_maker) == 2
+    assert read_stats(session_maker)[1] == (2, Decimal('10.00'), Decimal('30.00'), 9, 2, 4.5)
@@ -0,0 +1,93 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.category_tree import CategoryTree, CategoryTreeHolder
+from app.models import Category
+from app.repositories.category_repo import CategoryRepository
+
+
+def make_tree() -> CategoryTree:
+    categories = [SimpleNamespace(id=1, name='Electronics', parent_id=None),
+                  SimpleNamespace(id=2, name='Phones', parent_id=1),
+                  SimpleNamespace(id=3, name='Smartphones', parent_id=2),
+                  SimpleNamespace(id=4, name='Laptops', parent_id=1),
+                  SimpleNamespace(id=5, name='Books', parent_id=None)]
+    return CategoryTree(categories, version=(5, 5))
+
+
+def test_tree_answers_hierarchy_queries():
+    tree = make_tree()
+
+    assert tree.parent(3).id == 2
+    assert tree.parent(1) is None
+    assert [node.id for node in tree.ancestors(3)] == [2, 1]
+    assert [node.id for node in tree.descendants(1)] == [2, 4, 3]
+    assert tree.descendants(5) == []
+
+
+def test_tree_endpoint_is_rebuilt_on_writes(db_client: TestClient):
+    parent = db_client.post('/categories/', json={'name': 'Electronics'}).json()['data']
+    child = db_client.post('/categories/', json={'name': 'Phones', 'parent_id': parent['id']}).json()['data']
+
+    response = db_client.get('/categories/tree')
+
+    assert response.status_code == 200
+    assert response.json() == [{'id': parent['id'], 'name': 'Electronics', 'parent_id': None,
+                                'children': [{'id': child['id'], 'name': 'Phones',
+                                              'parent_id': parent['id'], 'children': []}]}]
+
+    db_client.delete(f"/categories/{child['id']}")
+
+    assert db_client.get('/categories/tree').json()[0]['children'] == []
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def deactivate_category(session_maker, id_: int):
+    """ Запись «другого воркера»: after_commit этого процесса о ней не знает """
+    async def scenario():
+        async with session_maker() as session:
+            await session.execute(update(Category).where(Category.id == id_).values(is_active=False))
+            await session.commit()
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_picks_up_writes_of_other_workers(session_maker, seed_catalog):
+    seed_catalog(Category(id=2, name='Cases', parent_id=1))
+    clock = FakeClock()
+    holder = CategoryTreeHolder(check_interval=5, clock=clock)
+
+    async def get_tree():
+        async with session_maker() as session:
+            return await holder.get(CategoryRepository(session, Category))
+
+    loaded = asyncio.run(get_tree())
+    deactivate_category(session_maker, 2)
+    stale = asyncio.run(get_tree())
+    clock.now = 5
+    fresh = asyncio.run(get_tree())
+
+    assert 2 in loaded
+    assert stale is loaded
+    assert 2 not in fresh
+    assert fresh.version != loaded.version
+
+
+def test_parent_deactivated_by_other_worker_is_rejected(db_client: TestClient, session_maker, seed_catalog):
+    seed_catalog(Category(id=2, name='Cases', parent_id=1))
+    db_client.get('/categories/tree')
+    deactivate_category(session_maker, 2)
+
+    response = db_client.post('/categories/', json={'name': 'Leather', 'parent_id': 2})
+
+    assert response.status_code == 404
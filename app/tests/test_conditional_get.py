@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from starlette.requests import Request
+
+from app.core.conditional import Validators, is_not_modified
+from app.models import Category, Product
+
+
+@pytest.fixture
+def catalog(seed_catalog):
+    seed_catalog(Category(id=2, name='Books'), products=[{'name': 'Phone'}])
+
+
+def run_update(session_maker, stmt):
+    async def execute():
+        async with session_maker() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    asyncio.run(execute())
+
+
+def make_request(**headers) -> Request:
+    return Request({'type': 'http', 'headers': [(k.replace('_', '-').encode(), v.encode())
+                                                for k, v in headers.items()]})
+
+
+def test_unconditional_product_read_runs_one_query(db_client: TestClient, catalog, sql_statements):
+    response = db_client.get('/products/search/1')
+
+    assert response.status_code == 200
+    assert response.headers['etag'] and response.headers['last-modified']
+    assert len(sql_statements) == 1
+
+
+def test_product_not_modified_runs_only_version_query(db_client: TestClient, catalog, sql_statements):
+    first = db_client.get('/products/search/1')
+    etag = first.headers['etag']
+    sql_statements.clear()
+
+    response = db_client.get('/products/search/1', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert len(sql_statements) == 1
+    assert 'version' in sql_statements[0] and 'description' not in sql_statements[0]
+
+
+def test_product_etag_changes_on_update(db_client: TestClient, catalog, session_maker):
+    etag = db_client.get('/products/search/1').headers['etag']
+
+    run_update(session_maker, update(Product).where(Product.id == 1).values(stock=5))
+    response = db_client.get('/products/search/1', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+    assert response.json()['data']['stock'] == 5
+
+
+def test_missing_product_is_404_before_loading(db_client: TestClient, catalog):
+    response = db_client.get('/products/search/404', headers={'If-None-Match': '*'})
+
+    assert response.status_code == 404
+
+
+def test_categories_list_conditional(db_client: TestClient, catalog, session_maker, sql_statements):
+    first = db_client.get('/categories/')
+    etag = first.headers['etag']
+    assert len(sql_statements) == 2  # COUNT + страница со статистикой, без отдельного запроса версии
+    sql_statements.clear()
+
+    assert db_client.get('/categories/', headers={'If-None-Match': etag}).status_code == 304
+    assert len(sql_statements) == 2
+    # Другая страница — другое представление
+    assert db_client.get('/categories/?size=1', headers={'If-None-Match': etag}).status_code == 200
+
+    run_update(session_maker, update(Category).where(Category.id == 2).values(is_active=False))
+    response = db_client.get('/categories/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()['items']] == [1]
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    validators = Validators.build('product', 1, 2, last_modified=datetime(2026, 1, 1, tzinfo=timezone.utc))
+
+    assert is_not_modified(make_request(if_none_match=f'"other", W/{validators.etag}'), validators)
+    assert not is_not_modified(make_request(if_none_match='"other"',
+                                            if_modified_since='Fri, 01 Jan 2027 00:00:00 GMT'), validators)
+
+
+@pytest.mark.parametrize('since, expected', [
+    ('Thu, 01 Jan 2026 00:00:00 GMT', True),
+    ('Wed, 31 Dec 2025 23:59:59 GMT', False),
+    ('not a date', False),
+])
+def test_if_modified_since(since, expected):
+    validators = Validators.build('product', 1, 2, last_modified=datetime(2026, 1, 1, 0, 0, 0, 500_000))
+
+    assert is_not_modified(make_request(if_modified_since=since), validators) is expected
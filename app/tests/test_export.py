@@ -0,0 +1,63 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.export import csv_chunks, gzip_chunks, ndjson_chunks
+from app.models import Review, User
+from app.schemas import Review as ReviewSchema
+
+
+@pytest.fixture
+def admin_headers(seed_catalog, auth_headers) -> dict:
+    seed_catalog(User(id=2, email='admin@mail.com', hashed_password='x', role='admin'),
+                 Review(id=1, user_id=2, product_id=1, grade=5, comment='Great, "really" great'),
+                 products=[{'price': Decimal('9.99'), 'is_active': i != 3} for i in range(1, 26)])
+    return auth_headers('admin', 2)
+
+
+async def items(count: int):
+    for i in range(count):
+        yield {'id': i, 'user_id': 1, 'product_id': 1, 'comment': None, 'comment_date': '2026-01-01T00:00:00',
+               'is_active': True, 'grade': 5}
+
+
+async def collect(chunks) -> list[bytes]:
+    return [chunk async for chunk in chunks]
+
+
+def test_chunks_are_bounded_by_rows():
+    ndjson = asyncio.run(collect(ndjson_chunks(items(5), ReviewSchema, chunk_rows=2)))
+    csv_parts = asyncio.run(collect(csv_chunks(items(0), ReviewSchema)))
+    compressed = asyncio.run(collect(gzip_chunks(ndjson_chunks(items(5), ReviewSchema, chunk_rows=2))))
+
+    assert [chunk.count(b'\n') for chunk in ndjson] == [2, 2, 1]
+    assert csv_parts == [b'id,user_id,product_id,comment,comment_date,is_active,grade\r\n']
+    assert gzip.decompress(b''.join(compressed)) == b''.join(ndjson)
+
+
+def test_export_products_ndjson_and_csv(db_client: TestClient, admin_headers):
+    ndjson = db_client.get('/products/export', headers=admin_headers)
+    as_csv = db_client.get('/products/export', params={'format': 'csv'}, headers=admin_headers)
+
+    assert ndjson.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row['id'] for row in rows] == [i for i in range(1, 26) if i != 3]
+    assert rows[0]['price'] == '9.99'
+    assert as_csv.headers['content-disposition'] == 'attachment; filename="products.csv"'
+    assert len(list(csv.DictReader(io.StringIO(as_csv.text)))) == 24
+
+
+def test_export_reviews_gzip(db_client: TestClient, admin_headers):
+    response = db_client.get('/reviews/export', params={'format': 'csv', 'gzip': True}, headers=admin_headers)
+    forbidden = db_client.get('/reviews/export')
+
+    assert response.headers['content-encoding'] == 'gzip'
+    [row] = csv.DictReader(io.StringIO(response.text))
+    assert row['comment'] == 'Great, "really" great'
+    assert forbidden.status_code == 401
@@ -0,0 +1,28 @@
+import asyncio
+
+from app import auth
+from app.benchmarks.load import SCENARIOS, compare, run_benchmark
+from app.main import app
+
+
+def test_load_benchmark_drives_every_router_without_errors():
+    secret_key, overrides = auth.SECRET_KEY, dict(app.dependency_overrides)
+
+    result = asyncio.run(run_benchmark(products=200, concurrency=4, duration=1.5, warmup=0))
+
+    # Прогон не оставляет своих настроек остальной сессии тестов
+    assert auth.SECRET_KEY == secret_key
+    assert app.dependency_overrides == overrides
+
+    endpoints = result['endpoints']
+    assert result['meta']['database'] == 'sqlite'
+    assert result['total']['errors'] == 0, {name: stats['statuses'] for name, stats in endpoints.items()}
+    routers = {name.split()[1].split('/')[1] for name in endpoints}
+    assert routers == {'products', 'categories', 'reviews', 'users'}
+    assert endpoints['GET /categories/']['statements_avg'] is not None
+    assert set(endpoints) <= {scenario.name for scenario in SCENARIOS}
+
+    assert compare(result, result, tolerance=0.2) == []
+    slower = {'endpoints': {name: stats | {'p95_ms': stats['p95_ms'] * 2, 'throughput_rps': stats['throughput_rps'] / 2}
+                            for name, stats in endpoints.items()}}
+    assert len(compare(slower, result, tolerance=0.2)) == 2 * len(endpoints)
@@ -0,0 +1,67 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import MetricsRegistry, UNMATCHED_ROUTE
+from app.core.sql_instrumentation import instrument_engine
+
+
+def sample(text: str, series: str) -> float:
+    match = re.search(rf'^{re.escape(series)} (\S+)$', text, re.MULTILINE)
+    assert match, f'{series} not found'
+    return float(match.group(1))
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests.', ('route',))
+    latency = registry.histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+    collected = registry.gauge('collected', 'Set by a collector.')
+    registry.add_collector(lambda: collected.set((), 7))
+
+    requests.inc(('/a"b',))
+    requests.inc(('/a"b',), 2)
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(('/a',), value)
+
+    assert registry.render() == (
+        '# HELP requests_total Requests.\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{route="/a\\"b"} 3\n'
+        '# HELP latency_seconds Latency.\n'
+        '# TYPE latency_seconds histogram\n'
+        'latency_seconds_bucket{route="/a",le="0.1"} 2\n'
+        'latency_seconds_bucket{route="/a",le="1"} 3\n'
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4\n'
+        'latency_seconds_sum{route="/a"} 3.65\n'
+        'latency_seconds_count{route="/a"} 4\n'
+        '# HELP collected Set by a collector.\n'
+        '# TYPE collected gauge\n'
+        'collected 7\n'
+    )
+
+
+def test_metrics_endpoint_reports_routes_sql_and_caches(db_client: TestClient, db_engine, sql_statements):
+    instrument_engine(db_engine)
+    before = db_client.get('/metrics').text
+    requests_before = (sample(before, 'http_requests_total{method="GET",route="/categories/",status="200"}')
+                       if 'route="/categories/",status="200"' in before else 0)
+
+    db_client.get('/categories/')
+    statements = len(sql_statements)
+    db_client.get('/products/search/404')
+    db_client.get('/no/such/path')
+    db_client.get('/products/')
+    db_client.get('/products/')
+    response = db_client.get('/metrics')
+
+    assert response.headers['content-type'] == 'text/plain; version=0.0.4; charset=utf-8'
+    text = response.text
+    assert sample(text, 'http_requests_total{method="GET",route="/categories/",status="200"}') == requests_before + 1
+    assert sample(text, 'http_requests_total{method="GET",route="/products/search/{product_id}",status="404"}') >= 1
+    assert sample(text, f'http_requests_total{{method="GET",route="{UNMATCHED_ROUTE}",status="404"}}') >= 1
+    assert sample(text, 'http_requests_in_progress{method="GET",route="/categories/"}') == 0
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="/categories/"}') >= 1
+    assert sample(text, 'db_statements_total{route="/categories/"}') >= statements
+    assert sample(text, 'cache_hits_total{cache="product_list"}') >= 1
+    assert 0 < sample(text, 'cache_hit_ratio{cache="product_list"}') <= 1
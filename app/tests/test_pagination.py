@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from fastapi.testclient import TestClient
+
+
+def test_products_cursor_walks_all_pages(db_client: TestClient, seed_catalog):
+    seed_catalog(products=[{'price': Decimal(price)} for price in (30, 10, 20, 10, 50)])
+
+    seen, cursor = [], None
+    while True:
+        params = {'size': 2, 'order_by': 'price'}
+        if cursor:
+            params['cursor'] = cursor
+        response = db_client.get('/products/cursor', params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert 'total' not in body
+        seen += [item['id'] for item in body['items']]
+        cursor = body['next_page']
+        if not cursor:
+            break
+
+    assert seen == [2, 4, 3, 1, 5]
+
+
+def test_categories_cursor(db_client: TestClient, seed_catalog):
+    seed_catalog(products=1)
+
+    response = db_client.get('/categories/cursor', params={'size': 1})
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json()['items']] == [1]
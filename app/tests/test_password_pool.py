@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+import pytest
+
+from app.auth import PasswordHashingPool
+from app.core.exceptions import PasswordHashingBusy
+
+
+def test_pool_rejects_requests_over_queue_depth():
+    pool = PasswordHashingPool(workers=1, queue_depth=1)
+
+    async def scenario():
+        running = [asyncio.create_task(pool.run(time.sleep, 0.2)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PasswordHashingBusy):
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*running)
+        return pool.pending
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_pool_does_not_block_event_loop():
+    pool = PasswordHashingPool(workers=1, queue_depth=0)
+
+    async def scenario():
+        ticks = 0
+        task = asyncio.create_task(pool.run(time.sleep, 0.2))
+        while not task.done():
+            ticks += 1
+            await asyncio.sleep(0.01)
+        return ticks
+
+    assert asyncio.run(scenario()) > 5
@@ -0,0 +1,126 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.data_loader import DataLoader
+from app.models import Category, Product
+from app.repositories.category_repo import CategoryRepository
+from app.repositories.products_repo import ProductRepository
+
+
+@pytest.fixture
+def products(seed_catalog):
+    seed_catalog(Category(id=2, name='Tablets'),
+                 products=[{'price': Decimal(id_), 'is_active': id_ != 4} for id_ in range(1, 5)])
+
+
+def test_batch_returns_products_in_requested_order_with_one_query(db_client: TestClient, products, sql_statements):
+    response = db_client.get('/products/batch', params=[('ids', '3,1,404'), ('ids', '4'), ('ids', '1,2')])
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert [item['id'] for item in body['items']] == [3, 1, 2]
+    assert body['missing'] == [404, 4]
+    assert len(sql_statements) == 1
+
+
+@pytest.mark.parametrize('query', ['ids=1,x', 'ids=', ','.join(['1'] * 101)])
+def test_batch_rejects_bad_ids(db_client: TestClient, query):
+    if not query.startswith('ids='):
+        query = f'ids={query}'
+
+    response = db_client.get(f'/products/batch?{query}')
+
+    assert response.status_code == 422
+
+
+def test_loader_coalesces_lookups_of_one_tick(session_maker, products, sql_statements):
+    async def scenario():
+        async with session_maker() as session:
+            products_repo = ProductRepository(session, Product)
+            categories = CategoryRepository(session, Category)
+            sql_statements.clear()
+            first = await asyncio.gather(products_repo.load(1), products_repo.load(2), products_repo.load(404),
+                                         ProductRepository(session, Product).load(1))
+            coalesced = len(sql_statements)
+            again = await products_repo.load(2)
+            cached = len(sql_statements)
+            category_pair = await asyncio.gather(categories.load(1), categories.load(2))
+            await products_repo.delete_owned(2, 1)
+            deleted = await products_repo.load(2)
+        return first, coalesced, again, cached, category_pair, deleted
+
+    first, coalesced, again, cached, category_pair, deleted = asyncio.run(scenario())
+
+    assert [product and product.id for product in first] == [1, 2, None, 1]
+    assert first[0] is first[3]
+    assert coalesced == 1
+    assert again is first[1] and cached == 1
+    assert [category.id for category in category_pair] == [1, 2]
+    assert deleted is None
+
+
+def test_loader_errors_are_not_cached(session_maker):
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(keys)
+        if len(calls) == 1:
+            raise RuntimeError('database is down')
+        return {key: key * 10 for key in keys}
+
+    async def scenario():
+        async with session_maker() as session:
+            loader = DataLoader.for_session(session, 'numbers', batch_load)
+            assert DataLoader.for_session(session, 'numbers', batch_load) is loader
+            with pytest.raises(RuntimeError):
+                await asyncio.gather(loader.load(1), loader.load(2))
+            return await loader.load_many([1, 2])
+
+    assert asyncio.run(scenario()) == [10, 20]
+    assert calls == [[1, 2], [1, 2]]
+
+
+def test_cancelled_caller_does_not_break_other_loads():
+    calls = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def batch_load(keys):
+            calls.append(keys)
+            await release.wait()
+            return {key: key * 10 for key in keys}
+
+        loader = DataLoader(batch_load)
+        cancelled, waiting = asyncio.ensure_future(loader.load(1)), asyncio.ensure_future(loader.load(1))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await waiting, await loader.load(1)
+
+    assert asyncio.run(scenario()) == (10, 10)
+    assert calls == [[1]]
+
+
+def test_cancelled_batch_is_not_cached():
+    calls = []
+
+    async def batch_load(keys):
+        calls.append(keys)
+        if len(calls) == 1:
+            raise asyncio.CancelledError()
+        return {key: key * 10 for key in keys}
+
+    async def scenario():
+        loader = DataLoader(batch_load)
+        with pytest.raises(asyncio.CancelledError):
+            await loader.load(1)
+        return await loader.load(1)
+
+    assert asyncio.run(scenario()) == 10
+    assert calls == [[1], [1]]
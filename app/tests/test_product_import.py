@@ -0,0 +1,83 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.core.bulk_import import iter_csv_records, iter_ndjson_records
+from app.models import Product, User
+
+CSV_BODY = (
+    'name,description,price,stock,category_id\n'
+    'Phone case,"Soft, ""silicone""\ncase",9.99,10,1\n'
+    'Bad price,,-1,5,1\n'
+    'Unknown category,,5,5,42\n'
+    'Charger,,19.50,3,1\n'
+    'Short row,1\n'
+)
+
+
+async def stream(body: str, chunk_size: int):
+    data = body.encode()
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def test_csv_records_survive_chunk_boundaries_and_multiline_fields():
+    records = asyncio.run(collect(iter_csv_records(stream('\ufeff' + CSV_BODY, chunk_size=7))))
+
+    assert [record.row for record in records] == [1, 2, 3, 4, 5]
+    assert records[0].data['description'] == 'Soft, "silicone"\ncase'
+    assert records[1].data['description'] is None
+    assert records[4].error == 'Expected 5 columns, got 2'
+
+
+def test_ndjson_records_report_bad_lines():
+    body = '{"name": "A"}\n\nnot json\n[1]\n{"name": "B"}'
+    records = asyncio.run(collect(iter_ndjson_records(stream(body, chunk_size=4))))
+
+    assert [(record.row, record.data, record.error is None) for record in records] == [
+        (1, {'name': 'A'}, True), (2, None, False), (3, None, False), (4, {'name': 'B'}, True)]
+
+
+def test_import_inserts_in_batches_and_reports_row_errors(session_maker, sql_statements, seed_catalog, build_services):
+    seed_catalog()
+    body = CSV_BODY + ''.join(f'Item {i},,1,1,1\n' for i in range(5))
+
+    async def scenario():
+        async with session_maker() as session:
+            product_service, _ = build_services(session)
+            seller = await session.get(User, 1)
+            sql_statements.clear()
+            report = await product_service.import_products(iter_csv_records(stream(body, 64)), seller,
+                                                           batch_size=4, max_errors=2)
+            count = await session.scalar(select(func.count()).select_from(Product))
+            return report, count
+
+    report, count = asyncio.run(scenario())
+
+    assert (report.inserted, report.failed, count) == (7, 3, 7)
+    assert [error.row for error in report.errors] == [2, 3]
+    assert report.errors[1].errors == ['category_id: Category not found']
+    assert report.errors_truncated
+    # 10 строк пачками по 4: три INSERT, по одному на транзакцию
+    assert sum(statement.startswith('INSERT INTO products') for statement in sql_statements) == 3
+
+
+def test_import_endpoint(db_client: TestClient, seed_catalog, auth_headers):
+    seed_catalog()
+    headers = auth_headers('seller', 1)
+    body = '{"name": "Phone", "price": "10.00", "stock": 1, "category_id": 1}\n{"name": "X"}\n'
+
+    response = db_client.post('/products/import', content=body,
+                              headers=headers | {'Content-Type': 'application/x-ndjson'})
+    unsupported = db_client.post('/products/import', content=body,
+                                 headers=headers | {'Content-Type': 'application/json'})
+
+    assert response.status_code == 200
+    assert response.json()['inserted'] == 1
+    assert response.json()['errors'][0]['row'] == 2
+    assert unsupported.status_code == 415
@@ -0,0 +1,77 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.unit_of_work import UnitOfWork
+from app.models import Product, Review, User
+from app.schemas import ReviewCreate
+
+
+def buyer_users() -> list[User]:
+    return [User(id=user_id, email=f'buyer{user_id}@mail.com', hashed_password='x', role='buyer')
+            for user_id in (2, 3, 4)]
+
+
+def test_rating_aggregates_follow_review_writes(session_maker: async_sessionmaker[AsyncSession], seed_catalog,
+                                              build_services):
+    seed_catalog(*buyer_users(), products=[{'name': 'Phone'}])
+
+    async def scenario():
+        async with session_maker() as session:
+            _, review_service = build_services(session)
+            buyers = [await session.get(User, user_id) for user_id in (2, 3, 4)]
+            async with UnitOfWork.for_session(session):
+                reviews = [await review_service.create_review(ReviewCreate(product_id=1, grade=grade), buyer)
+                           for grade, buyer in zip((5, 4, 5), buyers)]
+            async with UnitOfWork.for_session(session):
+                await review_service.delete_review(reviews[1].id, User(id=99, role='admin'))
+        async with session_maker() as session:
+            return await session.get(Product, 1)
+
+    product = asyncio.run(scenario())
+
+    assert (product.review_count, product.rating_sum, product.rating) == (2, 10, 5.0)
+    assert (product.grade_4_count, product.grade_5_count) == (0, 2)
+
+
+def test_reconcile_rebuilds_aggregates_from_reviews(session_maker: async_sessionmaker[AsyncSession], seed_catalog,
+                                                   build_services):
+    seed_catalog(*buyer_users(),
+                 Review(user_id=2, product_id=1, grade=1),
+                 Review(user_id=3, product_id=1, grade=4),
+                 Review(user_id=4, product_id=1, grade=5, is_active=False),
+                 products=[{'name': 'Phone'}])
+
+    async def scenario():
+        async with session_maker() as session:
+            product_service, _ = build_services(session)
+            async with UnitOfWork.for_session(session):
+                await product_service.reconcile_product_ratings()
+        async with session_maker() as session:
+            return await session.get(Product, 1)
+
+    product = asyncio.run(scenario())
+
+    assert (product.review_count, product.rating_sum, product.rating) == (2, 5, 2.5)
+    assert (product.grade_1_count, product.grade_4_count, product.grade_5_count) == (1, 1, 0)
+
+
+def test_reconcile_rewrites_only_drifted_products(session_maker: async_sessionmaker[AsyncSession], seed_catalog,
+                                                  build_services):
+    seed_catalog(*buyer_users(), Review(user_id=2, product_id=1, grade=3), products=[{'name': 'Phone'}])
+
+    async def reconcile():
+        async with session_maker() as session:
+            product_service, _ = build_services(session)
+            async with UnitOfWork.for_session(session):
+                updated = await product_service.reconcile_product_ratings()
+        async with session_maker() as session:
+            return updated, (await session.get(Product, 1)).version
+
+    async def scenario():
+        return await reconcile(), await reconcile()
+
+    (first, version), (again, same_version) = asyncio.run(scenario())
+
+    assert first == 1
+    assert again == 0 and same_version == version
@@ -0,0 +1,51 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.core.dependecies.services.product_service import get_product_service
+from app.main import app
+from app.models import Product
+from app.repositories.products_repo import ProductRepository, prefix_tsquery
+from app.schemas import ProductSearch
+
+
+def test_prefix_tsquery_drops_tsquery_syntax():
+    assert prefix_tsquery('Red  pho!') == 'red:* & pho:*'
+    assert prefix_tsquery("a & b' | !c") == 'a:* & b:* & c:*'
+    assert prefix_tsquery('&|!') == ''
+
+
+def test_search_is_single_ranked_query_with_ranges():
+    repository = ProductRepository(db=None, model=Product)
+    query = asyncio.run(repository.get_query_for_search('phone', price_from=10, rating_to=4.5))
+
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert 'products.search_vector @@ to_tsquery(CAST(%(param_1)s AS REGCONFIG), %(to_tsquery_1)s)' in sql
+    assert 'products.price >=' in sql and 'products.rating <=' in sql
+    assert 'products.rating >=' not in sql
+    assert sql.rstrip().endswith('DESC, products.id')
+    # tsvector не тянется в выборку: колонка отложенная
+    assert 'products.search_vector,' not in sql.split('FROM')[0]
+
+
+def test_search_endpoint_passes_filters_to_service():
+    service = AsyncMock()
+    service.search_products.return_value = {'items': [], 'current_page': None, 'current_page_backwards': None,
+                                            'previous_page': None, 'next_page': None}
+    app.dependency_overrides[get_product_service] = lambda: service
+    try:
+        with TestClient(app) as client:
+            response = client.get('/products/search', params={'q': 'phone', 'price__lte': 100, 'size': 5})
+            missing_query = client.get('/products/search')
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()['items'] == []
+    search, params = service.search_products.await_args.args
+    assert search == ProductSearch(q='phone', price__lte=100)
+    assert params.size == 5
+    assert missing_query.status_code == 422
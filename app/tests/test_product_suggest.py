@@ -0,0 +1,126 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.core.product_suggest import ProductSuggestIndex, product_suggest_index, within_one_edit
+from app.models import Product
+from app.repositories.products_repo import ProductRepository
+
+
+def build_index(*products: tuple[int, str, float], **kwargs) -> ProductSuggestIndex:
+    index = ProductSuggestIndex(**kwargs)
+    index.load(SimpleNamespace(id=id_, name=name, rating=rating) for id_, name, rating in products)
+    return index
+
+
+def ids(suggestions) -> list[int]:
+    return [suggestion.id for suggestion in suggestions]
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('phone', 'phone', True), ('phnoe', 'phone', True), ('phne', 'phone', True),
+    ('phoone', 'phone', True), ('phbne', 'phone', True), ('hpnoe', 'phone', False), ('ph', 'phone', False),
+])
+def test_within_one_edit(a, b, expected):
+    assert within_one_edit(a, b) is expected
+
+
+@pytest.mark.parametrize('scan_threshold', [2000, 0])
+def test_prefix_matches_any_word_ranked_by_rating(scan_threshold):
+    index = build_index((1, 'Apple iPhone 15', 4.1), (2, 'iPhone case', 4.9), (3, 'Phone stand', 5.0),
+                        (4, 'Samsung Galaxy', 3.0), scan_threshold=scan_threshold)
+
+    assert ids(index.suggest('iph')) == [2, 1]
+    assert ids(index.suggest('IPHONE ap')) == [1]
+    assert ids(index.suggest('iph', limit=1)) == [2]
+    assert index.suggest('!!') == []
+
+
+def test_words_of_one_prefix_are_merged_by_rating():
+    index = build_index((1, 'Phone phones', 2.0), (2, 'Phones', 3.0), (3, 'Photo frame', 1.0), (4, 'Phone', 4.0))
+
+    assert ids(index.suggest('pho')) == [4, 2, 1, 3]
+    assert ids(index.suggest('pho', limit=2)) == [4, 2]
+    index.update_rating(3, 5.0)
+    assert ids(index.suggest('pho', limit=2)) == [3, 4]
+
+
+def test_typos_are_tolerated_after_exact_matches():
+    index = build_index((1, 'Samsung Galaxy', 3.0), (2, 'Samsung TV', 4.0), (3, 'Samsonite bag', 5.0))
+
+    assert ids(index.suggest('smasung')) == [2, 1]
+    assert ids(index.suggest('samsng tv')) == [2]
+    # Точные совпадения идут раньше совпадений с опечаткой, даже с меньшим рейтингом
+    assert ids(index.suggest('samso')) == [3, 2, 1]
+    assert index.suggest('sm') == []
+
+
+def test_index_updates_incrementally():
+    index = build_index((1, 'Red chair', 4.0), (2, 'Red table', 3.0))
+
+    index.upsert(3, 'Red lamp', 4.5)
+    assert ids(index.suggest('red')) == [3, 1, 2]
+    index.update_rating(2, 5.0)
+    assert ids(index.suggest('red')) == [2, 3, 1]
+    index.upsert(1, 'Blue chair', 4.0)
+    assert ids(index.suggest('red')) == [2, 3]
+    index.remove(3)
+    assert ids(index.suggest('red')) == [2]
+    assert len(index) == 2
+
+
+def test_suggest_endpoint_follows_committed_writes(db_client: TestClient, session_maker, seed_catalog,
+                                                   sql_statements):
+    async def write(commit: bool):
+        async with session_maker() as session:
+            repository = ProductRepository(db=session, model=Product)
+            await repository.update(1, {'name': 'Phone holder'})
+            await repository.update_product_rating(1, grade=5)
+            if commit:
+                await session.commit()
+
+    seed_catalog(products=[{'name': 'Phone case', 'price': Decimal(5)}])
+    assert db_client.get('/products/suggest', params={'q': 'phone'}).json() == [
+        {'id': 1, 'name': 'Phone case', 'rating': 0.0}]
+
+    sql_statements.clear()
+    assert db_client.get('/products/suggest', params={'q': 'phnoe c'}).json()[0]['id'] == 1
+    assert sql_statements == []
+
+    asyncio.run(write(commit=False))
+    assert product_suggest_index.suggest('holder') == []
+
+    asyncio.run(write(commit=True))
+    assert db_client.get('/products/suggest', params={'q': 'holder'}).json() == [
+        {'id': 1, 'name': 'Phone holder', 'rating': 5.0}]
+    assert db_client.get('/products/suggest', params={'q': ''}).status_code == 422
+
+
+def test_index_picks_up_writes_of_other_processes(session_maker, seed_catalog):
+    now = [0.0]
+    index = ProductSuggestIndex(refresh_interval=5, clock=lambda: now[0])
+
+    async def suggest(query: str) -> list[int]:
+        async with session_maker() as session:
+            return ids((await index.ensure_fresh(ProductRepository(db=session, model=Product))).suggest(query))
+
+    async def write():
+        # Как reconcile_ratings или другой воркер: after_commit этого индекса о записи не знает
+        async with session_maker() as session:
+            await session.execute(update(Product).where(Product.id == 1).values(name='Desk lamp', rating=4.0))
+            await session.execute(update(Product).where(Product.id == 2).values(is_active=False))
+            await session.commit()
+
+    seed_catalog(products=[{'name': 'Phone case'}, {'name': 'Phone holder'}, {'name': 'Phone stand'}])
+    assert asyncio.run(suggest('phone')) == [1, 2, 3]
+
+    asyncio.run(write())
+    assert asyncio.run(suggest('phone')) == [1, 2, 3]
+
+    now[0] = 5
+    assert asyncio.run(suggest('phone')) == [3]
+    assert asyncio.run(suggest('lamp')) == [1]
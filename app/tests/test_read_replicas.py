@@ -0,0 +1,190 @@
+import asyncio
+import time
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from fastapi_pagination import Params
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+
+from app.core.category_tree import category_tree
+from app.core.response_cache import product_list_cache
+from app.core.replicas import PRIMARY_PIN_COOKIE, PrimaryPinMiddleware, ReplicaSet, WritePins
+from app.database import Base, RoutingSession, bind_session_to_user, use_primary
+from app.db_depends import READ_METHODS, get_async_db
+from app.main import app
+from app.models import Category, Product, User
+from app.schemas import ProductFilter
+
+
+async def zero_lag(conn) -> float:
+    return 0.0
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """ primary и реплика — разные SQLite базы, категория 1 называется по имени базы """
+    engines = {}
+
+    async def create(name: str):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db", poolclass=NullPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(Category.__table__.insert().values(id=1, name=name))
+        engines[name] = engine
+
+    async def setup():
+        await create('primary')
+        await create('replica')
+
+    asyncio.run(setup())
+    yield engines
+    for engine in engines.values():
+        asyncio.run(engine.dispose())
+
+
+def routing_session_maker(databases, replicas: ReplicaSet, pins: WritePins) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(databases['primary'], expire_on_commit=False, class_=AsyncSession,
+                              sync_session_class=RoutingSession, replicas=replicas, pins=pins)
+
+
+async def category_name(session: AsyncSession) -> str:
+    return await session.scalar(select(Category.name).where(Category.id == 1))
+
+
+def test_reads_go_to_replica_until_session_writes(databases):
+    session_maker = routing_session_maker(databases, ReplicaSet([databases['replica']], max_lag=5), WritePins(10))
+
+    async def scenario():
+        async with session_maker() as session:
+            before = await category_name(session)
+            session.add(Category(name='New'))
+            await session.flush()
+            after = await category_name(session)
+        async with session_maker() as session:
+            use_primary(session)
+            pinned = await category_name(session)
+        return before, after, pinned
+
+    assert asyncio.run(scenario()) == ('replica', 'primary', 'primary')
+
+
+def test_unhealthy_or_lagging_replica_falls_back_to_primary(databases):
+    lag = {'value': 0.0}
+
+    async def probe(conn) -> float:
+        if lag['value'] is None:
+            raise OSError('replica is down')
+        return lag['value']
+
+    replicas = ReplicaSet([databases['replica']], max_lag=5, lag_probe=probe)
+    session_maker = routing_session_maker(databases, replicas, WritePins(10))
+
+    async def read_after_check() -> str:
+        await replicas.check()
+        async with session_maker() as session:
+            return await category_name(session)
+
+    assert asyncio.run(read_after_check()) == 'replica'
+    lag['value'] = 30.0
+    assert asyncio.run(read_after_check()) == 'primary'
+    assert (replicas.status()[0]['healthy'], replicas.status()[0]['lag_seconds']) == (False, 30.0)
+    lag['value'] = None
+    assert asyncio.run(read_after_check()) == 'primary'
+    lag['value'] = 1.0
+    assert asyncio.run(read_after_check()) == 'replica'
+
+
+def test_user_reads_own_writes_from_primary(databases):
+    pins = WritePins(10)
+    session_maker = routing_session_maker(databases, ReplicaSet([databases['replica']], max_lag=5, lag_probe=zero_lag),
+                                          pins)
+
+    async def read_as(user_id: int) -> str:
+        async with session_maker() as session:
+            bind_session_to_user(session, user_id)
+            return await category_name(session)
+
+    async def scenario():
+        async with session_maker() as session:
+            bind_session_to_user(session, 1)
+            session.add(Category(name='Written by user 1'))
+            await session.commit()
+        return await read_as(1), await read_as(2)
+
+    assert asyncio.run(scenario()) == ('primary', 'replica')
+    assert pins.is_pinned(1) and not pins.is_pinned(2)
+
+
+@pytest.mark.parametrize('method, expected', [('GET', False), ('POST', True), ('DELETE', True)])
+def test_write_requests_use_primary(method, expected):
+    async def scenario():
+        sessions = get_async_db(Request({'type': 'http', 'method': method}))
+        session = await anext(sessions)
+        await sessions.aclose()
+        return session.sync_session.use_primary
+
+    assert asyncio.run(scenario()) is expected
+
+
+@pytest.fixture
+def replica_app(databases):
+    """ Приложение, у которого чтение идет на реплику: записи туда не доходят, как при большом отставании """
+    replicas = ReplicaSet([databases['replica']], max_lag=5, lag_probe=zero_lag)
+    session_maker = routing_session_maker(databases, replicas, WritePins(10))
+
+    async def override_get_async_db(request: Request):
+        async with session_maker() as session:
+            if request.method not in READ_METHODS:
+                use_primary(session)
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    category_tree.invalidate()
+    yield PrimaryPinMiddleware(app, window=10)
+    app.dependency_overrides.clear()
+    category_tree.invalidate()
+
+
+def test_anonymous_read_after_write_goes_to_primary(replica_app):
+    writer, other = TestClient(replica_app), TestClient(replica_app)
+
+    response = writer.put('/categories/1', json={'name': 'Renamed'})
+
+    assert response.status_code == 200, response.text
+    assert PRIMARY_PIN_COOKIE in response.cookies
+    # Маршрут без авторизации: клиента узнают по cookie, а не по пользователю
+    assert writer.get('/categories/1').json()['data']['name'] == 'Renamed'
+    assert other.get('/categories/1').json()['data']['name'] == 'replica'
+    assert PRIMARY_PIN_COOKIE not in other.get('/categories/1').cookies
+
+
+@pytest.mark.parametrize('offset, expected', [(5, 'primary'), (-1, 'replica'), (3600, 'replica')])
+def test_pin_cookie_deadline_is_checked(replica_app, offset, expected):
+    client = TestClient(replica_app, cookies={PRIMARY_PIN_COOKIE: str(time.time() + offset)})
+
+    assert client.get('/categories/1').json()['data']['name'] == expected
+
+
+def test_listing_cache_is_filled_from_primary(databases, build_services):
+    session_maker = routing_session_maker(databases, ReplicaSet([databases['replica']], max_lag=5), WritePins(10))
+
+    async def scenario():
+        async with session_maker() as session:
+            use_primary(session)
+            session.add_all([User(id=1, email='seller@mail.com', hashed_password='x', role='seller'),
+                             Product(id=1, name='Only on primary', price=Decimal(10), stock=1, category_id=1,
+                                     seller_id=1)])
+            await session.commit()
+        await product_list_cache.clear()
+        async with session_maker() as session:
+            product_service, _ = build_services(session)
+            body = await product_service.get_cached_filtered_products(ProductFilter(), Params())
+        await product_list_cache.clear()
+        return body
+
+    # Реплика еще не видит товар; страница из нее осталась бы в кэше после инвалидации
+    assert b'Only on primary' in asyncio.run(scenario())
@@ -0,0 +1,157 @@
+import asyncio
+import fnmatch
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.response_cache import ResponseCache, MemoryCacheBackend, RedisCacheBackend, canonical_key
+from app.core.unit_of_work import UnitOfWork
+from app.models import Category, User
+from app.schemas import ProductCreate, ReviewCreate
+
+
+class FakeRedis:
+    """ Минимальная замена redis.asyncio.Redis: только команды, которые использует RedisCacheBackend """
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.commands: list[str] = []
+
+    async def get(self, key):
+        self.commands.append('GET')
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.commands.append('SET')
+        self.data[key] = value
+
+    async def mget(self, keys):
+        self.commands.append('MGET')
+        return [self.data.get(key) for key in keys]
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch.fnmatch(key, match):
+                yield key
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis, self.keys = redis, []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.keys.append(key)
+
+    async def execute(self):
+        self.redis.commands.append('PIPELINE')
+        for key in self.keys:
+            self.redis.data[key] = str(int(self.redis.data.get(key, 0)) + 1).encode()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def cache(request) -> ResponseCache:
+    backend = MemoryCacheBackend(maxsize=10, ttl=60) if request.param == 'memory' else RedisCacheBackend(FakeRedis())
+    return ResponseCache(backend, ttl=60)
+
+
+def test_tags_invalidate_only_their_entries(cache: ResponseCache):
+    async def scenario():
+        await cache.set('a', b'{"a":1}', ['category:1', 'product:1'])
+        await cache.set('b', b'{"b":2}', ['category:2'])
+        await cache.invalidate('product:1')
+        return await cache.get('a'), await cache.get('b')
+
+    assert asyncio.run(scenario()) == (None, b'{"b":2}')
+
+
+def test_snapshot_taken_before_write_is_not_cached_as_fresh(cache: ResponseCache):
+    async def scenario():
+        versions = await cache.tag_versions(['category:1'])
+        await cache.invalidate('category:1')  # запись закоммичена, пока читали страницу
+        await cache.set('a', b'stale', ['category:1'], versions)
+        return await cache.get('a')
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_canonical_key_ignores_field_order():
+    assert canonical_key('p', {'a': 1, 'b': [2, 3]}) == canonical_key('p', {'b': [2, 3], 'a': 1})
+    assert canonical_key('p', {'b': [2, 3]}) != canonical_key('p', {'b': [3, 2]})
+
+
+@pytest.fixture
+def catalog(seed_catalog):
+    seed_catalog(User(id=2, email='buyer@mail.com', hashed_password='x', role='buyer'),
+                 Category(id=2, name='Books'),
+                 products=[{'price': Decimal(i), 'category_id': 1 + i % 2} for i in range(1, 7)])
+
+
+@pytest.fixture
+def run_service(session_maker: async_sessionmaker[AsyncSession], build_services):
+    def run(action):
+        async def scenario():
+            async with session_maker() as session:
+                product_service, review_service = build_services(session)
+                seller, buyer = await session.get(User, 1), await session.get(User, 2)
+                async with UnitOfWork.for_session(session):
+                    return await action(product_service, review_service, seller, buyer)
+
+        return asyncio.run(scenario())
+
+    return run
+
+
+def test_listing_is_served_from_cache(db_client: TestClient, catalog, sql_statements):
+    first = db_client.get('/products/', params={'category_id': 1, 'size': 2})
+    sql_statements.clear()
+
+    second = db_client.get('/products/', params={'size': 2, 'category_id': 1})
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert [item['id'] for item in first.json()['items']] == [2, 4]
+    assert first.json()['total'] == 3
+    assert sql_statements == []
+
+
+def test_product_write_invalidates_only_its_category(db_client: TestClient, catalog, run_service, sql_statements):
+    db_client.get('/products/', params={'category_id': 1})
+    db_client.get('/products/', params={'category_id': 2})
+
+    product = ProductCreate(name='New phone', price=Decimal(5), stock=1, category_id=1)
+    run_service(lambda products, _, seller, __: products.create_product(product, seller))
+    sql_statements.clear()
+
+    assert db_client.get('/products/', params={'category_id': 1}).json()['total'] == 4
+    assert sql_statements
+    sql_statements.clear()
+    assert db_client.get('/products/', params={'category_id': 2}).json()['total'] == 3
+    assert sql_statements == []
+
+
+def test_rating_update_invalidates_pages_with_product(db_client: TestClient, catalog, run_service, sql_statements):
+    db_client.get('/products/', params={'category_id': 1, 'size': 1})   # только товар 2
+    db_client.get('/products/', params={'category_id': 1, 'size': 1, 'page': 2})   # только товар 4
+
+    review = ReviewCreate(product_id=4, comment='Works great, fast', grade=5)
+    run_service(lambda _, reviews, __, buyer: reviews.create_review(review, buyer))
+    sql_statements.clear()
+
+    db_client.get('/products/', params={'category_id': 1, 'size': 1})
+    assert sql_statements == []
+    page = db_client.get('/products/', params={'category_id': 1, 'size': 1, 'page': 2}).json()
+    assert page['items'][0]['rating'] == 5
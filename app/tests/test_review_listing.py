@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import Review, User
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def reviews(seed_catalog):
+    """ 7 отзывов на товар 1 (у двух одинаковое время), 2 на товар 2, один неактивный """
+    seed_catalog(*[User(id=user_id, email=f'buyer{user_id}@mail.com', hashed_password='x', role='buyer')
+                   for user_id in range(2, 12)],
+                 *[Review(id=id_, user_id=id_ + 1, product_id=1, grade=1 + id_ % 5,
+                          comment_date=START + timedelta(hours=min(id_, 6))) for id_ in range(1, 8)],
+                 Review(id=8, user_id=2, product_id=2, grade=5, comment_date=START),
+                 Review(id=9, user_id=3, product_id=2, grade=1, comment_date=START),
+                 Review(id=10, user_id=11, product_id=1, grade=3, comment_date=START, is_active=False),
+                 products=2)
+
+
+def collect(client: TestClient, url: str, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, params=params | ({'cursor': cursor} if cursor else {}))
+        assert response.status_code == 200, response.text
+        body = response.json()
+        pages.append([item['id'] for item in body['items']])
+        cursor = body['next_page']
+        if not cursor:
+            return pages
+
+
+def test_product_reviews_newest_first_across_pages(db_client: TestClient, reviews):
+    pages = collect(db_client, '/products/1/reviews', size=3)
+
+    # 6 и 7 оставлены одновременно: порядок между ними задает id
+    assert pages == [[7, 6, 5], [4, 3, 2], [1]]
+
+
+def test_product_reviews_page_uses_one_query(db_client: TestClient, reviews, sql_statements):
+    db_client.get('/products/1/reviews', params={'size': 3})
+
+    review_selects = [statement for statement in sql_statements if 'FROM reviews' in statement]
+    assert len(review_selects) == 1
+    assert 'LIMIT' in review_selects[0]
+
+
+def test_product_reviews_of_missing_product(db_client: TestClient, reviews):
+    assert db_client.get('/products/404/reviews').status_code == 404
+
+
+def test_reviews_listing_is_paginated_and_filterable(db_client: TestClient, reviews):
+    assert sum(collect(db_client, '/reviews/', size=4), []) == [7, 6, 5, 4, 3, 2, 1, 9, 8]
+
+    response = db_client.get('/reviews/', params={'product_id': 2, 'grade__gte': 3})
+    assert [item['id'] for item in response.json()['items']] == [8]
+    assert db_client.get('/reviews/', params={'size': 1000}).status_code == 422
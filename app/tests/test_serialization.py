@@ -0,0 +1,33 @@
+import asyncio
+import json
+from decimal import Decimal
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from fastapi_pagination import Page
+
+from app.core.serialization import dump_json, type_adapter
+from app.models import Product
+from app.schemas import ProductOut, Product as ProductSchema, ResponseModel
+
+PRODUCT = Product(id=1, name='Phone', description=None, price=Decimal('19.90'), image_url=None, stock=3,
+                  category_id=1, seller_id=1, is_active=True, rating=4.5)
+
+
+def fastapi_json(type_, content) -> dict:
+    field = create_model_field('Response', type_, mode='serialization')
+    return asyncio.run(serialize_response(field=field, response_content=content))
+
+
+def test_fast_path_renders_same_json_as_response_model():
+    detail = {'status': 'success', 'data': PRODUCT}
+    page = {'items': [PRODUCT], 'total': 1, 'page': 1, 'size': 50, 'pages': 1}
+
+    assert json.loads(dump_json(ResponseModel[ProductSchema], detail)) == fastapi_json(
+        ResponseModel[ProductSchema], ResponseModel[ProductSchema](status='success', data=PRODUCT))
+    assert json.loads(dump_json(Page[ProductOut], page)) == fastapi_json(
+        Page[ProductOut], Page[ProductOut].model_validate(page, from_attributes=True))
+
+
+def test_type_adapter_is_built_once_per_type():
+    assert type_adapter(list[ProductOut]) is type_adapter(list[ProductOut])
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import logging
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from app.core.sql_instrumentation import SQLInstrumentationMiddleware, collect_sql_stats, instrument_engine
+from app.models import Category
+
+LOGGER = 'app.core.sql_instrumentation'
+
+
+@pytest.fixture
+def instrumented(db_engine: AsyncEngine) -> AsyncEngine:
+    instrument_engine(db_engine)
+    return db_engine
+
+
+def test_stats_count_statements_and_repeated_shapes(instrumented, session_maker: async_sessionmaker[AsyncSession]):
+    async def scenario():
+        async with session_maker() as session:
+            for id_ in range(3):
+                await session.execute(select(Category).where(Category.id == id_))
+            await session.execute(text('SELECT 1'))
+
+    with collect_sql_stats() as stats:
+        asyncio.run(scenario())
+
+    assert stats.statements == 4
+    assert stats.db_time > 0
+    [(shape, count)] = stats.repeated(3)
+    assert count == 3 and 'FROM categories' in shape
+    assert stats.repeated(0) == []
+
+
+def test_statements_outside_a_request_are_not_counted(instrumented, session_maker):
+    async def scenario():
+        async with session_maker() as session:
+            await session.execute(text('SELECT 1'))
+
+    with collect_sql_stats() as stats:
+        pass
+    asyncio.run(scenario())
+
+    assert stats.statements == 0
+
+
+def test_middleware_sets_server_timing_and_logs_request(db_client: TestClient, instrumented, sql_statements,
+                                                        caplog):
+    with caplog.at_level(logging.INFO, logger=LOGGER):
+        response = db_client.get('/categories/')
+
+    assert response.status_code == 200
+    timing = re.match(r'db;dur=[\d.]+;desc="(\d+) statements", db-pool;dur=[\d.]+, app;dur=[\d.]+',
+                      response.headers['Server-Timing'])
+    assert int(timing.group(1)) == len(sql_statements)
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record['route'] == '/categories/'
+    assert record['status'] == 200
+    assert record['statements'] == len(sql_statements)
+    assert 'repeated' not in record
+
+
+def test_middleware_flags_repeated_statements(instrumented, session_maker, caplog):
+    async def endpoint(request):
+        async with session_maker() as session:
+            for id_ in range(4):
+                await session.get(Category, id_)
+        return PlainTextResponse('ok')
+
+    app = SQLInstrumentationMiddleware(Starlette(routes=[Route('/', endpoint)]), repeat_threshold=4)
+    with caplog.at_level(logging.INFO, logger=LOGGER), TestClient(app) as client:
+        response = client.get('/')
+
+    assert 'desc="4 statements"' in response.headers['Server-Timing']
+    [log] = [log for log in caplog.records if log.name == LOGGER]
+    assert log.levelno == logging.WARNING
+    [repeated] = json.loads(log.getMessage())['repeated']
+    assert repeated['count'] == 4 and 'FROM categories' in repeated['statement']
@@ -0,0 +1,126 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.core.unit_of_work import UnitOfWork
+from app.models import Category, Product, Review, User
+
+USERS = {'seller': 1, 'buyer': 2, 'admin': 3}
+
+
+@pytest.fixture
+def catalog(seed_catalog):
+    seed_catalog(User(id=2, email='buyer@mail.com', hashed_password='x', role='buyer'),
+                 User(id=3, email='admin@mail.com', hashed_password='x', role='admin'),
+                 Review(id=1, user_id=3, product_id=1, grade=4),
+                 products=[{'name': 'Phone'}])
+
+
+@pytest.fixture
+def login(db_client: TestClient, auth_headers):
+    def headers(role: str) -> dict:
+        role_headers = auth_headers(role, USERS[role])
+        # Пользователь попадает в кэш авторизации, дальше считаются только запросы самого маршрута
+        assert db_client.get('/users/me', headers=role_headers).status_code == 200
+        return role_headers
+
+    return headers
+
+
+PRODUCT = {'name': 'Phone 2', 'price': '12.50', 'stock': 3, 'category_id': 1}
+
+
+@pytest.mark.parametrize('role, method, url, payload, statements', [
+    ('seller', 'POST', '/products/', PRODUCT, 3),            # категория + INSERT + статистика категории
+    ('seller', 'PUT', '/products/1', PRODUCT, 2),            # UPDATE ... RETURNING с проверкой владельца + статистика
+    ('seller', 'DELETE', '/products/1', None, 2),            # UPDATE ... RETURNING с проверкой владельца + статистика
+    ('buyer', 'POST', '/reviews/', {'product_id': 1, 'grade': 5}, 5),  # товар + повтор + INSERT + рейтинг + статистика
+    ('admin', 'DELETE', '/reviews/1', None, 5),              # отзыв + товар + UPDATE + рейтинг + статистика
+    ('admin', 'POST', '/categories/', {'name': 'Books'}, 3),  # INSERT + перестроение дерева после commit
+    (None, 'POST', '/users/', {'email': 'new@mail.com', 'password': 'secret123'}, 2),  # проверка email + INSERT
+])
+def test_write_endpoint_commits_once(db_client: TestClient, catalog, sql_statements, sql_commits, login,
+                                     role, method, url, payload, statements):
+    headers = login(role) if role else {}
+    sql_statements.clear()
+    sql_commits.clear()
+
+    response = db_client.request(method, url, json=payload, headers=headers)
+
+    assert response.status_code in (200, 201), response.text
+    assert sql_commits.count('COMMIT') == 1
+    assert len(sql_statements) == statements
+
+
+def test_failed_request_rolls_back_without_commit(db_client: TestClient, catalog, sql_commits, login):
+    headers = login('buyer')
+    sql_commits.clear()
+
+    response = db_client.post('/reviews/', json={'product_id': 404, 'grade': 5}, headers=headers)
+
+    assert response.status_code == 404
+    assert 'COMMIT' not in sql_commits
+
+
+def test_after_commit_callbacks_run_only_after_commit(session_maker):
+    calls = []
+
+    async def scenario():
+        async with session_maker() as session:
+            uow = UnitOfWork.for_session(session)
+            assert UnitOfWork.for_session(session) is uow
+
+            async def callback():
+                calls.append('called')
+
+            uow.after_commit(callback)
+            await uow.rollback()
+            await uow.commit()
+            uow.after_commit(callback)
+            with pytest.raises(RuntimeError):
+                async with uow:
+                    raise RuntimeError
+            uow.after_commit(callback)
+            async with uow:
+                pass
+
+    asyncio.run(scenario())
+
+    assert calls == ['called']
+
+
+@pytest.fixture
+def foreign_product(session_maker: async_sessionmaker[AsyncSession], catalog):
+    async def seed():
+        async with session_maker() as session:
+            session.add_all([Category(id=2, name='Tablets'), Category(id=3, name='Archive', is_active=False)])
+            session.add(Product(id=2, name='Tablet', price=Decimal(20), stock=1, category_id=2, seller_id=3))
+            await session.commit()
+
+    asyncio.run(seed())
+
+
+@pytest.mark.parametrize('method, url, payload, status, statements', [
+    ('PUT', '/products/404', PRODUCT, 404, 2),                        # UPDATE + товар
+    ('PUT', '/products/2', PRODUCT, 403, 2),                          # UPDATE + товар чужого продавца
+    ('PUT', '/products/1', PRODUCT | {'category_id': 3}, 404, 3),     # UPDATE + товар + неактивная категория
+    ('PUT', '/products/1', PRODUCT | {'category_id': 2}, 200, 6),     # перенос: UPDATE + товар + категория + UPDATE
+                                                                      # + статистика старой и новой категорий
+    ('DELETE', '/products/404', None, 404, 2),                        # UPDATE + товар
+    ('DELETE', '/products/2', None, 403, 2),                          # UPDATE + товар чужого продавца
+])
+def test_owned_writes_tell_failures_apart_only_after_no_row_matched(db_client: TestClient, foreign_product,
+                                                                    sql_statements, login,
+                                                                    method, url, payload, status, statements):
+    headers = login('seller')
+    sql_statements.clear()
+
+    response = db_client.request(method, url, json=payload, headers=headers)
+
+    assert response.status_code == status, response.text
+    assert len(sql_statements) == statements
+    if status == 200:
+        assert response.json()['data']['category_id'] == 2
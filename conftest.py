@@ -0,0 +1,11 @@
+# Корневой conftest: опции командной строки регистрируются здесь, чтобы pytest знал их
+# при любом запуске из корня репозитория (pytest, pytest app/tests, pytest app/benchmarks ...)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks', 'Repository microbenchmarks (app/benchmarks/test_repositories.py)')
+    group.addoption('--bench-rows', type=int, nargs='+', default=None,
+                    help='Dataset sizes to benchmark, e.g. --bench-rows 1000 100000 1000000 (default: 1000)')
+    group.addoption('--bench-repeat', type=int, default=3,
+                    help='Runs per repository method; the median time is reported')
+    group.addoption('--bench-report', default=None, help='Write repository benchmark results to this JSON file')